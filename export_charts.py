@@ -4,123 +4,235 @@ Export Accelerator Timeline
 
 This is an example script to generate static plots of the accelerator data via 
 matplotlib.
+All charts can also be composed into a single dashboard figure, see :func:`plot_dashboard`.
+The charts are rendered from the backend-neutral scene, see :mod:`utilities.scene`.
 To run the script, make sure your environment has the requirements 
 of `requirements_export_charts.txt` installed.
 """
 import os
 from pathlib import Path
+from typing import Sequence
 
 import matplotlib as mpl
 import matplotlib.ticker as plticker
 import numpy as np
 import pandas as pd
 from matplotlib import pyplot as plt
+from matplotlib.axes import Axes
 from matplotlib.figure import Figure
 
-from utilities.csv_reader import Column, import_collider_data
-from utilities.plot_helper import (PARTICLE_TYPES, PLOTLY_MPL_SYMBOL_MAP, EnergyConfiguration,
-                                   LuminosityConfiguration, LuminosityOverEnergyConfiguration,
-                                   PlotConfiguration, assign_textposition, check_all_types_accounted_for)
+from utilities.csv_reader import Column, import_catalogue
+from utilities.plot_helper import (CONFIGURATIONS, PLOTLY_MPL_SYMBOL_MAP, EnergyConfiguration,
+                                   FixedTargetEnergyConfiguration, LuminosityConfiguration, 
+                                   LuminosityOverEnergyConfiguration, PlotConfiguration, assign_textposition, 
+                                   check_all_names_accounted_for, check_all_types_accounted_for, partition_data)
+from utilities.mpl_labels import ALIGNMENT_MAP, add_label_collection, text_offsets
+from utilities.raster_export import save_rasters
+from utilities.reproducible_export import savefig
+from utilities.scene import Scene, build_scene
 from utilities.sphinx_helper import get_gallery_dir, is_sphinx_build
 
 
-def plot(data: pd.DataFrame, configuration: PlotConfiguration) -> Figure:
+DASHBOARD_PANEL_SIZE = (8.4, 7.2)  # [inch]
+HIGHLIGHT_STYLE = dict(linestyle="none", marker="o", markersize=18, fillstyle="none", 
+                       color="black", markeredgewidth=1.5, zorder=-1)
+
+
+def plot(data: pd.DataFrame, configuration: PlotConfiguration, 
+         batch_labels: bool = False, rasterize_labels: bool = False, 
+         trends: bool = False, families: bool = False) -> Figure:
     """Generate interactive plots with matplotlib, based on the given configuration, 
     which defines the columns to use, labels and the text positions.
 
     Args:
         data (pd.DataFrame): DataFrame containing the (modified) accelerator timeline data
         configuration (PlotConfiguration): See :class:`utilities.plot_helper.PlotConfiguration`
+        batch_labels (bool): Draw all labels as a single collection of cached glyph paths,
+                             which is much faster to export for many labels, 
+                             but the text is not selectable in vector output.
+                             See :mod:`utilities.mpl_labels`.
+        rasterize_labels (bool): Rasterize the labels in vector output.
+        trends (bool): Overlay the trend fits per particle-type family,
+                       see :mod:`utilities.trend_fit`.
+        families (bool): Connect the operating points of each machine and label them once,
+                         see :mod:`utilities.operating_points`.
+
+    Returns:
+        Figure: Matplotlib figure 
+    """
+    return render_scene(build_scene(data, configuration, trends=trends, families=families), 
+                        batch_labels=batch_labels, rasterize_labels=rasterize_labels)
+
+
+def render_scene(scene: Scene, batch_labels: bool = False, rasterize_labels: bool = False) -> Figure:
+    """Render the scene (see :mod:`utilities.scene`) with matplotlib.
+    See :func:`plot` for the description of the options.
+
+    Args:
+        scene (Scene): The scene.
 
     Returns:
         Figure: Matplotlib figure 
     """
     fig, ax = plt.subplots()
-            
+    draw_scene(ax, scene, batch_labels=batch_labels, rasterize_labels=rasterize_labels)
+    ax.legend(loc='upper left', bbox_to_anchor=(1, 1), borderaxespad=0., title='Particles', ncol=1)
+    return fig 
+
+
+def draw_scene(ax: Axes, scene: Scene, batch_labels: bool = False, rasterize_labels: bool = False) -> None:
+    """Draw the scene into the axes, without legend.
+    See :func:`plot` for the description of the options.
+
+    Args:
+        ax (Axes): The axes to draw into.
+        scene (Scene): The scene.
+    """
     pad = mpl.rcParams["lines.markersize"]/3
-    vmap = {"top": pad, "middle": 0, "bottom": -pad}
-    hmap = {"left": -pad*2, "center": 0, "right": pad*2}
-    alignment_map = {
-        "left": "right", "center": "center", "right": "left", 
-        "top": "bottom", "middle": "center", "bottom": "top"
-    }
-
-    for particle_type in PARTICLE_TYPES:
-        mask = data[Column.TYPE] == particle_type.shorthand
-        marker = PLOTLY_MPL_SYMBOL_MAP[particle_type.symbol]
-
-        for has_been_built in (True, False):
-            if has_been_built:
-                builtmask, fillstyle, legend_prefix = data[Column.BUILT], "full", ""
-            else:
-                builtmask, fillstyle, legend_prefix = ~data[Column.BUILT], "none", "_"
-
-            ax.plot(
-                data.loc[mask & builtmask, configuration.xcolumn], 
-                data.loc[mask & builtmask, configuration.ycolumn],
-                linestyle="none",
-                marker=marker, fillstyle=fillstyle,
-                color=particle_type.color,
-                label=f"{legend_prefix}{particle_type.latex}",
-            )
+    hmap, vmap = text_offsets(pad)
+
+    for line in scene.families:
+        ax.plot(line.x, line.y, color=line.color, alpha=0.6, marker="none", label=f"_{line.name}", zorder=-0.5)
 
-        for x, y, text, textposition in zip(data.loc[mask, configuration.xcolumn], 
-                                            data.loc[mask, configuration.ycolumn], 
-                                            data.loc[mask, Column.NAME], 
-                                            data.loc[mask, configuration.textposition]):
+    for series in scene.series:
+        particle_type = series.particle_type
+        if series.built:
+            fillstyle, legend_prefix = "full", ""
+        else:
+            fillstyle, legend_prefix = "none", "_"
+
+        ax.plot(
+            series.x, 
+            series.y,
+            linestyle="none",
+            marker=PLOTLY_MPL_SYMBOL_MAP[particle_type.symbol], fillstyle=fillstyle,
+            color=particle_type.color,
+            label=f"{legend_prefix}{particle_type.latex}",
+        )
+
+        if batch_labels:
+            continue
+
+        for x, y, text, textposition in zip(series.x, series.y, series.texts, series.textpositions):
+            if not text:
+                continue
             v, h = textposition.split(" ")
             ax.annotate(text, xy=(x, y),  
                 xytext=(hmap[h], vmap[v]), 
                 textcoords="offset pixels", 
-                ha=alignment_map[h], va=alignment_map[v]
+                ha=ALIGNMENT_MAP[h], va=ALIGNMENT_MAP[v],
+                rasterized=rasterize_labels,
             )
 
-    ax.set_xlabel(configuration.xlabel)
-    ax.set_ylabel(configuration.ylabel)
-    for axis in ("x", "y"):
-        if axis in configuration.logscale:
-            getattr(ax, f"set_{axis}scale")("log")
-            lim = getattr(ax, f"get_{axis}lim")()
-            numticks = int(np.log10(lim[1]/lim[0])) + 1
-            getattr(ax, f"{axis}axis").set_major_locator(plticker.LogLocator(base=10.0, numticks=numticks))
-            getattr(ax, f"{axis}axis").set_minor_locator(plticker.LogLocator(base=10.0, subs=np.arange(2, 10)))
-            getattr(ax, f"{axis}axis").set_minor_formatter(plticker.NullFormatter())
-        else:
-            getattr(ax, f"set_{axis}scale")("linear")
-            getattr(ax, f"{axis}axis").set_major_locator(plticker.MultipleLocator(base=10.0))
-            getattr(ax, f"{axis}axis").set_minor_locator(plticker.MultipleLocator(base=1.0))
+    if batch_labels:
+        texts = np.concatenate([series.texts for series in scene.series])
+        labelled = texts != ""
+        add_label_collection(ax, 
+            np.concatenate([series.x for series in scene.series])[labelled], 
+            np.concatenate([series.y for series in scene.series])[labelled], 
+            texts[labelled], 
+            np.concatenate([series.textpositions for series in scene.series])[labelled],
+            pad=pad, rasterized=rasterize_labels,
+        )
+
+    for fit in scene.trends:
+        ax.fill_between(fit.x, fit.lower, fit.upper, color=fit.family.color, alpha=0.2, 
+                        linewidth=0, zorder=-1)
+        ax.plot(fit.x, fit.y, color=fit.family.color, linestyle="--", marker="none", 
+                label=f"{fit.family.name} trend", zorder=-1)
+
+    ax.set_xlabel(scene.xaxis.label)
+    ax.set_ylabel(scene.yaxis.label)
+    for axis, layout in (("x", scene.xaxis.layout), ("y", scene.yaxis.layout)):
+        getattr(ax, f"set_{axis}scale")(layout.scale)
+        getattr(ax, f"set_{axis}lim")(layout.limits)
+        getattr(ax, f"{axis}axis").set_major_locator(plticker.FixedLocator(layout.major_ticks))
+        getattr(ax, f"{axis}axis").set_minor_locator(plticker.FixedLocator(layout.minor_ticks))
+        getattr(ax, f"{axis}axis").set_minor_formatter(plticker.NullFormatter())
+        if layout.is_log:
+            getattr(ax, f"{axis}axis").set_major_formatter(plticker.LogFormatterSciNotation())
+
+
+def plot_dashboard(data: pd.DataFrame, configurations: Sequence[PlotConfiguration] = None,
+                   highlight: Sequence[str] = None, trends: bool = False, families: bool = False, 
+                   **kwargs) -> Figure:
+    """Compose the charts of all configurations into one figure with a panel each,
+    built from one partition of the data and with a common legend.
+    Axes showing the same column are shared.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the (modified) accelerator timeline data
+        configurations (Sequence[PlotConfiguration]): The charts to show. 
+                                                      Defaults to all registered configurations.
+        highlight (Sequence[str]): Names of colliders to highlight in all panels.
+        trends (bool): Overlay the trend fits per particle-type family.
+        families (bool): Connect the operating points of each machine and label them once.
+        kwargs: Options of the labels, see :func:`plot`.
 
+    Returns:
+        Figure: Matplotlib figure 
+    """
+    if configurations is None:
+        configurations = list(CONFIGURATIONS.values())
+
+    groups = partition_data(data)
+    width, height = DASHBOARD_PANEL_SIZE
+    fig, axs = plt.subplots(1, len(configurations), figsize=(width * len(configurations), height), squeeze=False)
+    axs = axs[0]
+
+    highlighted = data[Column.NAME].isin(highlight or [])
+    first_axes = {"x": {}, "y": {}}  # column -> first axes showing it
+    for ax, configuration in zip(axs, configurations):
+        draw_scene(ax, build_scene(data, configuration, trends=trends, families=families, groups=groups), 
+                   **kwargs)
+        if highlighted.any():
+            ax.plot(data.loc[highlighted, configuration.xcolumn], data.loc[highlighted, configuration.ycolumn], 
+                    **HIGHLIGHT_STYLE)
+
+        for axis in ("x", "y"):
+            column = getattr(configuration, f"{axis}column")
+            if column in first_axes[axis]:
+                getattr(ax, f"share{axis}")(first_axes[axis][column])
+            else:
+                first_axes[axis][column] = ax
 
-    ax.legend(loc='upper left', bbox_to_anchor=(1, 1), borderaxespad=0., title='Particles', ncol=1)
-    return fig 
+    fig.legend(*axs[0].get_legend_handles_labels(), loc='outside right upper', title='Particles', ncol=1)
+    return fig
 
 
 if __name__ == "__main__":
     if is_sphinx_build():
         MAIN_DIR = Path()
-        output_dir = get_gallery_dir()
+        output_dir = resized_dir = get_gallery_dir()
     else:
         MAIN_DIR = Path(__file__).parent
         output_dir = MAIN_DIR / "images"
+        resized_dir = MAIN_DIR / "build" / "images"  # web and thumbnail sizes, not tracked
 
     plt.style.use(MAIN_DIR / "utilities" / "chart.mplstyle")
 
-    data = import_collider_data()
-    data = assign_textposition(data)
+    catalogue = import_catalogue()
+    data = assign_textposition(catalogue.colliders)
     check_all_types_accounted_for(data)
+    check_all_names_accounted_for(data)
+    check_all_types_accounted_for(catalogue.fixed_target)
     
     fig_com = plot(data, EnergyConfiguration)
-    fig_com.savefig(output_dir / "energy.pdf")
-    fig_com.savefig(output_dir / "energy.png")
+    savefig(fig_com, output_dir / "energy.pdf")
+    save_rasters(fig_com, output_dir / "energy", optimize=True, resized_dir=resized_dir)
 
     fig_lumi = plot(data, LuminosityConfiguration)
-    fig_lumi.savefig(output_dir / "luminosity.pdf")
-    fig_lumi.savefig(output_dir / "luminosity.png")
+    savefig(fig_lumi, output_dir / "luminosity.pdf")
+    save_rasters(fig_lumi, output_dir / "luminosity", optimize=True, resized_dir=resized_dir)
 
     fig_lumi_vs_com = plot(data, LuminosityOverEnergyConfiguration)
-    fig_lumi_vs_com.savefig(output_dir / "luminosity-vs-energy.pdf")
-    fig_lumi_vs_com.savefig(output_dir / "luminosity-vs-energy.png")
+    savefig(fig_lumi_vs_com, output_dir / "luminosity-vs-energy.pdf")
+    save_rasters(fig_lumi_vs_com, output_dir / "luminosity-vs-energy", optimize=True, resized_dir=resized_dir)
+
+    fig_fixed_target = plot(catalogue.fixed_target, FixedTargetEnergyConfiguration)
+    savefig(fig_fixed_target, output_dir / "fixed-target-energy.pdf")
+    save_rasters(fig_fixed_target, output_dir / "fixed-target-energy", optimize=True, resized_dir=resized_dir)
     
     # plt.show()
 
-# sphinx_gallery_thumbnail_path = 'gallery/luminosity-vs-energy.png'
+# sphinx_gallery_thumbnail_path = 'gallery/luminosity-vs-energy-thumb.png'
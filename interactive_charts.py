@@ -14,7 +14,7 @@ of `requirements_interactive_charts.txt` installed.
 # Preparations 
 # ------------
 # 
-# Import modules and define plotting function.
+# Import modules and load the data.
 # This code is omitted in the interactive gallery, so that you can immediately enjoy the interactive plots below.
 # Check `interactive.py <https://github.com/pylhc/accelerator_timeline/blob/master/interactive_charts.py>`_ 
 # for the full example code.
@@ -23,16 +23,16 @@ of `requirements_interactive_charts.txt` installed.
 # No code to see here in the interactive gallery or the generated jupyter notebook.
 # sphinx_gallery_start_ignore
 from pathlib import Path
-import numpy as np
-import pandas as pd
-import plotly
-import plotly.graph_objects as go
 from IPython.display import HTML, display
 
-from utilities.csv_reader import Column, import_collider_data
-from utilities.plot_helper import (PARTICLE_TYPES, EnergyConfiguration, LuminosityConfiguration,
-                                   LuminosityOverEnergyConfiguration, PlotConfiguration,
-                                   assign_textposition, check_all_types_accounted_for)
+from utilities.csv_reader import import_catalogue
+from utilities.plot_helper import (EnergyConfiguration, FixedTargetEnergyConfiguration, 
+                                   LuminosityConfiguration, LuminosityOverEnergyConfiguration, 
+                                   assign_textposition, check_all_names_accounted_for,
+                                   check_all_types_accounted_for)
+from utilities.plotly_charts import plot, search_script, to_search_html
+from utilities.raster_export import render_plotly_figure, save_rasters
+from utilities.reproducible_export import write_image
 from utilities.sphinx_helper import get_gallery_dir, is_interactive, is_sphinx_build
 
 # Hack for rendering LaTeX in VSCode 
@@ -43,97 +43,16 @@ if not is_sphinx_build() and is_interactive():
     ))
 
 # Import Data ---
-data = import_collider_data()
-data = assign_textposition(data)
+catalogue = import_catalogue()
+data = assign_textposition(catalogue.colliders)
 check_all_types_accounted_for(data)
+check_all_names_accounted_for(data)
+check_all_types_accounted_for(catalogue.fixed_target)
 
 # Plotting Function ---
-# This is the definition of the actual plotting function, 
-# which creates the interactive plotly plots
-
-def plot(data: pd.DataFrame, configuration: PlotConfiguration) -> go.Figure:
-    """Generate interactive plots with plotly, based on the given configuration, 
-    which defines the columns to use and the text positions.
-
-    Args:
-        data (pd.DataFrame): DataFrame containing the (modified) accelerator timeline data
-        configuration (PlotConfiguration): See :class:`utilities.plot_helper.PlotConfiguration`
-
-    Returns:
-        go.Figure: plotly figure 
-    """
-    fig = go.Figure()
-
-    for particle_type in PARTICLE_TYPES:
-        particle_mask = data[Column.TYPE] == particle_type.shorthand
-        for has_been_built in (True, False):
-            if has_been_built:
-                builtmask, marker_suffix, legend = data[Column.BUILT], "", "built"
-            else:
-                builtmask, marker_suffix, legend = ~data[Column.BUILT], "-open", "not built"
-            
-            mask = particle_mask & builtmask
-
-            fig.add_trace(go.Scatter(
-                x=data.loc[mask & builtmask, configuration.xcolumn], 
-                y=data.loc[mask & builtmask, configuration.ycolumn],
-                name=legend,
-                legendgroup=particle_type.name,
-                legendgrouptitle_text=particle_type.latex,
-                text=data.loc[mask, Column.NAME],
-                textposition=data.loc[mask, configuration.textposition],
-                mode="markers+text", 
-                marker={"symbol": f"{particle_type.symbol}{marker_suffix}", 
-                        "color": particle_type.color}, 
-                customdata=np.transpose([
-                    data.loc[mask, Column.NAME],
-                    [particle_type.name] * sum(mask),
-                    data.loc[mask, Column.COM_ENERGY],
-                    data.loc[mask, Column.LUMINOSITY],
-                    data.loc[mask, Column.LENGTH],
-                    data.loc[mask, Column.YEARS],
-                    data.loc[mask, Column.INSTITUTE],
-                    data.loc[mask, Column.COUNTRY],
-                ])
-            ))
-
-    fig.update_traces(
-        hovertemplate="<br>".join([
-            "%{customdata[0]} (%{customdata[6]}, %{customdata[7]})",
-            "Particles: %{customdata[1]}",
-            "Center-of-Mass Energy [GeV]: %{customdata[2]}",
-            "Luminosity [cm^-2s^-1]: %{customdata[3]}",  # sadly plotly does not support latex in hover
-            "Length [m]: %{customdata[4]}",
-            "Operation: %{customdata[5]}",
-        ]) + "<extra></extra>"
-    )
-
-    logx, logy = "x" in configuration.logscale, "y" in configuration.logscale
-    fig.update_xaxes(
-        title=configuration.xlabel, 
-        type="log" if logx else "linear",
-        dtick=1 if logx else 10, 
-        minor=dict(dtick="D1" if logx else 1, ticks="outside"),
-        ticks='outside',
-        showline=True,
-        linecolor='black',
-        gridcolor='lightgrey'
-    )
-    fig.update_yaxes(
-        title=configuration.ylabel, 
-        type="log" if "y" in configuration.logscale else "linear",
-        ticks='outside',
-        dtick=1 if logy else 10, 
-        minor=dict(dtick="D1" if logy else None, ticks="outside", showgrid=False),
-        showline=True,
-        linecolor='black',
-        gridcolor='lightgrey',
-        # tickformat='e',
-    )
-    fig.update_layout(
-        plot_bgcolor='white',
-    )
-    return fig
+# The actual plotting function, which creates the interactive plotly plots, 
+# is defined in `utilities/plotly_charts.py <https://github.com/pylhc/accelerator_timeline/blob/master/utilities/plotly_charts.py>`_
+# so that it can also be used by other scripts.
 
 # sphinx_gallery_end_ignore
 
@@ -173,24 +92,88 @@ if not is_sphinx_build() and not is_interactive():
 fig_lumi_energy
 # sphinx_gallery_end_ignore
 
+#%%
+# Fixed-Target Machines
+# ---------------------
+#
+# Before the first colliders, particles were accelerated onto fixed targets.
+# Their beam energy is charted from the same load of the data as the colliders.
+
+fig_fixed_target = plot(catalogue.fixed_target, FixedTargetEnergyConfiguration)
+# sphinx_gallery_start_ignore
+if not is_sphinx_build() and not is_interactive():
+    fig_fixed_target.show()
+fig_fixed_target
+# sphinx_gallery_end_ignore
+
+#%%
+# Filtering
+# ---------
+#
+# All charts can be given filter menus for the status, institute, country,
+# start year and center-of-mass energy of the colliders. 
+# The selections are precomputed, so choosing a filter is instant.
+# Each menu replaces the filter of the other menus.
+
+fig_filter = plot(data, EnergyConfiguration, filters=True)
+# sphinx_gallery_start_ignore
+if not is_sphinx_build() and not is_interactive():
+    fig_filter.show()
+fig_filter
+# sphinx_gallery_end_ignore
+
+#%%
+# Operating Points
+# ----------------
+#
+# Several proposed machines come with multiple operating points,
+# e.g. the FCC-ee at the Z-pole, the WW-threshold, as Higgs-factory and at the top-threshold.
+# These can be connected and labelled only once with the name of the machine.
+
+fig_families = plot(data, LuminosityOverEnergyConfiguration, families=True)
+# sphinx_gallery_start_ignore
+if not is_sphinx_build() and not is_interactive():
+    fig_families.show()
+fig_families
+# sphinx_gallery_end_ignore
+
+#%%
+# Search
+# ------
+#
+# Type the name of a collider or an institute into the search box
+# to highlight the matching colliders.
+# The search is fuzzy, e.g. "fcc ee" finds all FCC-ee operating points
+# and "lhc" also finds the HL-LHC and HE-LHC.
+
+fig_search = plot(data, LuminosityOverEnergyConfiguration)
+# sphinx_gallery_start_ignore
+if not is_sphinx_build() and not is_interactive():
+    fig_search.show(post_script=search_script(data))
+# sphinx_gallery_end_ignore
+HTML(to_search_html(fig_search, data))
+
 #%% 
 # Save plots
 # ----------
 # 
 # Save the plots as PDF and PNG.
+# The PNGs are rendered once and saved in full, web and thumbnail size.
+# All files are byte-reproducible, i.e. they only change if the charts change.
 
 output_dir = Path("images")
+resized_dir = Path("build") / "images"  # web and thumbnail sizes, not tracked
 # sphinx_gallery_start_ignore
 if is_sphinx_build():
-    output_dir = get_gallery_dir()
+    output_dir = resized_dir = get_gallery_dir()
 # sphinx_gallery_end_ignore
 
-plotly.io.write_image(fig_com, output_dir / "energy-plotly.pdf", format="pdf")
-plotly.io.write_image(fig_com, output_dir / "energy-plotly.png", format="png")
-plotly.io.write_image(fig_lumi, output_dir / "luminosity-plotly.pdf", format="pdf")
-plotly.io.write_image(fig_lumi, output_dir / "luminosity-plotly.png", format="png")
-plotly.io.write_image(fig_lumi_energy, output_dir / "luminosity-vs-energy-plotly.pdf", format="pdf")
-plotly.io.write_image(fig_lumi_energy, output_dir / "luminosity-vs-energy-plotly.png", format="png")
+write_image(fig_com, output_dir / "energy-plotly.pdf")
+save_rasters(render_plotly_figure(fig_com), output_dir / "energy-plotly", optimize=True, resized_dir=resized_dir)
+write_image(fig_lumi, output_dir / "luminosity-plotly.pdf")
+save_rasters(render_plotly_figure(fig_lumi), output_dir / "luminosity-plotly", optimize=True, resized_dir=resized_dir)
+write_image(fig_lumi_energy, output_dir / "luminosity-vs-energy-plotly.pdf")
+save_rasters(render_plotly_figure(fig_lumi_energy), output_dir / "luminosity-vs-energy-plotly", optimize=True, resized_dir=resized_dir)
 
 
-# sphinx_gallery_thumbnail_path = 'gallery/luminosity-vs-energy-plotly.png'
+# sphinx_gallery_thumbnail_path = 'gallery/luminosity-vs-energy-plotly-thumb.png'
@@ -0,0 +1,97 @@
+"""
+Test Fixtures
+*************
+
+Fixtures shared by the tests. Run the tests from the root of this repository via::
+
+    python -m pytest tests
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple
+from urllib.parse import urlparse
+
+import pytest
+
+SLOW_DELAY = 2  # [s] response time of ``/slow``, longer than the timeout used in the tests
+BUSY_DELAY = 0.2  # [s] response time of ``/busy``, to overlap concurrent requests
+
+
+class LinkServer(ThreadingHTTPServer):
+    """Local stand-in for the servers of the references, recording the requests.
+
+    Paths:
+        ``/ok``: 200, ``/missing``: 404, ``/error``: 503,
+        ``/no-head``: 405 for HEAD and 200 for GET,
+        ``/redirect``: 302 to ``/ok``,
+        ``/slow``: 200 after :data:`SLOW_DELAY`,
+        ``/busy``: 200 after :data:`BUSY_DELAY`, counting the simultaneous requests.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _LinkHandler)
+        self.requests: List[Tuple[str, str]] = []  # (method, path)
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+    def requested(self, path: str) -> List[str]:
+        """ Methods of the requests to the path. """
+        return [method for method, requested_path in self.requests if requested_path == path]
+
+    def handle_error(self, request, client_address):
+        pass  # clients hanging up on slow responses
+
+
+class _LinkHandler(BaseHTTPRequestHandler):
+    server: LinkServer
+
+    def do_HEAD(self):
+        self._respond("HEAD")
+
+    def do_GET(self):
+        self._respond("GET")
+
+    def _respond(self, method: str):
+        path = urlparse(self.path).path
+        with self.server.lock:
+            self.server.requests.append((method, self.path))
+            self.server.active += 1
+            self.server.max_active = max(self.server.max_active, self.server.active)
+        try:
+            if path == "/slow":
+                time.sleep(SLOW_DELAY)
+            elif path == "/busy":
+                time.sleep(BUSY_DELAY)
+
+            status, headers = {
+                "/missing": (404, {}),
+                "/error": (503, {}),
+                "/no-head": (405 if method == "HEAD" else 200, {}),
+                "/redirect": (302, {"Location": "/ok"}),
+            }.get(path, (200, {}))
+            self.send_response(status)
+            for name, value in {**headers, "Content-Length": "0"}.items():
+                self.send_header(name, value)
+            self.end_headers()
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def link_server() -> LinkServer:
+    server = LinkServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,49 @@
+"""
+Tests of :mod:`utilities.array_store`.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utilities.array_store import is_store_outdated, load_array_store, numeric_columns, share_frame
+from utilities.csv_reader import Column, import_collider_data
+
+
+@pytest.fixture(scope="module")
+def data() -> pd.DataFrame:
+    return import_collider_data()
+
+
+def _memory_map(array: np.ndarray) -> np.memmap:
+    """ The memory-mapped store (structured array) the array is a view of, ``None`` if it is not. """
+    while isinstance(array, np.ndarray) and not (isinstance(array, np.memmap) and array.dtype.names):
+        array = array.base
+    return array
+
+
+def test_shared_frame_views_the_store(data, tmp_path):
+    shared = share_frame(data, tmp_path / "data.npy")
+    frame = shared.open()
+    store = _memory_map(frame[Column.START_YEAR].to_numpy())
+
+    assert store is not None and Path(store.filename) == shared.path.resolve()
+    for column in numeric_columns(data):
+        assert np.shares_memory(frame[column].to_numpy(), store[column]), column
+    pd.testing.assert_frame_equal(frame, data)
+    assert frame.attrs == data.attrs
+
+
+def test_store_is_rewritten_for_modified_data(data, tmp_path):
+    path = tmp_path / "data.npy"
+    load_array_store(path, data)
+    assert not is_store_outdated(path, data=data)
+
+    modified = data.copy()  # same catalogue version in the attrs
+    modified[Column.COM_ENERGY] = modified[Column.COM_ENERGY] * 2
+    assert is_store_outdated(path, data=modified)
+
+    store = load_array_store(path, modified)
+    np.testing.assert_array_equal(store[Column.COM_ENERGY], modified[Column.COM_ENERGY].to_numpy())
+    assert [file.name for file in tmp_path.iterdir() if file.suffix == ".tmp"] == []
@@ -0,0 +1,137 @@
+"""
+Tests of :mod:`utilities.reference_checker`, against the local server of the ``link_server`` fixture.
+"""
+import importlib.util
+import time
+
+import pandas as pd
+import pytest
+
+from utilities.csv_reader import Column
+from utilities.reference_checker import LinkCache, check_references, check_urls, format_error
+
+requires_aiohttp = pytest.mark.skipif(importlib.util.find_spec("aiohttp") is None,
+                                      reason="The online checks require aiohttp.")
+
+
+def references(*rows) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=[Column.NAME, Column.REFERENCES])
+
+
+# Format -----------------------------------------------------------------------
+
+@pytest.mark.parametrize("url, problem", [
+    ("https://home.cern/science/accelerators", None),
+    ("http://localhost:8080/x", None),
+    ("ftp://ftp.cern.ch/file", "invalid scheme 'ftp'"),
+    ("https://cern/x", "invalid host"),
+    ("http://:80/x", "invalid host"),
+    ("http:///x", "invalid host"),
+    ("http://[::1", "invalid URL (Invalid IPv6 URL)"),
+])
+def test_format_error(url, problem):
+    assert format_error(url) == problem
+
+
+def test_offline_does_not_request(link_server):
+    data = references(
+        ("LHC", f"{link_server.url('/ok')} {link_server.url('/ok')}"),
+        ("SPS", "ftp://ftp.cern.ch/sps"),
+        ("LEP", link_server.url("/missing")),
+    )
+    problems = check_references(data, offline=True)
+
+    assert link_server.requests == []
+    assert sorted((problem.name, problem.problem) for problem in problems) == [
+        ("LHC", "duplicate (2x)"),
+        ("SPS", "invalid scheme 'ftp'"),
+    ]
+
+
+# Online -----------------------------------------------------------------------
+
+@requires_aiohttp
+def test_status(link_server):
+    paths = ["/ok", "/missing", "/error"]
+    statuses = check_urls([link_server.url(path) for path in paths], timeout=5)
+
+    assert [(status.ok, status.status) for status in statuses.values()] == [(True, 200), (False, 404), (False, 503)]
+    assert link_server.requested("/ok") == ["HEAD"]
+
+
+@requires_aiohttp
+def test_head_not_supported_falls_back_to_get(link_server):
+    status = check_urls([link_server.url("/no-head")], timeout=5)[link_server.url("/no-head")]
+
+    assert (status.ok, status.status) == (True, 200)
+    assert link_server.requested("/no-head") == ["HEAD", "GET"]
+
+
+@requires_aiohttp
+def test_redirect_is_followed(link_server):
+    status = check_urls([link_server.url("/redirect")], timeout=5)[link_server.url("/redirect")]
+
+    assert (status.ok, status.status) == (True, 200)
+    assert link_server.requested("/ok") == ["HEAD"]
+
+
+@requires_aiohttp
+def test_timeout(link_server):
+    start = time.perf_counter()
+    status = check_urls([link_server.url("/slow")], timeout=0.5)[link_server.url("/slow")]
+
+    assert time.perf_counter() - start < 2 * 0.5 + 1  # HEAD and GET time out
+    assert not status.ok and status.status is None
+    assert "Timeout" in status.error
+    assert status.is_transient
+
+
+@requires_aiohttp
+def test_concurrency_is_bounded(link_server):
+    urls = [link_server.url(f"/busy?page={page}") for page in range(8)]
+    statuses = check_urls(urls, concurrency=2, timeout=5)
+
+    assert all(status.ok for status in statuses.values())
+    assert len(link_server.requests) == len(urls)
+    assert link_server.max_active == 2
+
+
+@requires_aiohttp
+def test_cache_ttl(link_server, tmp_path):
+    url = link_server.url("/ok")
+    cache = LinkCache(tmp_path / "cache.json", ttl=60)
+    check_urls([url], cache, timeout=5)
+    check_urls([url], LinkCache(tmp_path / "cache.json", ttl=60), timeout=5)  # cached on disk
+    assert link_server.requested("/ok") == ["HEAD"]
+
+    cache.entries[url].checked -= 61  # expired
+    check_urls([url], cache, timeout=5)
+    assert link_server.requested("/ok") == ["HEAD", "HEAD"]
+
+
+@requires_aiohttp
+def test_transient_failures_expire_early(link_server, tmp_path):
+    urls = [link_server.url("/missing"), link_server.url("/error")]
+    cache = LinkCache(tmp_path / "cache.json", ttl=60, transient_ttl=10)
+    check_urls(urls, cache, timeout=5)
+    for status in cache.entries.values():
+        status.checked -= 11  # only the transient failure expired
+
+    check_urls(urls, cache, timeout=5)
+    assert link_server.requested("/missing") == ["HEAD"]
+    assert link_server.requested("/error") == ["HEAD", "HEAD"]
+
+
+@requires_aiohttp
+def test_check_references(link_server, tmp_path):
+    data = references(
+        ("LHC", f"{link_server.url('/ok')} {link_server.url('/redirect')}"),
+        ("LEP", link_server.url("/missing")),
+        ("SPS", "ftp://ftp.cern.ch/sps"),
+    )
+    problems = check_references(data, cache=LinkCache(tmp_path / "cache.json"), timeout=5)
+
+    assert sorted((problem.name, problem.problem) for problem in problems) == [
+        ("LEP", "HTTP 404"),
+        ("SPS", "invalid scheme 'ftp'"),
+    ]
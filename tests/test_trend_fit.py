@@ -0,0 +1,38 @@
+"""
+Tests of :mod:`utilities.trend_fit`.
+"""
+import pandas as pd
+
+from utilities.csv_reader import Column
+from utilities.plot_helper import EnergyConfiguration
+from utilities.trend_fit import fit_trends
+
+
+def colliders(types, start, energy) -> pd.DataFrame:
+    return pd.DataFrame({
+        Column.TYPE: types,
+        Column.BUILT: True,
+        Column.START_YEAR: start,
+        Column.COM_ENERGY: energy,
+    })
+
+
+def test_fit_trends():
+    data = colliders(["e+e-", "e+e-", "e+e-", "p+p+", "p+p+", "p+p+"],
+                     [1970, 1980, 1990, 1970, 1980, 1990],
+                     [10.0, 100.0, 1000.0, 100.0, 1000.0, 10000.0])
+    fits = fit_trends(data, EnergyConfiguration, n_bootstrap=100)
+
+    assert {fit.family.name: fit.n_points for fit in fits} == {"hadron": 3, "lepton": 3}
+    for fit in fits:
+        assert abs(fit.slope - 0.1) < 1e-9  # one decade per ten years
+        assert (fit.lower <= fit.y).all() and (fit.y <= fit.upper).all()
+
+
+def test_family_with_identical_x_is_skipped():
+    data = colliders(["e+e-", "e+e-", "e+e-", "p+p+", "p+p+", "p+p+"],
+                     [1990, 1990, 1990, 1970, 1980, 1990],
+                     [10.0, 100.0, 1000.0, 100.0, 1000.0, 10000.0])
+    fits = fit_trends(data, EnergyConfiguration, n_bootstrap=100)
+
+    assert [fit.family.name for fit in fits] == ["hadron"]
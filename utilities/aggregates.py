@@ -0,0 +1,214 @@
+"""
+Aggregates
+**********
+
+Grouped summary statistics of the catalogue, e.g. the highest center-of-mass energy
+per decade and particle type, the luminosity leader per country or the number
+of built and proposed colliders per particle type:
+
+.. code-block:: python
+
+    max_per_decade(data, Column.COM_ENERGY)
+    leaders(data, Column.LUMINOSITY, by=Column.COUNTRY)
+    status_counts(data)
+
+All statistics of a grouping are computed in one grouped pass over the
+numeric columns (:data:`STAT_COLUMNS`) and memoized by the content of the rows they use.
+They are stored as partial aggregates (count, sum, min, max and the name at the maximum),
+which can be merged: if rows were added to the catalogue, only the new rows are aggregated
+and merged into the memoized result.
+If rows were changed or removed, the statistics are recomputed.
+"""
+from dataclasses import dataclass
+from hashlib import sha1
+from typing import Dict, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from utilities.csv_reader import Column
+
+# Group keys computed from the data, in addition to the columns
+DECADE = "Decade"
+STATUS = "Status"  # "built" or "proposed"
+
+STAT_COLUMNS = (Column.COM_ENERGY, Column.LUMINOSITY, Column.LENGTH)
+PARTIAL_STATS = ("count", "sum", "min", "max", "max_name")
+
+_CACHE: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], "_Memo"] = {}
+
+
+@dataclass
+class _Memo:
+    digest: str  # combined hash of the aggregated rows
+    hashes: pd.Series  # hash per aggregated row
+    partial: pd.DataFrame
+
+
+def group_keys(data: pd.DataFrame, by: Sequence[str]) -> list:
+    """The group keys as Series, computing :data:`DECADE` and :data:`STATUS` if requested."""
+    keys = []
+    for key in by:
+        if key == DECADE:
+            keys.append((data[Column.START_YEAR] // 10 * 10).rename(DECADE))
+        elif key == STATUS:
+            keys.append(data[Column.BUILT].map({True: "built", False: "proposed"}).rename(STATUS))
+        else:
+            keys.append(data[key])
+    return keys
+
+
+def partial_aggregates(data: pd.DataFrame, by: Sequence[str], columns: Sequence[str] = STAT_COLUMNS
+                       ) -> pd.DataFrame:
+    """Mergeable aggregates of the columns per group, in one grouped pass.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+        by (Sequence[str]): Columns (or :data:`DECADE`, :data:`STATUS`) to group by.
+        columns (Sequence[str]): Numeric columns to aggregate.
+
+    Returns:
+        pd.DataFrame: One row per group, columns ``(column, stat)`` with the stats in
+        :data:`PARTIAL_STATS` and ``("rows", "count")`` for the size of the group.
+    """
+    grouped = data[list(columns)].groupby(group_keys(data, by), observed=True, sort=True)
+    partial = grouped.agg(["count", "sum", "min", "max"])
+
+    names = data[Column.NAME]
+    for column in columns:
+        valid = data[column].notna()
+        idxmax = data.loc[valid, column].groupby(group_keys(data.loc[valid], by), observed=True).idxmax()
+        partial[(column, "max_name")] = names.reindex(idxmax.to_numpy()).set_axis(idxmax.index).reindex(partial.index)
+    partial[("rows", "count")] = grouped.size()
+    return partial[[(column, stat) for column in columns for stat in PARTIAL_STATS] + [("rows", "count")]]
+
+
+def merge_partial(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Merge the partial aggregates of two disjoint sets of rows.
+
+    Args:
+        old (pd.DataFrame): Partial aggregates, see :func:`partial_aggregates`.
+        new (pd.DataFrame): Partial aggregates of other rows, with the same groups and columns.
+
+    Returns:
+        pd.DataFrame: Partial aggregates of all rows.
+    """
+    dtypes = old.dtypes
+    index = old.index.union(new.index)
+    old, new = old.reindex(index), new.reindex(index)
+    merged = pd.DataFrame(index=index, columns=old.columns)
+
+    for column in old.columns.get_level_values(0).unique():
+        if column == "rows":
+            continue
+        for stat in ("count", "sum"):
+            merged[(column, stat)] = old[(column, stat)].fillna(0) + new[(column, stat)].fillna(0)
+        merged[(column, "min")] = np.fmin(old[(column, "min")], new[(column, "min")])
+        merged[(column, "max")] = np.fmax(old[(column, "max")], new[(column, "max")])
+        new_is_max = new[(column, "max")] > old[(column, "max")]
+        new_is_max |= old[(column, "max")].isna()
+        merged[(column, "max_name")] = old[(column, "max_name")].where(~new_is_max, new[(column, "max_name")])
+    merged[("rows", "count")] = old[("rows", "count")].fillna(0) + new[("rows", "count")].fillna(0)
+    return merged.astype(dtypes)
+
+
+def grouped_statistics(data: pd.DataFrame, by: Union[str, Sequence[str]] = (DECADE, Column.TYPE),
+                       columns: Sequence[str] = STAT_COLUMNS) -> pd.DataFrame:
+    """Statistics of the columns per group, memoized by the content of the rows
+    and updated incrementally when rows are added.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+        by (str, Sequence[str]): Columns (or :data:`DECADE`, :data:`STATUS`) to group by.
+        columns (Sequence[str]): Numeric columns to aggregate.
+
+    Returns:
+        pd.DataFrame: One row per group, columns ``(column, stat)`` with the stats
+        count, sum, mean, min, max and the name of the collider at the maximum (``max_name``),
+        and ``("rows", "count")`` for the number of colliders in the group.
+    """
+    by, columns = ((by,) if isinstance(by, str) else tuple(by)), tuple(columns)
+    cache_key = (by, columns)
+    hashes = _row_hashes(data, by, columns)
+    digest = sha1(hashes.to_numpy().tobytes()).hexdigest()
+
+    memo = _CACHE.get(cache_key)
+    if memo is None or memo.digest != digest:
+        if memo is not None and _is_appended(memo.hashes, hashes):
+            added = data.loc[hashes.index.difference(memo.hashes.index)]
+            partial = merge_partial(memo.partial, partial_aggregates(added, by, columns))
+        else:
+            partial = partial_aggregates(data, by, columns)
+        memo = _CACHE[cache_key] = _Memo(digest=digest, hashes=hashes, partial=partial)
+    return _finalize(memo.partial, columns)
+
+
+def _row_hashes(data: pd.DataFrame, by: Sequence[str], columns: Sequence[str]) -> pd.Series:
+    """ Hash of the parts of each row that enter the statistics. """
+    sources = {Column.START_YEAR if key == DECADE else Column.BUILT if key == STATUS else key for key in by}
+    return pd.util.hash_pandas_object(data[sorted(sources | set(columns) | {Column.NAME})], index=True)
+
+
+def _is_appended(old: pd.Series, new: pd.Series) -> bool:
+    """ Check that all old rows are unchanged in the new data, i.e. rows were only added. """
+    return old.index.isin(new.index).all() and (new.reindex(old.index) == old).all()
+
+
+def _finalize(partial: pd.DataFrame, columns: Sequence[str]) -> pd.DataFrame:
+    """ Add the mean to the partial aggregates. """
+    result = partial.copy()
+    for column in columns:
+        count = result[(column, "count")]
+        result.insert(result.columns.get_loc((column, "sum")) + 1, (column, "mean"),
+                      result[(column, "sum")].where(count > 0) / count.where(count > 0))
+    return result
+
+
+# Reports ----------------------------------------------------------------------
+
+def max_per_decade(data: pd.DataFrame, column: str = Column.COM_ENERGY, by: str = Column.TYPE) -> pd.DataFrame:
+    """Maximum of the column per decade (rows) and group (columns),
+    e.g. the highest center-of-mass energy per decade and particle type.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+        column (str): The column, one of :data:`STAT_COLUMNS`.
+        by (str): Column to split the decades by.
+
+    Returns:
+        pd.DataFrame: The maxima, NaN where there is no collider.
+    """
+    return grouped_statistics(data, (DECADE, by))[(column, "max")].unstack(by)
+
+
+def leaders(data: pd.DataFrame, column: str = Column.LUMINOSITY, by: str = Column.COUNTRY) -> pd.DataFrame:
+    """The collider with the highest value of the column per group,
+    e.g. the luminosity leader per country.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+        column (str): The column, one of :data:`STAT_COLUMNS`.
+        by (str): Column to group by.
+
+    Returns:
+        pd.DataFrame: Name of the leader and its value per group, highest first.
+    """
+    statistics = grouped_statistics(data, by)
+    return pd.DataFrame({
+        Column.NAME: statistics[(column, "max_name")],
+        column: statistics[(column, "max")],
+    }).sort_values(column, ascending=False)
+
+
+def status_counts(data: pd.DataFrame, by: str = Column.TYPE) -> pd.DataFrame:
+    """Number of built and proposed colliders per group.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+        by (str): Column to group by.
+
+    Returns:
+        pd.DataFrame: Counts with one column per status.
+    """
+    counts = grouped_statistics(data, (by, STATUS))[("rows", "count")]
+    return counts.unstack(STATUS, fill_value=0).astype(int)
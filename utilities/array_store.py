@@ -0,0 +1,233 @@
+"""
+Array Store
+***********
+
+Memory-mapped backing store for the plot-ready numeric columns.
+
+The numeric (and boolean) columns are written once into a structured
+NumPy array on disk (``.npy`` format). Any number of processes can then open
+this file memory-mapped and read-only, so that the operating system shares
+the pages between them instead of every worker parsing the CSV and copying
+the data.
+
+The positional ``row`` field maps every record back to the row of the
+DataFrame it was created from, ``type_code`` is the index of the particle type
+in :data:`utilities.plot_helper.PARTICLE_TYPES`.
+Next to the store, the content hash of the data it was written from is kept
+(``<name>.key``), so that a store is rewritten whenever it does not match the data.
+
+The worker processes of the batch renderer and of the fact sheets receive
+their data as :class:`SharedFrame`: only the text columns are sent to the workers,
+the numeric columns are read from the store (see :func:`share_frame`).
+"""
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Union
+
+import numpy as np
+import pandas as pd
+
+from utilities.content_cache import content_hash
+from utilities.csv_reader import CSV_PATH, MAIN_DIR, Column, import_collider_data
+from utilities.plot_helper import PARTICLE_TYPES
+
+STORE_PATH = MAIN_DIR / "build" / "plot-arrays.npy"
+
+UNKNOWN_TYPE_CODE = -1
+
+ROW_FIELD = "row"
+TYPE_CODE_FIELD = "type_code"
+NUMERIC_KINDS = "biuf"  # numpy kinds of the columns stored in the array
+
+
+def numeric_columns(data: pd.DataFrame) -> List[str]:
+    """The columns of the data that are stored in the array, i.e. the numeric and boolean ones."""
+    return [column for column in data.columns 
+            if isinstance(data[column].dtype, np.dtype) and data[column].dtype.kind in NUMERIC_KINDS]
+
+
+def plot_array_dtype(data: pd.DataFrame) -> np.dtype:
+    """Structured dtype of the array of the data: the position of the row,
+    the numeric columns and the particle type code.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+
+    Returns:
+        np.dtype: The structured dtype.
+    """
+    return np.dtype(
+        [(ROW_FIELD, np.int64)] 
+        + [(column, data[column].dtype) for column in numeric_columns(data)]
+        + [(TYPE_CODE_FIELD, np.int8)]
+    )
+
+
+def type_codes(data: pd.DataFrame) -> np.ndarray:
+    """Encode the particle type of each row as the index into
+    :data:`utilities.plot_helper.PARTICLE_TYPES`.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+
+    Returns:
+        np.ndarray: Integer codes, ``UNKNOWN_TYPE_CODE`` for types not in the list.
+    """
+    shorthands = [ptype.shorthand for ptype in PARTICLE_TYPES]
+    codes = pd.Categorical(data[Column.TYPE], categories=shorthands).codes
+    return np.asarray(codes, dtype=np.int8)
+
+
+def store_key(data: pd.DataFrame) -> str:
+    """Content hash of the columns of the data that are written into the store."""
+    return content_hash(data, numeric_columns(data) + [Column.TYPE])
+
+
+def _key_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.key")
+
+
+def to_plot_array(data: pd.DataFrame) -> np.ndarray:
+    """Convert the DataFrame into the structured array of plot-ready columns.
+
+    Args:
+        data (pd.DataFrame): DataFrame as returned by :func:`utilities.csv_reader.import_collider_data`.
+
+    Returns:
+        np.ndarray: Structured array with dtype :func:`plot_array_dtype`.
+    """
+    array = np.empty(len(data), dtype=plot_array_dtype(data))
+    array[ROW_FIELD] = np.arange(len(data))
+    for column in numeric_columns(data):
+        array[column] = data[column].to_numpy()
+    array[TYPE_CODE_FIELD] = type_codes(data)
+    return array
+
+
+def write_array_store(data: pd.DataFrame = None, path: Union[Path, str] = STORE_PATH) -> Path:
+    """Write the plot-ready columns of the data into a ``.npy`` file,
+    which can be opened memory-mapped by :func:`open_array_store`.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+                             If not given, the data is loaded from the CSV.
+        path (Path, str): Path to the ``.npy`` file to write.
+
+    Returns:
+        Path: Path to the written file.
+    """
+    if data is None:
+        data = import_collider_data()
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    array = to_plot_array(data)
+
+    # write to a unique temporary file first, so that readers never see a half-written store
+    # and concurrent writers do not interfere
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        store = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=array.dtype, shape=array.shape)
+        store[:] = array
+        store.flush()
+        del store
+        Path(tmp_path).replace(path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    _key_path(path).write_text(store_key(data))
+    return path
+
+
+def open_array_store(path: Union[Path, str] = STORE_PATH) -> np.memmap:
+    """Open the array store read-only and memory-mapped.
+    Only the header is read, the data pages are loaded (and shared
+    between processes) by the operating system on access.
+
+    Args:
+        path (Path, str): Path to the ``.npy`` file.
+
+    Returns:
+        np.memmap: Structured array with dtype :func:`plot_array_dtype`.
+    """
+    return np.load(path, mmap_mode="r")
+
+
+def is_store_outdated(path: Union[Path, str] = STORE_PATH, csv_path: Union[Path, str] = CSV_PATH,
+                      data: pd.DataFrame = None) -> bool:
+    """Check whether the store needs to be (re)written, i.e. if it does not exist,
+    was written from different data (if given, see :func:`store_key`)
+    or is older than the CSV file (otherwise).
+
+    Args:
+        path (Path, str): Path to the ``.npy`` file.
+        csv_path (Path, str): Path to the CSV file the store is created from.
+        data (pd.DataFrame): Data the store should contain.
+
+    Returns:
+        bool: True if the store needs to be written.
+    """
+    path = Path(path)
+    if not path.is_file():
+        return True
+    if data is not None:
+        key_path = _key_path(path)
+        return not key_path.is_file() or key_path.read_text() != store_key(data)
+    return path.stat().st_mtime < Path(csv_path).stat().st_mtime
+
+
+def load_array_store(path: Union[Path, str] = STORE_PATH, data: pd.DataFrame = None) -> np.memmap:
+    """Open the array store, writing it first if it is outdated.
+
+    Args:
+        path (Path, str): Path to the ``.npy`` file.
+        data (pd.DataFrame): Data to write, in case the store needs updating.
+                             If not given, the data is loaded from the CSV.
+
+    Returns:
+        np.memmap: Structured array with dtype :func:`plot_array_dtype`.
+    """
+    if is_store_outdated(path, data=data):
+        write_array_store(data, path)
+    return open_array_store(path)
+
+
+# Sharing with worker processes ------------------------------------------------
+
+@dataclass
+class SharedFrame:
+    """Picklable handle to a DataFrame whose numeric columns are in an array store."""
+    path: Path  # the array store
+    columns: List[str]  # all columns, in order
+    other: pd.DataFrame  # the columns not in the store, with the index and attrs of the data
+
+    def open(self) -> pd.DataFrame:
+        """Assemble the DataFrame, with the numeric columns as read-only views 
+        into the memory-mapped store."""
+        store = open_array_store(self.path)
+        index = self.other.index
+        # columns as Series, so that pandas keeps them as separate blocks instead of copying them into one
+        columns = {column: pd.Series(np.asarray(store[column]), index=index, copy=False) if column in store.dtype.names
+                   else self.other[column] for column in self.columns}
+        data = pd.DataFrame(columns, index=index, copy=False)
+        data.attrs.update(self.other.attrs)
+        return data
+
+
+def share_frame(data: pd.DataFrame, path: Union[Path, str]) -> SharedFrame:
+    """Write the numeric columns of the data into an array store, to pass the data 
+    to worker processes as :class:`SharedFrame` (see :meth:`SharedFrame.open`).
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the (modified) accelerator timeline data.
+        path (Path, str): Path to the ``.npy`` file to write.
+
+    Returns:
+        SharedFrame: The handle to the data.
+    """
+    stored = set(numeric_columns(data))
+    other = data[[column for column in data.columns if column not in stored]]
+    return SharedFrame(path=write_array_store(data, path), columns=list(data.columns), other=other)
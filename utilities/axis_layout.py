@@ -0,0 +1,153 @@
+"""
+Axis Layout
+***********
+
+Precomputed axis layouts (limits, major and minor ticks, tick-label format)
+for both plotting backends.
+The layouts only depend on the scale and the range of the data,
+so they are computed once per data range and cached.
+
+Log-scaled axes get a major tick per decade and minor ticks at 2-9.
+Linear axes of years get a major tick every 10 and a minor tick every 1,
+other linear axes a major step of 1, 2 or 5 times a power of ten, giving at most
+:data:`MAX_MAJOR_TICKS` major ticks, and minor ticks subdividing it.
+Columns without any (positive, for log-scale) values get the default range of matplotlib.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utilities.csv_reader import Column
+from utilities.plot_helper import PlotConfiguration
+
+LOG_SCALE = "log"
+LINEAR_SCALE = "linear"
+
+MARGIN = 0.05  # fraction of the data range added on both sides, as matplotlib's default
+YEAR_COLUMNS = (Column.START_YEAR, Column.END_YEAR)
+YEAR_MAJOR_STEP = 10
+YEAR_MINOR_STEP = 1
+MAX_MAJOR_TICKS = 10
+MINOR_DIVISIONS = {1: 5, 2: 4, 5: 5}  # minor ticks per major step, by the leading digit of the step
+LOG_MINOR_SUBS = tuple(range(2, 10))
+DEFAULT_RANGES = {LINEAR_SCALE: (0., 1.), LOG_SCALE: (1., 10.)}  # for columns without values
+
+
+@dataclass(frozen=True)
+class AxisLayout:
+    scale: str  # LOG_SCALE or LINEAR_SCALE
+    limits: Tuple[float, float]
+    major_ticks: Tuple[float, ...]
+    minor_ticks: Tuple[float, ...]
+    major_step: float  # in units of the axis, i.e. decades for log-scale
+    minor_step: Optional[float]  # in units of the axis, None for log-scale (minor ticks at 2-9 per decade)
+    tick_format: str  # "power" for 10^n labels, "plain" for numbers
+
+    @property
+    def is_log(self) -> bool:
+        return self.scale == LOG_SCALE
+
+
+def linear_steps(low: float, high: float) -> Tuple[float, float]:
+    """Major and minor step for a linear axis: the smallest major step of 1, 2 or 5
+    times a power of ten that gives at most :data:`MAX_MAJOR_TICKS` major ticks.
+
+    Args:
+        low (float): Lower limit of the axis.
+        high (float): Upper limit of the axis.
+
+    Returns:
+        Tuple[float, float]: Major and minor step.
+    """
+    magnitude = 10**np.floor(np.log10((high - low) / MAX_MAJOR_TICKS))
+    for digit in (1, 2, 5, 10):
+        if (high - low) / (digit * magnitude) <= MAX_MAJOR_TICKS:
+            break
+    digit, magnitude = (1, magnitude * 10) if digit == 10 else (digit, magnitude)
+    major = float(digit * magnitude)
+    return major, major / MINOR_DIVISIONS[digit]
+
+
+@lru_cache(maxsize=None)
+def compute_axis_layout(scale: str, vmin: float, vmax: float, 
+                        major_step: float = None, minor_step: float = None) -> AxisLayout:
+    """Compute the layout of an axis for the given data range.
+    Cached, so the layout for a range is only computed once.
+
+    Args:
+        scale (str): LOG_SCALE or LINEAR_SCALE.
+        vmin (float): Minimum of the data.
+        vmax (float): Maximum of the data.
+        major_step (float): Major step of a linear axis. Defaults to :func:`linear_steps`.
+        minor_step (float): Minor step of a linear axis. Defaults to :func:`linear_steps`.
+
+    Returns:
+        AxisLayout: The axis layout.
+    """
+    if scale == LOG_SCALE:
+        low, high = np.log10(vmin), np.log10(vmax)
+    else:
+        low, high = vmin, vmax
+
+    margin = (high - low) * MARGIN or 0.5
+    low, high = low - margin, high + margin
+
+    if scale == LOG_SCALE:
+        decades = np.arange(np.floor(low), np.ceil(high) + 1)
+        major = 10**decades
+        minor = np.outer(major, LOG_MINOR_SUBS).ravel()
+        limits = (10**low, 10**high)
+        step, minor_step, tick_format = 1, None, "power"
+    else:
+        if major_step is None or minor_step is None:
+            major_step, minor_step = linear_steps(low, high)
+        major = _multiples(major_step, low, high)
+        minor = _multiples(minor_step, low, high)
+        limits = (low, high)
+        step, tick_format = major_step, "plain"
+
+    return AxisLayout(
+        scale=scale,
+        limits=(float(limits[0]), float(limits[1])),
+        major_ticks=_in_limits(major, limits),
+        minor_ticks=_in_limits(np.setdiff1d(minor, major), limits),
+        major_step=step,
+        minor_step=minor_step,
+        tick_format=tick_format,
+    )
+
+
+def _multiples(step: float, low: float, high: float) -> np.ndarray:
+    """ Multiples of the step between low and high, rounded to remove floating point noise. """
+    return np.round(np.arange(np.ceil(low / step), np.floor(high / step) + 1) * step, 12) + 0.  # no -0.
+
+
+def _in_limits(ticks: np.ndarray, limits: Tuple[float, float]) -> Tuple[float, ...]:
+    return tuple(float(tick) for tick in ticks if limits[0] <= tick <= limits[1])
+
+
+def get_axis_layouts(data: pd.DataFrame, configuration: PlotConfiguration) -> Tuple[AxisLayout, AxisLayout]:
+    """Get the x- and y-axis layouts for the data plotted with the given configuration.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the (modified) accelerator timeline data.
+        configuration (PlotConfiguration): See :class:`utilities.plot_helper.PlotConfiguration`
+
+    Returns:
+        Tuple[AxisLayout, AxisLayout]: Layouts of the x- and y-axis.
+    """
+    layouts = []
+    for axis, column in (("x", configuration.xcolumn), ("y", configuration.ycolumn)):
+        scale = LOG_SCALE if axis in configuration.logscale else LINEAR_SCALE
+        values = data[column].to_numpy(dtype=float)
+        valid = np.isfinite(values)
+        if scale == LOG_SCALE:
+            valid &= values > 0
+        values = values[valid]
+        vmin, vmax = (values.min(), values.max()) if len(values) else DEFAULT_RANGES[scale]
+        steps = (YEAR_MAJOR_STEP, YEAR_MINOR_STEP) if column in YEAR_COLUMNS and scale == LINEAR_SCALE else ()
+        layouts.append(compute_axis_layout(scale, float(vmin), float(vmax), *steps))
+    return tuple(layouts)
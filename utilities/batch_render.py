@@ -0,0 +1,414 @@
+"""
+Batch Render
+************
+
+Headless command line interface to render many chart variants,
+as defined in a manifest file (YAML, TOML or JSON), e.g.:
+
+.. code-block:: yaml
+
+    output_dir: images/variants
+    datasets:
+      main: accelerator-parameters.csv
+    configurations:
+      - name: length
+        xcolumn: Start
+        ycolumn: Length
+        ylabel: "Length [m]"
+        logscale: y
+    filters:
+      built: "Built"
+      leptons: "Type in ['e+e-', 'e-e-', 'mu+mu-']"
+    jobs:
+      - configuration: [energy, luminosity, luminosity-vs-energy]
+        filter: [null, built, leptons]
+        backend: [matplotlib, plotly]
+        formats: [pdf, png]
+      - name: "{configuration}-preview"
+        backend: svg
+        formats: [svg]
+      - name: energy-trends
+        configuration: energy
+        options: {trends: true}
+      - name: "{configuration}-as-of-{as_of}"
+        as_of: [1990, 2000, 2010]
+        filter: built
+      - configuration: dashboard
+        backend: [matplotlib, plotly]
+
+Additional chart types can be declared in the ``configurations`` section
+(see :meth:`utilities.plot_helper.PlotConfiguration.from_dict`).
+Every field of a job can be a single value or a list, in which case one job
+per combination is created. Missing fields are taken from the ``defaults``
+section of the manifest or from :data:`JOB_DEFAULTS`.
+The ``name`` is formatted with the job fields and used as file name.
+The configuration ``dashboard`` renders all registered charts into one figure.
+The ``svg`` backend writes SVG files without any plotting library
+(see :mod:`utilities.svg_renderer`), it supports neither the dashboard nor other formats.
+With ``as_of`` the charts show the landscape as seen from the given years
+(see :func:`utilities.csv_reader.as_of_views`), default is the current year:
+colliders starting later are drawn as not built, so that the ``built`` filter
+only keeps the colliders that were running or finished by then.
+
+Run the rendering from the root of this repository via::
+
+    python -m utilities.batch_render render manifest.yaml --workers 8
+
+Shared work is done only once: each dataset is loaded once, classified for
+all as-of years in one pass and each filter applied once in the main process, and jobs that only differ in name or output format
+share a single figure.
+The figures are rendered in a pool of worker processes, which read the numeric
+columns from memory-mapped array stores (see :mod:`utilities.array_store`), and the time
+per job is reported. All files are written byte-reproducibly
+(see :mod:`utilities.reproducible_export`).
+"""
+import argparse
+import itertools
+import json
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+import pandas as pd
+
+from utilities.array_store import SharedFrame, share_frame
+from utilities.csv_reader import CSV_PATH, MAIN_DIR, as_of_views, import_collider_data
+from utilities.plot_helper import CONFIGURATIONS, PlotConfiguration, assign_textposition, register_configuration
+from utilities.reproducible_export import savefig, write_bytes, write_image
+
+MAIN_DATASET = "main"
+BACKENDS = ("matplotlib", "plotly", "svg")
+DASHBOARD = "dashboard"  # configuration name for all registered charts in one figure
+
+JOB_DEFAULTS = {
+    "name": "{dataset}-{filter}-{configuration}-{backend}",
+    "dataset": MAIN_DATASET,
+    "filter": None,
+    "as_of": None,
+    "configuration": list(CONFIGURATIONS),
+    "backend": "matplotlib",
+    "formats": ["pdf", "png"],
+    "options": {},
+}
+EXPANDED_FIELDS = ("dataset", "as_of", "filter", "configuration", "backend")
+
+# Filtered data per (dataset, as_of, filter) in the worker processes
+_WORKER_DATA: Dict[Tuple[str, int, str], pd.DataFrame] = {}
+
+
+@dataclass(frozen=True)
+class RenderJob:
+    """A single figure to render. Hashable, to identify shared figures."""
+    dataset: str
+    as_of: int
+    filter: str
+    configuration: str
+    backend: str
+    options: Tuple[Tuple[str, Any], ...]
+
+
+@dataclass
+class JobOutput:
+    name: str
+    stem: Path  # output path without suffix
+    formats: Sequence[str]
+
+
+@dataclass
+class JobResult:
+    job: RenderJob
+    outputs: List[JobOutput]
+    paths: List[Path]
+    seconds: float
+
+
+# Manifest ---------------------------------------------------------------------
+
+def load_manifest(path: Path) -> dict:
+    """Load the manifest from a YAML, TOML or JSON file.
+
+    Args:
+        path (Path): Path to the manifest.
+
+    Returns:
+        dict: The manifest.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError("Reading YAML manifests requires 'pyyaml' to be installed.") from e
+        return yaml.safe_load(path.read_text())
+
+    if suffix == ".toml":
+        try:
+            import tomllib
+        except ImportError:  # python < 3.11
+            try:
+                import tomli as tomllib
+            except ImportError as e:
+                raise ImportError("Reading TOML manifests requires python >= 3.11 or 'tomli' to be installed.") from e
+        return tomllib.loads(path.read_text())
+
+    if suffix == ".json":
+        return json.loads(path.read_text())
+
+    raise ValueError(f"Unknown manifest format '{suffix}'. Use YAML, TOML or JSON.")
+
+
+def register_configurations(manifest: dict) -> List[PlotConfiguration]:
+    """Register the configurations declared in the manifest.
+
+    Args:
+        manifest (dict): The manifest.
+
+    Returns:
+        List[PlotConfiguration]: The registered configurations.
+    """
+    return [register_configuration(definition) for definition in manifest.get("configurations", [])]
+
+
+def expand_jobs(manifest: dict, output_dir: Path) -> Dict[RenderJob, List[JobOutput]]:
+    """Expand the job definitions of the manifest into the figures to render.
+    Jobs resulting in the same figure are merged.
+
+    Args:
+        manifest (dict): The manifest.
+        output_dir (Path): Directory to write the files into.
+
+    Returns:
+        Dict[RenderJob, List[JobOutput]]: The outputs to write per figure.
+    """
+    defaults = {**JOB_DEFAULTS, **manifest.get("defaults", {})}
+    datasets = manifest.get("datasets", {MAIN_DATASET: None})
+    filters = manifest.get("filters", {})
+
+    jobs: Dict[RenderJob, List[JobOutput]] = {}
+    names = set()
+    for definition in manifest.get("jobs", [{}]):
+        definition = {**defaults, **definition}
+        values = [_as_list(definition[field]) for field in EXPANDED_FIELDS]
+
+        for combination in itertools.product(*values):
+            fields = dict(zip(EXPANDED_FIELDS, combination))
+            _check_job(fields, _as_list(definition["formats"]), datasets, filters)
+
+            name = definition["name"].format(**{k: v or "all" for k, v in fields.items()})
+            if name in names:
+                raise ValueError(f"Job name '{name}' is not unique.")
+            names.add(name)
+
+            job = RenderJob(options=tuple(sorted(definition["options"].items())), **fields)
+            output = JobOutput(name=name, stem=output_dir / name, formats=_as_list(definition["formats"]))
+            jobs.setdefault(job, []).append(output)
+    return jobs
+
+
+def _as_list(value) -> list:
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def _check_job(fields: dict, formats: List[str], datasets: dict, filters: dict) -> None:
+    if fields["dataset"] not in datasets:
+        raise ValueError(f"Unknown dataset '{fields['dataset']}'.")
+    if fields["filter"] is not None and fields["filter"] not in filters:
+        raise ValueError(f"Unknown filter '{fields['filter']}'.")
+    if fields["configuration"] not in CONFIGURATIONS and fields["configuration"] != DASHBOARD:
+        raise ValueError(f"Unknown configuration '{fields['configuration']}'. "
+                         f"Use one of {list(CONFIGURATIONS) + [DASHBOARD]}.")
+    if fields["backend"] not in BACKENDS:
+        raise ValueError(f"Unknown backend '{fields['backend']}'. Use one of {BACKENDS}.")
+    if fields["backend"] == "svg" and (fields["configuration"] == DASHBOARD or set(formats) - {"svg"}):
+        raise ValueError("The svg backend only renders single charts into the svg format.")
+
+
+def load_datasets(manifest: dict, jobs: Sequence[RenderJob], base_dir: Path = MAIN_DIR
+                  ) -> Dict[Tuple[str, int, str], pd.DataFrame]:
+    """Load every dataset once, create the views for all as-of years in one pass
+    and apply every filter needed by the jobs once.
+
+    Args:
+        manifest (dict): The manifest.
+        jobs (Sequence[RenderJob]): The jobs to render.
+        base_dir (Path): Directory relative dataset paths are resolved from.
+
+    Returns:
+        Dict[Tuple[str, int, str], pd.DataFrame]: Data per (dataset, as_of, filter).
+    """
+    datasets = manifest.get("datasets", {MAIN_DATASET: None})
+    filters = manifest.get("filters", {})
+
+    loaded = {}
+    for name in sorted({job.dataset for job in jobs}):
+        path = CSV_PATH if datasets[name] is None else base_dir / datasets[name]
+        data = assign_textposition(import_collider_data(path))
+        loaded[(name, None)] = data
+
+        as_of_years = sorted({job.as_of for job in jobs if job.dataset == name and job.as_of is not None})
+        for as_of, view in as_of_views(data, as_of_years).items():
+            loaded[(name, as_of)] = view
+
+    return {
+        (job.dataset, job.as_of, job.filter):
+            loaded[(job.dataset, job.as_of)] if job.filter is None 
+            else loaded[(job.dataset, job.as_of)].query(filters[job.filter])
+        for job in jobs
+    }
+
+
+# Rendering --------------------------------------------------------------------
+
+def _init_worker(data: Dict[Tuple[str, int, str], Union[pd.DataFrame, SharedFrame]], 
+                 configurations: List[PlotConfiguration]) -> None:
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib import pyplot as plt
+    plt.style.use(MAIN_DIR / "utilities" / "chart.mplstyle")
+
+    for key, frame in data.items():
+        _WORKER_DATA[key] = frame.open() if isinstance(frame, SharedFrame) else frame
+    for configuration in configurations:
+        register_configuration(configuration)
+
+
+def render_job(job: RenderJob, outputs: List[JobOutput]) -> JobResult:
+    """Create the figure of the job once and write all its outputs.
+    Needs to run in a process initialized with the data.
+
+    Args:
+        job (RenderJob): The figure to render.
+        outputs (List[JobOutput]): Files to write the figure to.
+
+    Returns:
+        JobResult: The written paths and the time it took.
+    """
+    start = time.perf_counter()
+    data = _WORKER_DATA[(job.dataset, job.as_of, job.filter)]
+    options = dict(job.options)
+
+    paths = []
+    if job.backend == "matplotlib":
+        from matplotlib import pyplot as plt
+        from export_charts import plot, plot_dashboard
+
+        if job.configuration == DASHBOARD:
+            fig = plot_dashboard(data, **options)
+        else:
+            fig = plot(data, CONFIGURATIONS[job.configuration], **options)
+        for output in outputs:
+            for fmt in output.formats:
+                paths.append(output.stem.with_name(f"{output.stem.name}.{fmt}"))
+                savefig(fig, paths[-1], format=fmt)
+        plt.close(fig)
+    elif job.backend == "svg":
+        from utilities.scene import build_scene
+        from utilities.svg_renderer import render_scene
+
+        svg = render_scene(build_scene(data, CONFIGURATIONS[job.configuration], **options)).encode()
+        for output in outputs:
+            paths.append(output.stem.with_name(f"{output.stem.name}.svg"))
+            write_bytes(paths[-1], svg)
+    else:
+        from utilities.plotly_charts import plot, plot_dashboard, write_dashboard_html
+
+        if job.configuration == DASHBOARD:
+            fig = plot_dashboard(data, **options)
+        else:
+            fig = plot(data, CONFIGURATIONS[job.configuration], **options)
+        for output in outputs:
+            for fmt in output.formats:
+                paths.append(output.stem.with_name(f"{output.stem.name}.{fmt}"))
+                if fmt == "html" and job.configuration == DASHBOARD:
+                    write_dashboard_html(fig, paths[-1])
+                elif fmt == "html":
+                    fig.write_html(paths[-1], include_plotlyjs="cdn")
+                else:
+                    write_image(fig, paths[-1], format=fmt)
+
+    return JobResult(job=job, outputs=outputs, paths=paths, seconds=time.perf_counter() - start)
+
+
+def render(manifest: dict, output_dir: Path = None, workers: int = None,
+           base_dir: Path = MAIN_DIR) -> List[JobResult]:
+    """Render all jobs of the manifest.
+
+    Args:
+        manifest (dict): The manifest.
+        output_dir (Path): Directory to write the files into.
+                           Defaults to the ``output_dir`` of the manifest.
+        workers (int): Number of worker processes. Defaults to the number of CPUs.
+        base_dir (Path): Directory relative paths in the manifest are resolved from.
+
+    Returns:
+        List[JobResult]: The results of all jobs, in order of completion.
+    """
+    if output_dir is None:
+        output_dir = base_dir / manifest.get("output_dir", "images")
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    configurations = register_configurations(manifest)
+    jobs = expand_jobs(manifest, output_dir)
+    data = load_datasets(manifest, list(jobs), base_dir)
+
+    if workers == 1:
+        _init_worker(data, configurations)
+        return [render_job(job, outputs) for job, outputs in jobs.items()]
+
+    # the workers read the numeric columns from memory-mapped stores, shared by the OS
+    with tempfile.TemporaryDirectory(prefix="batch-render-") as store_dir:
+        shared = {key: share_frame(frame, Path(store_dir) / f"{idx}.npy") 
+                  for idx, (key, frame) in enumerate(data.items())}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, 
+                                 initargs=(shared, configurations)) as executor:
+            return list(executor.map(render_job, jobs.keys(), jobs.values()))
+
+
+# Command Line -----------------------------------------------------------------
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m utilities.batch_render",
+        description="Render accelerator timeline charts in batch.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    render_parser = subparsers.add_parser("render", help="Render all jobs of a manifest.")
+    render_parser.add_argument("manifest", type=Path, help="Path to the manifest (YAML, TOML or JSON).")
+    render_parser.add_argument("--output-dir", type=Path, help="Overwrite the output directory of the manifest.")
+    render_parser.add_argument("--workers", type=int, help="Number of worker processes (default: number of CPUs).")
+    render_parser.add_argument("--dry-run", action="store_true", help="Only list the files that would be written.")
+    return parser
+
+
+def main(args: Sequence[str] = None) -> None:
+    opt = get_parser().parse_args(args)
+    manifest = load_manifest(opt.manifest)
+    base_dir = opt.manifest.parent.absolute()
+
+    if opt.dry_run:
+        register_configurations(manifest)
+        output_dir = opt.output_dir or base_dir / manifest.get("output_dir", "images")
+        for outputs in expand_jobs(manifest, Path(output_dir)).values():
+            for output in outputs:
+                for fmt in output.formats:
+                    print(f"{output.stem}.{fmt}")
+        return
+
+    start = time.perf_counter()
+    results = render(manifest, opt.output_dir, opt.workers, base_dir)
+    for result in results:
+        names = ", ".join(output.name for output in result.outputs)
+        print(f"{result.seconds:8.2f}s  {names} ({len(result.paths)} files)")
+    print(f"Rendered {len(results)} figures into {sum(len(r.paths) for r in results)} files "
+          f"in {time.perf_counter() - start:.2f}s.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+Catalogue Database
+******************
+
+Optional SQLite store of the processed catalogue, for catalogues too large
+to be parsed and processed on every run.
+
+The CSV is processed once (see :func:`utilities.csv_reader.import_collider_data`)
+and bulk-loaded in a single transaction with a prepared statement,
+including the computed columns (``CoMEnergy``, ``Built``, ``Future``, ``Years``).
+The columns ``Type``, ``Start``, ``Country`` and ``Name`` are indexed, so that
+filtered subsets only read the matching rows from disk:
+
+.. code-block:: python
+
+    data = load_catalogue(types=["e+e-"], start=(1990, None))
+    fig = plot(assign_textposition(data), EnergyConfiguration)
+
+The loaded DataFrames have the same shape, dtypes, index and ``attrs``
+as the ones returned by :func:`utilities.csv_reader.import_collider_data`.
+
+Build the database of a catalogue from the root of this repository via::
+
+    python -m utilities.catalogue_db accelerator-parameters.csv --output build/catalogue.sqlite
+
+"""
+import argparse
+import sqlite3
+import sys
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from utilities.csv_reader import (AS_OF_ATTR, COLLIDERS, CSV_PATH, KIND_ATTR, MAIN_DIR, VERSION_ATTR, Column,
+                                  catalogue_version, classify_as_of, import_collider_data)
+
+DB_PATH = MAIN_DIR / "build" / "catalogue.sqlite"
+TABLE = "colliders"
+META_TABLE = "meta"
+ROW = "row"  # index of the DataFrame, i.e. the row in the CSV
+
+SCHEMA = {  # column -> SQLite type, in the order of the processed data
+    Column.NAME: "TEXT",
+    Column.INSTITUTE: "TEXT",
+    Column.COUNTRY: "TEXT",
+    Column.START_YEAR: "INTEGER",
+    Column.END_YEAR: "REAL",
+    Column.TYPE: "TEXT",
+    Column.ENERGY: "REAL",
+    Column.ENERGY_B2: "REAL",
+    Column.LUMINOSITY: "REAL",
+    Column.LENGTH: "REAL",
+    Column.REFERENCES: "TEXT",
+    Column.COM_ENERGY: "REAL",
+    Column.BUILT: "INTEGER",
+    Column.FUTURE: "INTEGER",
+    Column.YEARS: "TEXT",
+}
+DTYPES = {"INTEGER": "int64", "REAL": "float64"}
+BOOL_COLUMNS = (Column.BUILT, Column.FUTURE)
+INDEXED_COLUMNS = (Column.TYPE, Column.START_YEAR, Column.COUNTRY, Column.NAME)
+
+
+def _quote(column: str) -> str:
+    return '"{}"'.format(column.replace('"', '""'))
+
+
+# Writing ----------------------------------------------------------------------
+
+def write_catalogue(data: pd.DataFrame = None, path: Union[Path, str] = DB_PATH,
+                    csv_path: Union[Path, str] = CSV_PATH) -> Path:
+    """Write the processed data into a new SQLite database.
+    All rows are inserted in one transaction, the indexes are created afterwards.
+
+    Args:
+        data (pd.DataFrame): Processed data, as returned by :func:`utilities.csv_reader.import_collider_data`.
+                             If not given, the data is loaded from the CSV.
+        path (Path, str): Path to the database to write.
+        csv_path (Path, str): CSV file to load the data from, if not given.
+
+    Returns:
+        Path: Path to the written database.
+    """
+    if data is None:
+        data = import_collider_data(csv_path)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # write to a temporary file first, so that readers never see a half-written database
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    columns = [ROW] + list(SCHEMA)
+    rows = data[list(SCHEMA)].itertuples(index=True, name=None)
+
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.execute("PRAGMA journal_mode = OFF")  # the file is replaced atomically instead
+        connection.execute("PRAGMA synchronous = OFF")
+        with connection:
+            definitions = ", ".join(f"{_quote(column)} {sql_type}" for column, sql_type in SCHEMA.items())
+            connection.execute(f"CREATE TABLE {TABLE} ({_quote(ROW)} INTEGER PRIMARY KEY, {definitions})")
+            connection.executemany(
+                f"INSERT INTO {TABLE} VALUES ({', '.join('?' * len(columns))})", rows
+            )
+            for column in INDEXED_COLUMNS:
+                connection.execute(f"CREATE INDEX {_quote('idx_' + column)} ON {TABLE} ({_quote(column)})")
+
+            connection.execute(f"CREATE TABLE {META_TABLE} (key TEXT PRIMARY KEY, value TEXT)")
+            connection.executemany(f"INSERT INTO {META_TABLE} VALUES (?, ?)", [
+                (VERSION_ATTR, catalogue_version(data)),
+                (AS_OF_ATTR, str(data.attrs.get(AS_OF_ATTR, ""))),
+                (KIND_ATTR, data.attrs.get(KIND_ATTR, COLLIDERS)),
+            ])
+    finally:
+        connection.close()
+    tmp_path.replace(path)
+    return path
+
+
+def is_catalogue_outdated(path: Union[Path, str] = DB_PATH, csv_path: Union[Path, str] = CSV_PATH) -> bool:
+    """Check whether the database needs to be (re)written, i.e. if it does not exist
+    or is older than the CSV file.
+
+    Args:
+        path (Path, str): Path to the database.
+        csv_path (Path, str): Path to the CSV file the database is created from.
+
+    Returns:
+        bool: True if the database needs to be written.
+    """
+    path = Path(path)
+    return not path.is_file() or path.stat().st_mtime < Path(csv_path).stat().st_mtime
+
+
+# Reading ----------------------------------------------------------------------
+
+def build_query(types: Sequence[str] = None, countries: Sequence[str] = None, names: Sequence[str] = None,
+                start: Tuple[Optional[int], Optional[int]] = None, built: bool = None,
+                where: str = None, params: Sequence = ()) -> Tuple[str, List]:
+    """Build the SQL query of the rows matching all given filters.
+
+    Args:
+        types (Sequence[str]): Particle types, e.g. ``["e+e-", "p+p+"]``.
+        countries (Sequence[str]): Countries.
+        names (Sequence[str]): Names of the colliders.
+        start (Tuple): Window ``(first, last)`` of the start year, ``None`` for open ends.
+        built (bool): Only built (``True``) or only not built (``False``) colliders.
+        where (str): Additional SQL condition, with ``?`` placeholders for the ``params``.
+        params (Sequence): Parameters of the additional condition.
+
+    Returns:
+        Tuple[str, List]: The query and its parameters.
+    """
+    conditions, values = [], []
+    for column, accepted in ((Column.TYPE, types), (Column.COUNTRY, countries), (Column.NAME, names)):
+        if accepted is not None:
+            accepted = list(accepted)
+            conditions.append(f"{_quote(column)} IN ({', '.join('?' * len(accepted))})")
+            values += accepted
+
+    first, last = start or (None, None)
+    if first is not None:
+        conditions.append(f"{_quote(Column.START_YEAR)} >= ?")
+        values.append(int(first))
+    if last is not None:
+        conditions.append(f"{_quote(Column.START_YEAR)} <= ?")
+        values.append(int(last))
+
+    if built is not None:
+        conditions.append(f"{_quote(Column.BUILT)} = ?")
+        values.append(int(built))
+
+    if where is not None:
+        conditions.append(f"({where})")
+        values += list(params)
+
+    query = f"SELECT * FROM {TABLE}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    return query + f" ORDER BY {_quote(ROW)}", values
+
+
+def read_meta(connection: sqlite3.Connection) -> Dict[str, str]:
+    """Read the metadata of the database, i.e. the catalogue version, the as-of year and the kind of data."""
+    return dict(connection.execute(f"SELECT key, value FROM {META_TABLE}").fetchall())
+
+
+def load_catalogue(path: Union[Path, str] = DB_PATH, csv_path: Optional[Union[Path, str]] = CSV_PATH,
+                   as_of: int = None, **filters) -> pd.DataFrame:
+    """Load the (filtered) data from the database, writing the database first
+    if it is outdated (see :func:`is_catalogue_outdated`).
+
+    Args:
+        path (Path, str): Path to the database.
+        csv_path (Path, str): CSV file the database is created from.
+                              ``None`` to use the database as is.
+        as_of (int): Year to evaluate which colliders are in the future.
+                     Defaults to the current year, as when reading the CSV.
+        filters: Filters of the rows, see :func:`build_query`.
+
+    Returns:
+        pd.DataFrame: The data, in the same format as returned by
+        :func:`utilities.csv_reader.import_collider_data`.
+    """
+    if csv_path is not None and is_catalogue_outdated(path, csv_path):
+        write_catalogue(path=path, csv_path=csv_path)
+
+    query, params = build_query(**filters)
+    with closing(sqlite3.connect(f"file:{Path(path)}?mode=ro", uri=True)) as connection:
+        data = pd.read_sql_query(query, connection, params=params, index_col=ROW)
+        meta = read_meta(connection)
+
+    data.index.name = None
+    for column, sql_type in SCHEMA.items():
+        if column in BOOL_COLUMNS:
+            data[column] = data[column].astype(bool)
+        elif sql_type in DTYPES:
+            data[column] = data[column].astype(DTYPES[sql_type])
+    data.attrs[VERSION_ATTR] = meta[VERSION_ATTR]
+    data.attrs[AS_OF_ATTR] = int(meta[AS_OF_ATTR])
+    data.attrs[KIND_ATTR] = meta.get(KIND_ATTR, COLLIDERS)  # not stored by older versions
+
+    if as_of is None:
+        as_of = datetime.now().year
+    if as_of != data.attrs[AS_OF_ATTR]:
+        future, years = classify_as_of(data, [as_of])
+        data[Column.FUTURE] = future[as_of]
+        data[Column.YEARS] = years[as_of]
+        data.attrs[AS_OF_ATTR] = as_of
+    return data
+
+
+# Script Mode ------------------------------------------------------------------
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Bulk-load the accelerator catalogue into an indexed SQLite database."
+    )
+    parser.add_argument("csv", nargs="?", type=Path, default=CSV_PATH,
+                        help="CSV file of the catalogue. Defaults to the catalogue of this repository.")
+    parser.add_argument("--output", type=Path, default=DB_PATH,
+                        help="Path of the database to write.")
+    parser.add_argument("--as-of", type=int, default=None,
+                        help="Year to evaluate which colliders are in the future. Defaults to the current year.")
+    return parser
+
+
+def main(args: Sequence[str] = None) -> int:
+    opts = get_parser().parse_args(args)
+    data = import_collider_data(opts.csv, as_of=opts.as_of)
+    path = write_catalogue(data, opts.output)
+    print(f"Wrote {len(data)} colliders into {path}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
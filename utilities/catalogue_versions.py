@@ -0,0 +1,291 @@
+"""
+Catalogue Versions
+******************
+
+Versioned snapshots of the catalogue with row-level diffs.
+
+Rows are identified by their ``Name``. For each version, the raw data, a hash
+per row and the processed data (see :func:`utilities.csv_reader.process_collider_data`
+and :func:`utilities.plot_helper.assign_textposition`) are stored.
+When a new version is added, only the added and changed rows are processed,
+all other rows are taken from the processed data of the previous version.
+
+The history of the catalogue can be queried, e.g. what changed since a given version:
+
+.. code-block:: python
+
+    store = CatalogueStore()
+    store.add()  # snapshot of the current CSV file
+    for diff in store.changes_since(version):
+        print(diff)
+
+"""
+import json
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from hashlib import sha1
+from pathlib import Path
+from typing import List, Union
+
+import pandas as pd
+
+from utilities.csv_reader import (AS_OF_ATTR, MAIN_DIR, VERSION_ATTR, Column, catalogue_version,
+                                  process_collider_data, read_raw_data)
+from utilities.plot_helper import (DEFAULT_TEXT_POSITION, SPECIAL_ORIENTATION_ENERGY,
+                                   SPECIAL_ORIENTATION_LUMI, SPECIAL_ORIENTATION_LUMI_ENERGY,
+                                   assign_textposition)
+
+VERSIONS_DIR = MAIN_DIR / "build" / "catalogue-versions"
+INDEX_FILE = "index.json"
+
+RAW_COLUMNS = [
+    Column.NAME, Column.INSTITUTE, Column.COUNTRY, Column.START_YEAR, Column.END_YEAR, Column.TYPE,
+    Column.ENERGY, Column.ENERGY_B2, Column.LUMINOSITY, Column.LENGTH, Column.REFERENCES,
+]
+
+# attrs of the processed data, which need to match for an incremental update
+TEXTPOSITION_ATTR = "textposition_key"
+
+
+@dataclass
+class VersionInfo:
+    version: str
+    timestamp: str
+    n_rows: int
+
+
+@dataclass
+class CatalogueDiff:
+    old_version: str
+    new_version: str
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def __str__(self) -> str:
+        return (f"{self.old_version} -> {self.new_version}: "
+                f"added {self.added}, removed {self.removed}, changed {self.changed}")
+
+
+# Diffs ------------------------------------------------------------------------
+
+def row_hashes(raw: pd.DataFrame) -> pd.Series:
+    """Hash of the content of every row, indexed by name.
+
+    Args:
+        raw (pd.DataFrame): Raw data, as read by :func:`utilities.csv_reader.read_raw_data`.
+
+    Returns:
+        pd.Series: Hashes indexed by name.
+    """
+    names = raw[Column.NAME]
+    duplicates = names[names.duplicated()]
+    if len(duplicates):
+        raise ValueError(f"Names need to be unique to identify rows, but found duplicates: {list(duplicates)}")
+
+    hashes = pd.util.hash_pandas_object(raw[RAW_COLUMNS].astype(str), index=False)
+    return pd.Series(hashes.to_numpy(), index=names.to_numpy())
+
+
+def diff_rows(old_hashes: pd.Series, new_hashes: pd.Series,
+              old_version: str = None, new_version: str = None) -> CatalogueDiff:
+    """Compare the row hashes of two versions.
+
+    Args:
+        old_hashes (pd.Series): Row hashes of the old version, see :func:`row_hashes`.
+        new_hashes (pd.Series): Row hashes of the new version.
+        old_version (str): Name of the old version, for reference.
+        new_version (str): Name of the new version, for reference.
+
+    Returns:
+        CatalogueDiff: Names of the added, removed and changed rows.
+    """
+    common = new_hashes.index.intersection(old_hashes.index)
+    changed = common[new_hashes[common].to_numpy() != old_hashes[common].to_numpy()]
+    return CatalogueDiff(
+        old_version=old_version,
+        new_version=new_version,
+        added=list(new_hashes.index.difference(old_hashes.index, sort=False)),
+        removed=list(old_hashes.index.difference(new_hashes.index, sort=False)),
+        changed=list(changed),
+    )
+
+
+def process(raw: pd.DataFrame, as_of: int = None) -> pd.DataFrame:
+    """Fully process the raw data, i.e. filter the colliders,
+    calculate the additional columns and the text positions.
+
+    Args:
+        raw (pd.DataFrame): Raw data.
+        as_of (int): Year to evaluate which colliders are in the future.
+
+    Returns:
+        pd.DataFrame: The processed data.
+    """
+    data = assign_textposition(process_collider_data(raw, as_of=as_of))
+    data.attrs[TEXTPOSITION_ATTR] = textposition_key()
+    return data
+
+
+def update_processed(previous: pd.DataFrame, raw: pd.DataFrame, diff: CatalogueDiff, 
+                     as_of: int = None) -> pd.DataFrame:
+    """Update the processed data of the previous version to the new raw data,
+    processing only the added and changed rows.
+    If the previous data was processed for a different as-of year or with different
+    text-position overrides, all rows are processed.
+
+    Args:
+        previous (pd.DataFrame): Processed data of the previous version.
+        raw (pd.DataFrame): Raw data of the new version.
+        diff (CatalogueDiff): Diff between the previous and the new version.
+        as_of (int): Year to evaluate which colliders are in the future.
+                     Defaults to the current year.
+
+    Returns:
+        pd.DataFrame: The processed data of the new version.
+    """
+    if as_of is None:
+        as_of = datetime.now().year
+
+    if (previous.attrs.get(AS_OF_ATTR) != as_of or
+            previous.attrs.get(TEXTPOSITION_ATTR) != textposition_key()):
+        return process(raw, as_of)
+
+    outdated = previous[Column.NAME].isin(diff.changed + diff.removed)
+    parts = [previous[~outdated]]
+
+    to_process = raw[raw[Column.NAME].isin(diff.changed + diff.added)]
+    if len(to_process):
+        parts.append(process(to_process, as_of))
+
+    data = pd.concat(parts)
+
+    # use the row order and index of the new version
+    new_index = pd.Series(raw.index, index=raw[Column.NAME])
+    data.index = new_index[data[Column.NAME]].to_numpy()
+    data = data.sort_index()
+
+    data.attrs = dict(previous.attrs)
+    data.attrs[VERSION_ATTR] = catalogue_version(raw)
+    return data
+
+
+def textposition_key() -> str:
+    """Hash of the text-position overrides, as these also determine the processed data.
+
+    Returns:
+        str: Hash of the overrides.
+    """
+    overrides = [DEFAULT_TEXT_POSITION, SPECIAL_ORIENTATION_ENERGY,
+                 SPECIAL_ORIENTATION_LUMI, SPECIAL_ORIENTATION_LUMI_ENERGY]
+    return sha1(json.dumps(overrides, sort_keys=True).encode()).hexdigest()
+
+
+# Store ------------------------------------------------------------------------
+
+class CatalogueStore:
+    """Snapshots of the catalogue versions on disk.
+
+    Args:
+        path (Path, str): Directory to store the snapshots in.
+    """
+
+    def __init__(self, path: Union[Path, str] = VERSIONS_DIR):
+        self.path = Path(path)
+
+    def versions(self) -> List[VersionInfo]:
+        """All stored versions, oldest first."""
+        index_file = self.path / INDEX_FILE
+        if not index_file.is_file():
+            return []
+        return [VersionInfo(**info) for info in json.loads(index_file.read_text())]
+
+    def latest(self) -> str:
+        """The most recently added version, ``None`` if the store is empty."""
+        versions = self.versions()
+        return versions[-1].version if versions else None
+
+    def add(self, raw: pd.DataFrame = None) -> CatalogueDiff:
+        """Add a snapshot of the raw data as new version, if not already stored
+        (as any, not only the latest version).
+        Only the rows that changed with respect to the latest version are processed.
+
+        Args:
+            raw (pd.DataFrame): Raw data, as read by :func:`utilities.csv_reader.read_raw_data`.
+                                If not given, the CSV file is read.
+
+        Returns:
+            CatalogueDiff: Diff to the previously latest version.
+        """
+        if raw is None:
+            raw = read_raw_data()
+
+        version = catalogue_version(raw)
+        hashes = row_hashes(raw)
+        versions = self.versions()
+        latest = versions[-1].version if versions else None
+
+        if latest is None:
+            diff = CatalogueDiff(old_version=None, new_version=version, added=list(hashes.index))
+            processed = process(raw)
+        else:
+            diff = diff_rows(self.hashes(latest), hashes, latest, version)
+            if version in {info.version for info in versions}:
+                return diff
+            processed = update_processed(self.processed(latest), raw, diff)
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        raw.to_pickle(self._file(version, "raw"))
+        hashes.to_pickle(self._file(version, "hashes"))
+        processed.to_pickle(self._file(version, "processed"))
+
+        infos = versions + [VersionInfo(version, datetime.now().isoformat(timespec="seconds"), len(raw))]
+        (self.path / INDEX_FILE).write_text(json.dumps([asdict(info) for info in infos], indent=2))
+        return diff
+
+    def raw(self, version: str) -> pd.DataFrame:
+        """Raw data of the given version."""
+        return pd.read_pickle(self._file(version, "raw"))
+
+    def hashes(self, version: str) -> pd.Series:
+        """Row hashes of the given version."""
+        return pd.read_pickle(self._file(version, "hashes"))
+
+    def processed(self, version: str) -> pd.DataFrame:
+        """Processed data of the given version."""
+        return pd.read_pickle(self._file(version, "processed"))
+
+    def diff(self, old_version: str, new_version: str = None) -> CatalogueDiff:
+        """Diff between two versions.
+
+        Args:
+            old_version (str): The old version.
+            new_version (str): The new version. Defaults to the latest version.
+
+        Returns:
+            CatalogueDiff: Names of the added, removed and changed rows.
+        """
+        new_version = new_version or self.latest()
+        return diff_rows(self.hashes(old_version), self.hashes(new_version), old_version, new_version)
+
+    def changes_since(self, version: str) -> List[CatalogueDiff]:
+        """History of the changes since the given version, one diff per later version.
+
+        Args:
+            version (str): The version to start from.
+
+        Returns:
+            List[CatalogueDiff]: The diffs between consecutive versions.
+        """
+        versions = [info.version for info in self.versions()]
+        if version not in versions:
+            raise KeyError(f"Unknown version '{version}'.")
+
+        history = versions[versions.index(version):]
+        return [self.diff(old, new) for old, new in zip(history[:-1], history[1:])]
+
+    def _file(self, version: str, kind: str) -> Path:
+        return self.path / f"{version}.{kind}.pkl"
@@ -0,0 +1,54 @@
+"""
+Content Cache
+*************
+
+Helpers to memoize computations on the catalogue by the content of the columns they read,
+so that modified copies or subsets of the data get their own results
+(see e.g. :mod:`utilities.derived_quantities`, :mod:`utilities.filter_index`
+and :mod:`utilities.name_search`).
+
+.. code-block:: python
+
+    _CACHE = BoundedCache(maxsize=16)
+
+    key = content_hash(data, [Column.NAME])
+    if key not in _CACHE:
+        _CACHE[key] = expensive(data)
+"""
+from hashlib import sha1
+from typing import Hashable, Sequence
+
+import pandas as pd
+
+
+def content_hash(data: pd.DataFrame, columns: Sequence[str] = None) -> str:
+    """Hash of the index and the values of the columns.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+        columns (Sequence[str]): Columns to hash. Defaults to all columns.
+
+    Returns:
+        str: SHA-1 hex digest.
+    """
+    if columns is not None:
+        data = data[list(columns)]
+    row_hashes = pd.util.hash_pandas_object(data, index=True).to_numpy()
+    return sha1(row_hashes.tobytes()).hexdigest()
+
+
+class BoundedCache(dict):
+    """Dictionary keeping at most ``maxsize`` entries, the oldest entries are dropped first.
+
+    Args:
+        maxsize (int): Maximum number of entries.
+    """
+
+    def __init__(self, maxsize: int):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __setitem__(self, key: Hashable, value) -> None:
+        super().__setitem__(key, value)
+        while len(self) > self.maxsize:
+            del self[next(iter(self))]
@@ -6,16 +6,30 @@ Functionality to gather the data from the CSV file into an easy-to-use format:
 A pandas DataFrame. In addition, some manipulation on the data is done, so 
 that all the required data for plotting is present in the frame.
 
+The CSV also lists fixed-target machines (rows without luminosity, e.g. the PS).
+:func:`import_catalogue` parses the CSV once and splits it into a collider
+and a fixed-target view, which share the buffers of the processed data.
 """
+from dataclasses import dataclass
 from datetime import datetime
+from hashlib import sha1
+from io import BytesIO
 import pandas as pd
 from pathlib import Path
+from typing import Dict, Sequence, Tuple
 import numpy as np
 
 
 MAIN_DIR = Path(__file__).parent.parent
 CSV_PATH = MAIN_DIR / "accelerator-parameters.csv"
 
+VERSION_ATTR = "catalogue_version"  # key in DataFrame.attrs
+AS_OF_ATTR = "as_of"  # key in DataFrame.attrs
+KIND_ATTR = "kind"  # key in DataFrame.attrs, COLLIDERS or FIXED_TARGET
+
+COLLIDERS = "colliders"
+FIXED_TARGET = "fixed-target"
+
 class Column:
     # Columns of the CSV
     NAME = "Name"
@@ -37,41 +51,204 @@ class Column:
     TEXTPOSITION_COME = "TextPositionCoME"
     TEXTPOSITION_LUMI = "TextPositionLumi"
     TEXTPOSITION_LVCOME = "TextPositionLvCoME"
+    FAMILY = "Family"  # optional, see utilities.operating_points
+    # Derived Columns (see utilities.derived_quantities)
+    RIGIDITY = "Rigidity"
+    RIGIDITY_B2 = "Rigidity B2"
+    GAMMA = "Gamma"
+    GAMMA_B2 = "Gamma B2"
+    OPERATION_YEARS = "OperationYears"
+    INTEGRATED_LUMINOSITY = "IntegratedLuminosity"
+    LUMINOSITY_PER_LENGTH = "LuminosityPerLength"
+    LUMINOSITY_PER_ENERGY = "LuminosityPerEnergy"
+
+
+@dataclass
+class Catalogue:
+    colliders: pd.DataFrame
+    fixed_target: pd.DataFrame
 
 
-def import_collider_data() -> pd.DataFrame:
+def import_catalogue(csv_path: Path = CSV_PATH, as_of: int = None) -> Catalogue:
+    """Load the data from the CSV file once and split it into the colliders 
+    and the fixed-target machines, see :func:`process_catalogue`.
+
+    Args:
+        csv_path (Path): Path to the CSV file. Defaults to the catalogue of this package.
+        as_of (int): Year to evaluate which machines are in the future. 
+                     Defaults to the current year.
+
+    Returns:
+        Catalogue: The collider and fixed-target data.
+    """
+    return process_catalogue(read_raw_data(csv_path), as_of=as_of)
+
+
+def import_collider_data(csv_path: Path = CSV_PATH, as_of: int = None) -> pd.DataFrame:
     """Load the data from the CSV file and perform some additional data-filtering
     and calculations.
 
+    Args:
+        csv_path (Path): Path to the CSV file. Defaults to the catalogue of this package.
+        as_of (int): Year to evaluate which colliders are in the future. 
+                     Defaults to the current year.
+
     Returns:
         pd.DataFrame: The loaded data in form of a DataFrame. 
+        The version of the catalogue is stored in its ``attrs``,
+        see :func:`catalogue_version`.
+    """
+    return import_catalogue(csv_path, as_of=as_of).colliders
+
+
+def read_raw_data(csv_path: Path = CSV_PATH) -> pd.DataFrame:
+    """Read the CSV file as is, i.e. without any further processing.
+
+    Args:
+        csv_path (Path): Path to the CSV file. Defaults to the catalogue of this package.
+
+    Returns:
+        pd.DataFrame: The raw data, with the catalogue version stored in its ``attrs``.
     """
-    #%% Import Data
-    data = pd.read_csv(CSV_PATH, skiprows=[1])
-    data = data[~data[Column.LUMINOSITY].isna()]  # filter non-colliders
-
-    # Calculate Center-of-Mass Energy
-    identical_beam = data[Column.ENERGY_B2].isna()
-    data.loc[identical_beam, Column.COM_ENERGY] = 2*data.loc[identical_beam, Column.ENERGY]
-    data.loc[~identical_beam, Column.COM_ENERGY] = 2 * np.sqrt(data.loc[~identical_beam, Column.ENERGY]*data.loc[~identical_beam, Column.ENERGY_B2])
-
-    # Check for future colliders and convert year to int
-    def year_range(args):
-        start, end, built, future = args
-        if not built:
-            return f"{start} (Estimated)"
-        
-        if not end or np.isnan(end):
-            if future:
-                return f"{int(start)} - Unkown"
-            else:
-                return f"{int(start)} - Present"
-
-        return f"{int(start)} - {int(end)}"
+    raw = Path(csv_path).read_bytes()
+    data = pd.read_csv(BytesIO(raw), skiprows=[1])
+    data.attrs[VERSION_ATTR] = sha1(raw).hexdigest()
+    return data
+
+
+def process_catalogue(data: pd.DataFrame, as_of: int = None) -> Catalogue:
+    """Calculate the additional columns for all machines of the raw data and 
+    split them into colliders and fixed-target machines (without luminosity).
+    All calculations are row-wise, so that this can also be applied to a subset of rows.
+
+    The rows are copied once, with the colliders first, so that both parts are
+    slices of the same frame: with Copy-on-Write (the default since pandas 3.0)
+    they share its buffers until one of them is modified.
+    Within each part, the rows keep their order and index of the CSV.
+
+    Args:
+        data (pd.DataFrame): Raw data, as read by :func:`read_raw_data`.
+        as_of (int): Year to evaluate which machines are in the future. 
+                     Defaults to the current year. Stored in the ``attrs`` of the data.
+
+    Returns:
+        Catalogue: The processed collider and fixed-target data, 
+        with their kind stored in the ``attrs``.
+    """
+    if as_of is None:
+        as_of = datetime.now().year
+
+    is_collider = data[Column.LUMINOSITY].notna().to_numpy()
+    order = np.argsort(~is_collider, kind="stable")
+    n_colliders = int(is_collider.sum())
+    data = data.take(order)
+    data.attrs[AS_OF_ATTR] = as_of
+
+    # Calculate Center-of-Mass Energy (of the colliders only)
+    energy, energy_b2 = data[Column.ENERGY].to_numpy(), data[Column.ENERGY_B2].to_numpy()
+    com_energy = np.where(np.isnan(energy_b2), 2*energy, 2*np.sqrt(energy*energy_b2))
+    data[Column.COM_ENERGY] = np.where(is_collider[order], com_energy, np.nan)
 
+    # Check for future machines and convert year to int
     data[Column.BUILT] = ~data[Column.START_YEAR].astype(str).str.endswith("*")
     data[Column.START_YEAR] = data[Column.START_YEAR].astype(str).str.replace("*", "").astype(int)
-    data[Column.FUTURE] = data[Column.START_YEAR] > datetime.now().year
-    data[Column.YEARS] = data[[Column.START_YEAR, Column.END_YEAR, Column.BUILT, Column.FUTURE]].agg(year_range, axis=1)
+    future, years = classify_as_of(data, [as_of])
+    data[Column.FUTURE] = future[as_of]
+    data[Column.YEARS] = years[as_of]
 
-    return data
\ No newline at end of file
+    colliders, fixed_target = data.iloc[:n_colliders], data.iloc[n_colliders:]
+    colliders.attrs[KIND_ATTR] = COLLIDERS
+    fixed_target.attrs[KIND_ATTR] = FIXED_TARGET
+    return Catalogue(colliders=colliders, fixed_target=fixed_target)
+
+
+def process_collider_data(data: pd.DataFrame, as_of: int = None) -> pd.DataFrame:
+    """Filter the colliders from the raw data and calculate the additional columns,
+    see :func:`process_catalogue`.
+
+    Args:
+        data (pd.DataFrame): Raw data, as read by :func:`read_raw_data`.
+        as_of (int): Year to evaluate which colliders are in the future. 
+                     Defaults to the current year. Stored in the ``attrs`` of the data.
+
+    Returns:
+        pd.DataFrame: The processed data.
+    """
+    return process_catalogue(data, as_of=as_of).colliders
+
+
+def classify_as_of(data: pd.DataFrame, as_of_years: Sequence[int]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Evaluate for many years at once which colliders are in the future 
+    and what their operation years are, as seen from that year.
+    Colliders that ended after the given year are considered as running at that time.
+
+    Args:
+        data (pd.DataFrame): DataFrame with integer start years and the built-column.
+        as_of_years (Sequence[int]): Years to evaluate.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: The future-flags and the operation-years strings
+        with one column per given year.
+    """
+    as_of_years = np.asarray(as_of_years, dtype=int)
+    start = data[Column.START_YEAR].to_numpy(dtype=int)
+    end = data[Column.END_YEAR].to_numpy(dtype=float)
+    built = data[Column.BUILT].to_numpy(dtype=bool)
+
+    start_str = start.astype(str).astype(object)
+    end_str = np.where(np.isnan(end), "", np.nan_to_num(end).astype(int).astype(str)).astype(object)
+
+    future = start[:, None] > as_of_years[None, :]
+    ended = end[:, None] <= as_of_years[None, :]  # False for NaN
+    years = np.select(
+        [~built[:, None], ended, future],
+        [(start_str + " (Estimated)")[:, None], (start_str + " - " + end_str)[:, None], (start_str + " - Unkown")[:, None]],
+        default=(start_str + " - Present")[:, None],
+    )
+    return (pd.DataFrame(future, index=data.index, columns=as_of_years), 
+            pd.DataFrame(years, index=data.index, columns=as_of_years))
+
+
+def as_of_views(data: pd.DataFrame, as_of_years: Sequence[int]) -> Dict[int, pd.DataFrame]:
+    """Views of the processed data as seen from the given years, 
+    e.g. for historical snapshots of the landscape. 
+    The classification for all years is done in one pass, see :func:`classify_as_of`.
+    Colliders starting after the given year are not built at that time,
+    so they are drawn as not built and removed by filters on the built-column.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the processed accelerator timeline data.
+        as_of_years (Sequence[int]): Years to evaluate.
+
+    Returns:
+        Dict[int, pd.DataFrame]: Data with updated future-, built- and years-columns per year.
+    """
+    future, years = classify_as_of(data, as_of_years)
+    views = {}
+    for as_of in future.columns:
+        view = data.copy()
+        view[Column.FUTURE] = future[as_of]
+        view[Column.BUILT] = data[Column.BUILT] & ~future[as_of]
+        view[Column.YEARS] = years[as_of]
+        view.attrs[AS_OF_ATTR] = int(as_of)
+        views[int(as_of)] = view
+    return views
+
+
+def catalogue_version(data: pd.DataFrame) -> str:
+    """Version of the catalogue the data was loaded from, which can be used
+    as a key to cache computations on the data.
+    This is the hash of the CSV file as stored by :func:`import_collider_data`
+    or, if the data was created differently, a hash of its content.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+
+    Returns:
+        str: Version string.
+    """
+    try:
+        return data.attrs[VERSION_ATTR]
+    except KeyError:
+        content_hash = pd.util.hash_pandas_object(data, index=True).to_numpy()
+        return sha1(content_hash.tobytes()).hexdigest()
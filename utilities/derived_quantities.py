@@ -0,0 +1,219 @@
+"""
+Derived Quantities
+******************
+
+Additional physics quantities derived from the catalogue columns,
+e.g. beam rigidity, Lorentz factors or estimates of the integrated luminosity.
+
+All quantities are computed vectorized over the whole DataFrame, but only on
+first access via :func:`get_derived`. The results are memoized per content of the
+columns they are calculated from (and the as-of year), so that
+repeated plots and queries over these columns cost nothing extra,
+while modified copies or subsets of the data get their own results.
+To add a new quantity, add a column name to :class:`utilities.csv_reader.Column`
+and register its calculation and the columns it reads with the :func:`derived` decorator.
+"""
+import re
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utilities.content_cache import BoundedCache, content_hash
+from utilities.csv_reader import AS_OF_ATTR, Column
+
+# Constants --------------------------------------------------------------------
+
+SPEED_OF_LIGHT_GIGA = 0.299792458  # speed of light [1e9 m/s], i.e. GeV/c -> T m
+
+PARTICLE_MASSES = {  # rest mass [GeV]
+    "p": 0.93827208816,
+    "e": 0.51099895000e-3,
+    "mu": 0.1056583755,
+}
+
+OPERATION_SECONDS_PER_YEAR = 1e7  # typical effective time of physics operation per year
+INVERSE_FEMTOBARN = 1e39  # [cm^-2]
+
+PARTICLE_REGEX = re.compile(r"(mu|e|p)[+-]")
+
+
+# Registry ---------------------------------------------------------------------
+
+DERIVED_COLUMNS: Dict[str, Callable[[pd.DataFrame], pd.Series]] = {}
+DERIVED_INPUTS: Dict[str, Tuple[str, ...]] = {}  # columns each derived column is calculated from
+CACHE_SIZE = 64  # memoized derived columns, the oldest are dropped first
+_CACHE: Dict[Tuple[str, int, str], pd.Series] = BoundedCache(CACHE_SIZE)
+
+
+def derived(column: str, inputs: Sequence[str]) -> Callable:
+    """Decorator to register the calculation of a derived column.
+
+    Args:
+        column (str): Name of the derived column.
+        inputs (Sequence[str]): Columns of the data the calculation reads.
+    """
+    def register(function: Callable[[pd.DataFrame], pd.Series]) -> Callable:
+        DERIVED_COLUMNS[column] = function
+        DERIVED_INPUTS[column] = tuple(inputs)
+        return function
+    return register
+
+
+def get_derived(data: pd.DataFrame, column: str) -> pd.Series:
+    """Get the derived column for the given data.
+    It is only calculated on first access for the content of its input columns
+    (including the index) and the as-of year, afterwards the cached values are returned.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+        column (str): Name of the derived column, see :data:`DERIVED_COLUMNS`.
+
+    Returns:
+        pd.Series: Values of the derived column, aligned to the index of the data.
+    """
+    if column not in DERIVED_COLUMNS:
+        raise KeyError(f"Unknown derived column '{column}'. "
+                       f"Available are: {list(DERIVED_COLUMNS)}")
+
+    key = (column, data.attrs.get(AS_OF_ATTR), content_hash(data, DERIVED_INPUTS[column]))
+    cached = _CACHE.get(key)
+    if cached is None:
+        cached = _CACHE[key] = DERIVED_COLUMNS[column](data)
+    return cached
+
+
+def add_derived_columns(data: pd.DataFrame, columns: Iterable[str] = None) -> pd.DataFrame:
+    """Add derived columns to the DataFrame.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+        columns (Iterable[str]): Names of the derived columns to add.
+                                 Defaults to all registered columns.
+
+    Returns:
+        pd.DataFrame: DataFrame with the new columns.
+    """
+    if columns is None:
+        columns = DERIVED_COLUMNS.keys()
+
+    for column in columns:
+        data[column] = get_derived(data, column)
+    return data
+
+
+def clear_cache() -> None:
+    """Remove all memoized derived columns."""
+    _CACHE.clear()
+
+
+# Helper -----------------------------------------------------------------------
+
+def beam_masses(data: pd.DataFrame) -> Tuple[pd.Series, pd.Series]:
+    """Rest masses of the particles in beam 1 and beam 2, parsed from the type.
+    For different particle species in the two beams, the heavier particle
+    is assumed to be in the beam with the higher energy (as e.g. for HERA and EIC).
+    Fixed-target machines have no second beam, i.e. NaN as mass.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+
+    Returns:
+        Tuple[pd.Series, pd.Series]: Masses of the particles in beam 1 and beam 2 [GeV].
+    """
+    masses = {}
+    for ptype in data[Column.TYPE].unique():
+        particles = PARTICLE_REGEX.findall(str(ptype))
+        masses[ptype] = [PARTICLE_MASSES[p] for p in particles] + [np.nan] * (2 - len(particles))
+
+    mass_b1 = data[Column.TYPE].map(lambda ptype: masses[ptype][0])
+    mass_b2 = data[Column.TYPE].map(lambda ptype: masses[ptype][1])
+
+    energy_b1, energy_b2 = beam_energies(data)
+    swap = ((energy_b1 > energy_b2) & (mass_b1 < mass_b2)) | ((energy_b1 < energy_b2) & (mass_b1 > mass_b2))
+    return mass_b1.where(~swap, mass_b2), mass_b2.where(~swap, mass_b1)
+
+
+def beam_energies(data: pd.DataFrame) -> Tuple[pd.Series, pd.Series]:
+    """Energies of beam 1 and beam 2. For colliders with identical beam energies
+    only the first is given in the data.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+
+    Returns:
+        Tuple[pd.Series, pd.Series]: Energies of beam 1 and beam 2 [GeV].
+    """
+    energy_b1 = data[Column.ENERGY].astype(float)
+    energy_b2 = data[Column.ENERGY_B2].astype(float).fillna(energy_b1)
+    return energy_b1, energy_b2
+
+
+def _rigidity(energy: pd.Series, mass: pd.Series) -> pd.Series:
+    momentum = np.sqrt(np.clip(energy**2 - mass**2, 0, None))
+    return momentum / SPEED_OF_LIGHT_GIGA
+
+
+# Derived Columns --------------------------------------------------------------
+
+BEAM_INPUTS = (Column.TYPE, Column.ENERGY, Column.ENERGY_B2)
+OPERATION_INPUTS = (Column.START_YEAR, Column.END_YEAR, Column.BUILT, Column.FUTURE)
+
+
+@derived(Column.RIGIDITY, inputs=BEAM_INPUTS)
+def rigidity(data: pd.DataFrame) -> pd.Series:
+    """Magnetic rigidity of beam 1 [T m]."""
+    mass_b1, _ = beam_masses(data)
+    return _rigidity(beam_energies(data)[0], mass_b1)
+
+
+@derived(Column.RIGIDITY_B2, inputs=BEAM_INPUTS)
+def rigidity_b2(data: pd.DataFrame) -> pd.Series:
+    """Magnetic rigidity of beam 2 [T m]."""
+    _, mass_b2 = beam_masses(data)
+    return _rigidity(beam_energies(data)[1], mass_b2)
+
+
+@derived(Column.GAMMA, inputs=BEAM_INPUTS)
+def gamma(data: pd.DataFrame) -> pd.Series:
+    """Relativistic Lorentz factor of beam 1."""
+    mass_b1, _ = beam_masses(data)
+    return beam_energies(data)[0] / mass_b1
+
+
+@derived(Column.GAMMA_B2, inputs=BEAM_INPUTS)
+def gamma_b2(data: pd.DataFrame) -> pd.Series:
+    """Relativistic Lorentz factor of beam 2."""
+    _, mass_b2 = beam_masses(data)
+    return beam_energies(data)[1] / mass_b2
+
+
+@derived(Column.OPERATION_YEARS, inputs=OPERATION_INPUTS)
+def operation_years(data: pd.DataFrame) -> pd.Series:
+    """Years of operation, until the end year or the as-of year of the data if still running.
+    NaN for colliders that are not (yet) operating."""
+    as_of = data.attrs.get(AS_OF_ATTR, datetime.now().year)
+    end = data[Column.END_YEAR].astype(float).clip(upper=as_of).fillna(as_of)
+    years = (end - data[Column.START_YEAR] + 1).clip(lower=0)
+    return years.where(data[Column.BUILT] & ~data[Column.FUTURE])
+
+
+@derived(Column.INTEGRATED_LUMINOSITY, inputs=OPERATION_INPUTS + (Column.LUMINOSITY,))
+def integrated_luminosity(data: pd.DataFrame) -> pd.Series:
+    """Upper estimate of the integrated luminosity [fb^-1],
+    assuming peak luminosity for ``OPERATION_SECONDS_PER_YEAR`` every operation year."""
+    seconds = get_derived(data, Column.OPERATION_YEARS) * OPERATION_SECONDS_PER_YEAR
+    return data[Column.LUMINOSITY] * seconds / INVERSE_FEMTOBARN
+
+
+@derived(Column.LUMINOSITY_PER_LENGTH, inputs=(Column.LUMINOSITY, Column.LENGTH))
+def luminosity_per_length(data: pd.DataFrame) -> pd.Series:
+    """Peak luminosity per unit length [cm^-2 s^-1 m^-1]."""
+    return data[Column.LUMINOSITY] / data[Column.LENGTH]
+
+
+@derived(Column.LUMINOSITY_PER_ENERGY, inputs=(Column.LUMINOSITY, Column.COM_ENERGY))
+def luminosity_per_energy(data: pd.DataFrame) -> pd.Series:
+    """Peak luminosity per center-of-mass energy [cm^-2 s^-1 GeV^-1]."""
+    return data[Column.LUMINOSITY] / data[Column.COM_ENERGY]
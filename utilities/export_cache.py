@@ -0,0 +1,133 @@
+"""
+Export Cache
+************
+
+Skip rewriting exported files whose content did not change,
+so that their modification time is kept and downstream steps
+(image optimization, artifact upload, deployment) do not process them again.
+
+Before a file is written, the digest of its content is compared with the digest
+stored in the index of its directory (:data:`INDEX_NAME`, a JSON file next to the outputs).
+Files that are in the index with the same digest, size and modification time are left alone.
+Files that are not in the index yet, e.g. in a fresh checkout, are compared with
+the digest of the existing file, so that they are only rewritten if they changed.
+
+The digest is computed from the rendered buffer, before encoding: for vector
+outputs (which are byte-reproducible, see :mod:`utilities.reproducible_export`)
+from the bytes, for rasters from the pixels (see :func:`utilities.raster_export.image_digest`),
+so that unchanged rasters are not even compressed.
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+INDEX_NAME = ".export-index.json"
+
+_INDEXES: Dict[Path, Dict[str, dict]] = {}  # directory -> file name -> entry
+_LOCK = threading.Lock()  # rasters are written from several threads
+
+
+def digest(data: bytes) -> str:
+    """Fast digest of the content.
+
+    Args:
+        data (bytes): The content.
+
+    Returns:
+        str: BLAKE2b (128 bit) hex digest.
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _index(directory: Path) -> Dict[str, dict]:
+    """ Load the index of the directory, once per process. """
+    directory = directory.resolve()
+    if directory not in _INDEXES:
+        try:
+            _INDEXES[directory] = json.loads((directory / INDEX_NAME).read_text())
+        except (OSError, ValueError):
+            _INDEXES[directory] = {}
+    return _INDEXES[directory]
+
+
+def is_current(path: Path, content_digest: str, file_digest: Callable[[Path], str] = None) -> bool:
+    """Check if the file exists with the given content.
+    Files not in the index are recorded if their digest matches.
+
+    Args:
+        path (Path): Output path.
+        content_digest (str): Digest of the content to write.
+        file_digest (Callable[[Path], str]): Digest of an existing file, comparable to the content digest.
+                                             Defaults to the :func:`digest` of its bytes.
+
+    Returns:
+        bool: ``True`` if the file does not need to be written.
+    """
+    path = Path(path)
+    with _LOCK:
+        if not path.is_file():
+            return False
+        entry = _index(path.parent).get(path.name)
+        if entry is not None and entry == _entry(path, entry["digest"]):
+            return entry["digest"] == content_digest
+
+    existing_digest = (file_digest or _bytes_digest)(path)
+    if existing_digest != content_digest:
+        return False
+    record(path, content_digest)
+    return True
+
+
+def record(path: Path, content_digest: str) -> None:
+    """Store the digest of the written file in the index of its directory.
+
+    Args:
+        path (Path): The written file.
+        content_digest (str): Digest of its content.
+    """
+    path = Path(path)
+    with _LOCK:
+        index = _index(path.parent)
+        index[path.name] = _entry(path, content_digest)
+        index_path = path.parent / INDEX_NAME
+        tmp_path = index_path.with_name(f"{INDEX_NAME}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(index, indent=1, sort_keys=True))
+        tmp_path.replace(index_path)
+
+
+def write_if_changed(path: Path, content_digest: str, write: Callable[[Path], Optional[Path]],
+                     file_digest: Callable[[Path], str] = None) -> bool:
+    """Write the file, unless it exists with the same content.
+
+    Args:
+        path (Path): Output path.
+        content_digest (str): Digest of the content.
+        write (Callable[[Path], Path]): Writes the content to the path.
+        file_digest (Callable[[Path], str]): See :func:`is_current`.
+
+    Returns:
+        bool: ``True`` if the file was written.
+    """
+    if is_current(path, content_digest, file_digest):
+        return False
+    write(path)
+    record(path, content_digest)
+    return True
+
+
+def clear_cache() -> None:
+    """Forget the loaded indexes, e.g. after they were changed by another process."""
+    with _LOCK:
+        _INDEXES.clear()
+
+
+def _entry(path: Path, content_digest: str) -> dict:
+    stat = path.stat()
+    return {"digest": content_digest, "size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+
+def _bytes_digest(path: Path) -> str:
+    return digest(path.read_bytes())
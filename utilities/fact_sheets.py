@@ -0,0 +1,430 @@
+"""
+Fact Sheets
+***********
+
+Booklet with one page per collider: its parameters, its references and
+mini-charts locating it in all chart configurations, as PDF or HTML.
+Build the booklet from the root of this repository via::
+
+    python -m utilities.fact_sheets --format pdf --output build/fact-sheets/fact-sheets.pdf --workers 8
+
+The background of each mini-chart, i.e. all colliders without labels, is rendered
+only once per configuration and shared with the worker processes together with the data
+(whose numeric columns the workers read from a memory-mapped store, see :mod:`utilities.array_store`).
+Per page, only the highlighted collider is drawn on top of the backgrounds,
+so that also booklets of large catalogues are built quickly.
+
+For PDF, the pages are drawn with matplotlib and merged with ``pypdf``
+(see ``requirements_fact_sheets.txt``).
+For HTML, the backgrounds are rendered with :mod:`utilities.svg_renderer`
+and written once next to the booklet, the pages only contain the overlays.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from html import escape
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from utilities.array_store import SharedFrame, share_frame
+from utilities.csv_reader import MAIN_DIR, Column, import_collider_data
+from utilities.plot_helper import (CONFIGURATIONS, PARTICLE_TYPES, PLOTLY_MPL_SYMBOL_MAP, PlotConfiguration,
+                                   assign_textposition)
+from utilities.reproducible_export import figure_bytes, normalize_pdf, write_bytes
+from utilities.scene import Scene, build_scene
+
+OUTPUT_DIR = MAIN_DIR / "build" / "fact-sheets"
+FORMATS = ("pdf", "html")
+
+PAGE_SIZE = (8.27, 11.69)  # A4 [inch]
+CHART_SLOTS = (  # position of the mini-charts on the PDF page [figure fraction]
+    (0.04, 0.33, 0.45, 0.28),
+    (0.53, 0.33, 0.45, 0.28),
+    (0.04, 0.02, 0.45, 0.28),
+)
+REFERENCES_SLOT = (0.53, 0.02, 0.45, 0.28)
+BACKGROUND_DPI = 200
+STYLE = MAIN_DIR / "utilities" / "chart.mplstyle"
+FACT_SHEET_RC = {  # on top of STYLE, for the smaller charts
+    "font.size": 7,
+    "lines.markersize": 4,
+    "axes.linewidth": 0.8,
+    "figure.constrained_layout.use": False,
+}
+BACKGROUND_ALPHA = 0.35
+PAGE_RC = {"pdf.fonttype": 3}  # subsetting TrueType fonts dominates the time per page
+HIGHLIGHT_STYLE = {"markersize": 9, "markeredgecolor": "black", "markeredgewidth": 1.2, "fillstyle": "full"}
+
+FACTS = (  # label, column, format
+    ("Institute", Column.INSTITUTE, "{}"),
+    ("Country", Column.COUNTRY, "{}"),
+    ("Particles", Column.TYPE, "{}"),
+    ("Operation", Column.YEARS, "{}"),
+    ("Center-of-Mass Energy [GeV]", Column.COM_ENERGY, "{:g}"),
+    ("Beam Energy [GeV]", Column.ENERGY, "{:g}"),
+    ("Beam Energy B2 [GeV]", Column.ENERGY_B2, "{:g}"),
+    ("Peak Luminosity [cm^-2 s^-1]", Column.LUMINOSITY, "{:.3g}"),
+    ("Length [m]", Column.LENGTH, "{:g}"),
+)
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="utf-8">
+  <title>Accelerator Fact Sheets</title>
+  <style>
+    body {{ font-family: sans-serif; margin: 1em; }}
+    .sheet {{ page-break-after: always; margin-bottom: 3em; }}
+    .facts td:first-child {{ color: grey; padding-right: 1em; }}
+    .charts {{ display: flex; flex-wrap: wrap; gap: 1em; }}
+    .chart {{ position: relative; width: 32em; }}
+    .chart img {{ width: 100%; opacity: 0.6; }}
+    .chart svg {{ position: absolute; top: 0; left: 0; width: 100%; height: 100%; }}
+  </style>
+</head>
+<body>
+{pages}
+</body>
+</html>
+"""
+
+# Data and backgrounds in the worker processes
+_WORKER: Dict[str, Any] = {}
+
+
+@dataclass
+class Background:
+    """Mini-chart of all colliders of one configuration, rendered once."""
+    scene: Scene  # for the axis layouts
+    image: Optional[np.ndarray] = None  # RGBA raster (PDF)
+    axes_bounds: Optional[Tuple[float, float, float, float]] = None  # plot area in the raster [fraction]
+    href: Optional[str] = None  # SVG file next to the booklet (HTML)
+
+
+def facts(row: pd.Series) -> List[Tuple[str, str]]:
+    """Formatted parameters of the collider, skipping missing values.
+
+    Args:
+        row (pd.Series): Row of the data.
+
+    Returns:
+        List[Tuple[str, str]]: Label and value per parameter.
+    """
+    particle_names = {particle_type.shorthand: particle_type.name for particle_type in PARTICLE_TYPES}
+    result = []
+    for label, column, fmt in FACTS:
+        value = row[column]
+        if pd.isna(value):
+            continue
+        if column == Column.TYPE:
+            value = particle_names.get(value, value)
+        result.append((label, fmt.format(value)))
+    return result
+
+
+def references(row: pd.Series) -> List[str]:
+    """The URLs in the references of the collider."""
+    return [] if pd.isna(row[Column.REFERENCES]) else str(row[Column.REFERENCES]).split()
+
+
+# Backgrounds ------------------------------------------------------------------
+
+def background_scene(data: pd.DataFrame, configuration: PlotConfiguration) -> Scene:
+    """Scene of all colliders without labels."""
+    scene = build_scene(data, configuration)
+    for series in scene.series:
+        series.texts = np.full(len(series.texts), "", dtype=object)
+    return scene
+
+
+def build_backgrounds(data: pd.DataFrame, configurations: Sequence[PlotConfiguration], fmt: str,
+                      output_dir: Path = None) -> Dict[str, Background]:
+    """Render the backgrounds of the mini-charts once per configuration.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the (modified) accelerator timeline data.
+        configurations (Sequence[PlotConfiguration]): The charts.
+        fmt (str): Format of the booklet, see :data:`FORMATS`.
+        output_dir (Path): Directory to write the SVG backgrounds into (HTML only).
+
+    Returns:
+        Dict[str, Background]: Background per configuration name.
+    """
+    backgrounds = {}
+    for configuration in configurations:
+        scene = background_scene(data, configuration)
+        if fmt == "html":
+            from utilities.svg_renderer import render_scene
+
+            href = f"{configuration.name}.svg"
+            write_bytes(output_dir / href, render_scene(scene).encode())
+            backgrounds[configuration.name] = Background(scene=scene, href=href)
+        else:
+            image, axes_bounds = _raster_background(scene)
+            backgrounds[configuration.name] = Background(scene=scene, image=image, axes_bounds=axes_bounds)
+    return backgrounds
+
+
+def _raster_background(scene: Scene) -> Tuple[np.ndarray, Tuple[float, float, float, float]]:
+    """ Render the scene into an RGBA raster of the size of a chart slot. """
+    from matplotlib import pyplot as plt
+    from export_charts import draw_scene
+
+    _, _, width, height = CHART_SLOTS[0]
+    with plt.style.context([STYLE, FACT_SHEET_RC]):
+        fig, ax = plt.subplots(figsize=(width * PAGE_SIZE[0], height * PAGE_SIZE[1]), dpi=BACKGROUND_DPI)
+        draw_scene(ax, scene)
+        for line in ax.lines:
+            line.set_alpha(BACKGROUND_ALPHA)
+        fig.tight_layout()
+        fig.canvas.draw()
+        image = np.asarray(fig.canvas.buffer_rgba()).copy()
+        axes_bounds = ax.get_position().bounds
+    plt.close(fig)
+    return image, axes_bounds
+
+
+# Pages ------------------------------------------------------------------------
+
+def _init_worker(data: Union[pd.DataFrame, SharedFrame], backgrounds: Dict[str, Background]) -> None:
+    import matplotlib
+    matplotlib.use("Agg")
+
+    _WORKER["data"] = data.open() if isinstance(data, SharedFrame) else data
+    _WORKER["backgrounds"] = backgrounds
+
+
+def background_page(backgrounds: Dict[str, Background]) -> bytes:
+    """Render the backgrounds into their slots on an otherwise empty page,
+    which is laid under every page of the PDF booklet.
+
+    Args:
+        backgrounds (Dict[str, Background]): Backgrounds per configuration, see :func:`build_backgrounds`.
+
+    Returns:
+        bytes: Single-page PDF.
+    """
+    from matplotlib import pyplot as plt
+
+    with plt.style.context([STYLE, FACT_SHEET_RC]):
+        fig = plt.figure(figsize=PAGE_SIZE)
+        for slot, background in zip(CHART_SLOTS, backgrounds.values()):
+            ax = fig.add_axes(slot)
+            ax.imshow(background.image, aspect="auto", interpolation="antialiased")
+            ax.set_axis_off()
+        data = figure_bytes(fig, "pdf", rc=PAGE_RC)
+    plt.close(fig)
+    return data
+
+
+def render_pdf_page(position: int) -> bytes:
+    """Render the fact sheet of the collider at the given position in the data as PDF,
+    without the backgrounds of the charts (see :func:`background_page`).
+    Needs to run in a process initialized with the data and the backgrounds.
+
+    Args:
+        position (int): Position of the collider in the data.
+
+    Returns:
+        bytes: Single-page PDF.
+    """
+    from matplotlib import pyplot as plt
+
+    row = _WORKER["data"].iloc[position]
+    with plt.style.context([STYLE, FACT_SHEET_RC]):
+        fig = plt.figure(figsize=PAGE_SIZE)
+        fig.text(0.04, 0.95, row[Column.NAME], fontsize=20, weight="bold", va="top")
+        for idx, (label, value) in enumerate(facts(row)):
+            y = 0.89 - idx * 0.025
+            fig.text(0.04, y, label, color="grey", fontsize=10, va="top")
+            fig.text(0.40, y, value, fontsize=10, va="top")
+
+        x, y, _, height = REFERENCES_SLOT
+        fig.text(x, y + height, "References", fontsize=10, weight="bold", va="top")
+        for idx, url in enumerate(references(row)):
+            fig.text(x, y + height - (idx + 1.5) * 0.022, url, fontsize=6, va="top", url=url, color="tab:blue",
+                     wrap=True)
+
+        for slot, background in zip(CHART_SLOTS, _WORKER["backgrounds"].values()):
+            _draw_chart(fig, slot, background, row)
+
+        data = figure_bytes(fig, "pdf", rc=PAGE_RC)
+    plt.close(fig)
+    return data
+
+
+def _draw_chart(fig, slot: Tuple[float, float, float, float], background: Background, row: pd.Series) -> None:
+    """ Draw the collider onto a transparent axes aligned with the plot area of the background. """
+    x0, y0, width, height = slot
+    ax_x, ax_y, ax_width, ax_height = background.axes_bounds
+    ax = fig.add_axes((x0 + ax_x * width, y0 + ax_y * height, ax_width * width, ax_height * height))
+    ax.set_axis_off()
+    ax.patch.set_alpha(0)
+    scene = background.scene
+    for axis, layout in (("x", scene.xaxis.layout), ("y", scene.yaxis.layout)):
+        getattr(ax, f"set_{axis}scale")(layout.scale)
+        getattr(ax, f"set_{axis}lim")(layout.limits)
+
+    configuration = CONFIGURATIONS[scene.name]
+    x, y = row[configuration.xcolumn], row[configuration.ycolumn]
+    if pd.isna(x) or pd.isna(y):
+        return
+    particle_type = next((ptype for ptype in PARTICLE_TYPES if ptype.shorthand == row[Column.TYPE]), None)
+    ax.axvline(x, color="grey", linestyle="--", linewidth=0.6, marker="none")
+    ax.axhline(y, color="grey", linestyle="--", linewidth=0.6, marker="none")
+    ax.plot([x], [y], marker=PLOTLY_MPL_SYMBOL_MAP[particle_type.symbol] if particle_type else "o",
+            color=particle_type.color if particle_type else "black", linestyle="none", **HIGHLIGHT_STYLE)
+
+
+def render_html_page(position: int) -> str:
+    """Render the fact sheet of the collider at the given position in the data as HTML.
+    Needs to run in a process initialized with the data and the backgrounds.
+
+    Args:
+        position (int): Position of the collider in the data.
+
+    Returns:
+        str: The page as ``section`` element.
+    """
+    from utilities.svg_renderer import HEIGHT, WIDTH, data_to_pixels
+
+    row = _WORKER["data"].iloc[position]
+    rows = "".join(f"<tr><td>{escape(label)}</td><td>{escape(value)}</td></tr>" for label, value in facts(row))
+    links = "".join(f'<li><a href="{escape(url)}">{escape(url)}</a></li>' for url in references(row))
+
+    charts = []
+    for background in _WORKER["backgrounds"].values():
+        configuration = CONFIGURATIONS[background.scene.name]
+        x, y = data_to_pixels(background.scene, np.array([row[configuration.xcolumn]], dtype=float),
+                              np.array([row[configuration.ycolumn]], dtype=float))
+        marker = ""
+        if np.isfinite(x[0]) and np.isfinite(y[0]):
+            marker = (f'<circle cx="{x[0]:.1f}" cy="{y[0]:.1f}" r="7" fill="none" stroke="black" stroke-width="2"/>'
+                      f'<circle cx="{x[0]:.1f}" cy="{y[0]:.1f}" r="3" fill="black"/>')
+        charts.append(f'<div class="chart"><img src="{background.href}" alt="{configuration.name}">'
+                      f'<svg viewBox="0 0 {WIDTH} {HEIGHT}">{marker}</svg></div>')
+
+    return (f'<section class="sheet" id="{escape(row[Column.NAME])}">'
+            f'<h2>{escape(row[Column.NAME])}</h2>'
+            f'<table class="facts">{rows}</table>'
+            f'<div class="charts">{"".join(charts)}</div>'
+            f'<h3>References</h3><ul>{links}</ul></section>')
+
+
+# Booklet ----------------------------------------------------------------------
+
+def write_booklet(path: Path, data: pd.DataFrame = None, configurations: Sequence[PlotConfiguration] = None,
+                  names: Sequence[str] = None, workers: int = None) -> Path:
+    """Render the fact sheets of the colliders in a pool of worker processes
+    and assemble them into one booklet. The format is given by the suffix of the path.
+
+    Args:
+        path (Path): Output path, with suffix ``.pdf`` or ``.html``.
+        data (pd.DataFrame): DataFrame containing the (modified) accelerator timeline data.
+                             If not given, the data is loaded from the CSV.
+        configurations (Sequence[PlotConfiguration]): The mini-charts on each page.
+                                                      Defaults to all registered configurations.
+        names (Sequence[str]): Names of the colliders to include. Defaults to all.
+        workers (int): Number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        Path: The written booklet.
+    """
+    path = Path(path)
+    fmt = path.suffix[1:]
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Use one of {FORMATS}.")
+    if fmt == "pdf":
+        try:
+            from pypdf import PdfReader, PdfWriter
+        except ImportError as e:
+            raise ImportError("Merging the PDF pages requires pypdf, "
+                              "see requirements_fact_sheets.txt.") from e
+
+    if data is None:
+        data = assign_textposition(import_collider_data())
+    if configurations is None:
+        configurations = list(CONFIGURATIONS.values())
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    import matplotlib
+    matplotlib.use("Agg")
+    backgrounds = build_backgrounds(data, configurations, fmt, output_dir=path.parent)
+
+    positions = np.arange(len(data))
+    if names is not None:
+        positions = positions[data[Column.NAME].isin(names).to_numpy()]
+
+    if fmt == "pdf":
+        template = background_page(backgrounds)
+        # the workers only need the axes of the backgrounds, not the rasters
+        backgrounds = {name: replace(background, image=None) for name, background in backgrounds.items()}
+        render_page = render_pdf_page
+    else:
+        template, render_page = None, render_html_page
+
+    chunksize = max(1, len(positions) // (8 * (workers or 8)))
+    if workers == 1:
+        _init_worker(data, backgrounds)
+        pages = map(render_page, positions)
+        return _assemble(path, pages, template)
+
+    # the workers read the numeric columns from a memory-mapped store, shared by the OS
+    with tempfile.TemporaryDirectory(prefix="fact-sheets-") as store_dir:
+        shared = share_frame(data, Path(store_dir) / "data.npy")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared, backgrounds)) as executor:
+            return _assemble(path, executor.map(render_page, positions, chunksize=chunksize), template)
+
+
+def _assemble(path: Path, pages, template: bytes = None) -> Path:
+    """ Merge the pages, in order, into the booklet. The PDF pages are laid onto the background page. """
+    if template is None:
+        html = HTML_TEMPLATE.format(pages="\n".join(pages))
+        return write_bytes(path, html.encode())
+
+    from pypdf import PdfReader, PdfWriter
+
+    background = PdfReader(BytesIO(template)).pages[0]
+    writer = PdfWriter()
+    for page in pages:
+        writer.append(PdfReader(BytesIO(page)))
+        writer.pages[-1].merge_page(background, over=False)  # shares the images of the background
+    with BytesIO() as buffer:
+        writer.write(buffer)
+        return write_bytes(path, normalize_pdf(buffer.getvalue()))
+
+
+# Command Line -----------------------------------------------------------------
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m utilities.fact_sheets",
+        description="Build a booklet with one fact sheet per collider.",
+    )
+    parser.add_argument("--format", choices=FORMATS, default="pdf", help="Format of the booklet.")
+    parser.add_argument("--output", type=Path, help="Output path. Defaults to fact-sheets.<format> in build/fact-sheets.")
+    parser.add_argument("--names", nargs="+", help="Only include these colliders.")
+    parser.add_argument("--workers", type=int, help="Number of worker processes (default: number of CPUs).")
+    return parser
+
+
+def main(args: Sequence[str] = None) -> int:
+    opt = get_parser().parse_args(args)
+    path = opt.output or OUTPUT_DIR / f"fact-sheets.{opt.format}"
+
+    start = time.perf_counter()
+    path = write_booklet(path, names=opt.names, workers=opt.workers)
+    print(f"Wrote {path} in {time.perf_counter() - start:.2f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Filter Index
+************
+
+Precomputed row partitions to filter the catalogue without re-processing it,
+as used by the filter menus of the interactive charts
+(see :func:`utilities.plotly_charts.add_filter_menus`) and the filter widgets
+of the static site (see :mod:`utilities.site_bundle`).
+
+Per filter dimension the positions of the matching rows are precomputed:
+
+- status filters (built, future, ...): one index array per filter,
+- categorical columns (institute, country): one index array per value,
+- range columns (start year, center-of-mass energy): the row positions sorted by value,
+  so that any window is a contiguous slice, found by binary search.
+
+Applying a filter is then only a selection of precomputed index arrays.
+The index for the default filters is cached by the content of the filtered columns.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utilities.content_cache import BoundedCache, content_hash
+from utilities.csv_reader import Column
+
+# Named status filters, as query strings (see ``DataFrame.query``)
+STATUS_FILTERS = {
+    "all": None,
+    "built": f"{Column.BUILT}",
+    "not built": f"not {Column.BUILT}",
+    "operating": f"{Column.BUILT} and not {Column.FUTURE}",
+    "future": f"{Column.FUTURE}",
+}
+CATEGORY_COLUMNS = (Column.INSTITUTE, Column.COUNTRY)
+RANGE_COLUMNS = (Column.START_YEAR, Column.COM_ENERGY)
+FILTERED_COLUMNS = (Column.BUILT, Column.FUTURE) + CATEGORY_COLUMNS + RANGE_COLUMNS  # used by the default filters
+CACHE_SIZE = 16
+
+_CACHE: Dict[str, "FilterIndex"] = BoundedCache(CACHE_SIZE)
+
+
+@dataclass
+class FilterIndex:
+    n_rows: int
+    status: Dict[str, np.ndarray]  # filter name -> row positions
+    categories: Dict[str, Dict[str, np.ndarray]]  # column -> value -> row positions
+    ranges: Dict[str, Tuple[np.ndarray, np.ndarray]]  # column -> (row positions sorted by value, sorted values)
+
+    def rows_in_range(self, column: str, low: float = None, high: float = None) -> np.ndarray:
+        """Positions of the rows with ``low <= value <= high`` in the range column."""
+        order, values = self.ranges[column]
+        start = 0 if low is None else np.searchsorted(values, low, side="left")
+        stop = len(values) if high is None else np.searchsorted(values, high, side="right")
+        return order[start:stop]
+
+    def select(self, status: str = None, categories: Dict[str, Iterable[str]] = None,
+               ranges: Dict[str, Tuple[Optional[float], Optional[float]]] = None) -> np.ndarray:
+        """Mask of the rows matching all given filters.
+
+        Args:
+            status (str): Name of the status filter, see :data:`STATUS_FILTERS`.
+            categories (Dict[str, Iterable[str]]): Accepted values per categorical column.
+            ranges (Dict[str, Tuple]): Window ``(low, high)`` per range column, ``None`` for open ends.
+
+        Returns:
+            np.ndarray: Boolean mask over the row positions.
+        """
+        mask = np.ones(self.n_rows, dtype=bool)
+        selections = []
+        if status is not None:
+            selections.append(self.status[status])
+        for column, values in (categories or {}).items():
+            partition = self.categories[column]
+            rows = [partition[value] for value in values if value in partition]
+            selections.append(np.concatenate(rows) if rows else np.array([], dtype=int))
+        for column, (low, high) in (ranges or {}).items():
+            selections.append(self.rows_in_range(column, low, high))
+
+        for rows in selections:
+            selected = np.zeros(self.n_rows, dtype=bool)
+            selected[rows] = True
+            mask &= selected
+        return mask
+
+
+def build_filter_index(data: pd.DataFrame, status_filters: Dict[str, str] = None) -> FilterIndex:
+    """Precompute the row partitions of the data.
+    The index for the default filters is cached by the content of the :data:`FILTERED_COLUMNS`.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+        status_filters (Dict[str, str]): Named status filters. Defaults to :data:`STATUS_FILTERS`.
+
+    Returns:
+        FilterIndex: The row positions per filter.
+    """
+    key = None
+    if status_filters is None:
+        key = content_hash(data, FILTERED_COLUMNS)
+        if key in _CACHE:
+            return _CACHE[key]
+        status_filters = STATUS_FILTERS
+
+    positions = np.arange(len(data))
+    status = {name: positions if query is None else positions[data.eval(query).to_numpy(dtype=bool)]
+              for name, query in status_filters.items()}
+
+    categories = {}
+    for column in CATEGORY_COLUMNS:
+        codes, uniques = pd.factorize(data[column], sort=True)
+        categories[column] = {str(value): positions[codes == code] for code, value in enumerate(uniques)}
+
+    ranges = {}
+    for column in RANGE_COLUMNS:
+        values = data[column].to_numpy(dtype=float)
+        order = np.argsort(values, kind="stable")
+        order = order[~np.isnan(values[order])]
+        ranges[column] = (order, values[order])
+
+    index = FilterIndex(n_rows=len(data), status=status, categories=categories, ranges=ranges)
+    if key is not None:
+        _CACHE[key] = index
+    return index
@@ -0,0 +1,128 @@
+"""
+Matplotlib Labels
+*****************
+
+Batched drawing of the collider labels for matplotlib.
+
+Instead of one ``ax.annotate`` per collider, which requires text layout and
+font embedding for every single label at export time, the labels are converted
+once into glyph paths and drawn together as a single
+:class:`~matplotlib.collections.PathCollection`.
+The glyph paths and font metrics are cached per label text and alignment,
+so repeated exports of the same labels cost (almost) nothing.
+
+As the labels are paths, the text is not selectable in the exported vector
+graphics, but the collection can be rasterized as a whole if desired.
+"""
+from functools import lru_cache
+from typing import Iterable, Tuple
+
+import matplotlib as mpl
+import numpy as np
+from matplotlib.axes import Axes
+from matplotlib.collections import PathCollection
+from matplotlib.font_manager import FontProperties
+from matplotlib.path import Path
+from matplotlib.textpath import TextPath, text_to_path
+from matplotlib.transforms import Affine2D
+
+POINTS_PER_INCH = 72
+
+# maps the text position (relative to the marker) to the text alignment
+ALIGNMENT_MAP = {
+    "left": "right", "center": "center", "right": "left",
+    "top": "bottom", "middle": "center", "bottom": "top"
+}
+
+
+def text_offsets(pad: float) -> Tuple[dict, dict]:
+    """Offsets of the text from the marker, for each part of the text position.
+
+    Args:
+        pad (float): Basic padding between marker and text.
+
+    Returns:
+        Tuple[dict, dict]: Horizontal and vertical offsets.
+    """
+    hmap = {"left": -pad*2, "center": 0, "right": pad*2}
+    vmap = {"top": pad, "middle": 0, "bottom": -pad}
+    return hmap, vmap
+
+
+@lru_cache(maxsize=None)
+def text_metrics(text: str, prop: FontProperties) -> Tuple[float, float, float]:
+    """Cached width, height and descent of the text in points.
+
+    Args:
+        text (str): Text to measure.
+        prop (FontProperties): Font to use.
+
+    Returns:
+        Tuple[float, float, float]: width, height and descent.
+    """
+    return text_to_path.get_text_width_height_descent(text, prop, ismath=False)
+
+
+@lru_cache(maxsize=None)
+def label_path(text: str, textposition: str, prop: FontProperties, offset: Tuple[float, float]) -> Path:
+    """Cached glyph path of a label, aligned according to the textposition
+    and shifted by the offset, in points relative to the marker position.
+
+    Args:
+        text (str): Label text.
+        textposition (str): Plotly-style text position, e.g. "middle right".
+        prop (FontProperties): Font to use.
+        offset (Tuple[float, float]): Offset of the text from the marker in points.
+
+    Returns:
+        Path: Glyph path of the label.
+    """
+    v, h = textposition.split(" ")
+    width, height, descent = text_metrics(text, prop)
+    ha, va = ALIGNMENT_MAP[h], ALIGNMENT_MAP[v]
+
+    x = {"left": 0, "center": -width/2, "right": -width}[ha]
+    y = {"bottom": descent, "center": descent - height/2, "top": descent - height}[va]
+    path = TextPath((0, 0), text, prop=prop)
+    return path.transformed(Affine2D().translate(x + offset[0], y + offset[1]))
+
+
+def add_label_collection(ax: Axes, x: Iterable[float], y: Iterable[float],
+                         texts: Iterable[str], textpositions: Iterable[str],
+                         pad: float, rasterized: bool = False) -> PathCollection:
+    """Draw all labels as a single collection of glyph paths into the axes.
+
+    Args:
+        ax (Axes): Axes to draw into.
+        x (Iterable[float]): x-positions of the markers in data coordinates.
+        y (Iterable[float]): y-positions of the markers in data coordinates.
+        texts (Iterable[str]): Label texts.
+        textpositions (Iterable[str]): Plotly-style text positions, e.g. "middle right".
+        pad (float): Basic padding between marker and text in pixels
+                     (see :func:`text_offsets`).
+        rasterized (bool): Rasterize the labels in vector output.
+
+    Returns:
+        PathCollection: The added collection.
+    """
+    fig = ax.figure
+    prop = FontProperties()
+    hmap, vmap = text_offsets(pad * POINTS_PER_INCH / fig.dpi)  # pixels to points
+
+    paths = []
+    for text, textposition in zip(texts, textpositions):
+        v, h = textposition.split(" ")
+        paths.append(label_path(str(text), textposition, prop, (hmap[h], vmap[v])))
+
+    collection = PathCollection(
+        paths,
+        offsets=np.column_stack([np.asarray(x, dtype=float), np.asarray(y, dtype=float)]),
+        offset_transform=ax.transData,
+        transform=Affine2D().scale(1 / POINTS_PER_INCH) + fig.dpi_scale_trans,
+        facecolors=mpl.rcParams["text.color"],
+        edgecolors="none",
+        linewidths=0,
+        rasterized=rasterized,
+    )
+    ax.add_collection(collection, autolim=False)
+    return collection
@@ -0,0 +1,175 @@
+"""
+Name Search
+***********
+
+Fuzzy search over the names and institutes of the colliders,
+e.g. to find "HL-LHC" when searching for "lhc" or to suggest "ILC v1" for "ILC-v1".
+
+The texts are split into trigrams (after lower-casing and replacing all
+non-alphanumeric characters by spaces) and an inverted index from each trigram to
+the texts containing it is built.
+A query only looks up its own trigrams, the texts are ranked by the
+Dice coefficient of the trigram sets, i.e. ``2 * shared / (query + text)``.
+The same index is used in the browser by the search box of the interactive charts
+(see :func:`utilities.plotly_charts.search_script`).
+The index of the default columns is cached by their content.
+
+.. code-block:: python
+
+    index = build_name_index(data)
+    index.search("fcc ee")  # -> matches for FCC-ee Z, FCC-ee ZH, ...
+    index.did_you_mean("ILC v4")  # -> ["ILC v1", "ILC v2", "ILC v3"]
+
+"""
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utilities.content_cache import BoundedCache, content_hash
+from utilities.csv_reader import Column
+
+SEARCH_COLUMNS = (Column.NAME, Column.INSTITUTE)
+MIN_SCORE = 0.4  # minimal Dice coefficient of a match
+CACHE_SIZE = 16
+
+_CACHE: Dict[str, "NameIndex"] = BoundedCache(CACHE_SIZE)
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of the normalized text, padded with a space at either end.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        Set[str]: The trigrams.
+    """
+    padded = f" {re.sub(r'[^0-9a-z]+', ' ', str(text).lower()).strip()} "
+    return {padded[idx:idx + 3] for idx in range(len(padded) - 2)}
+
+
+@dataclass
+class SearchMatch:
+    text: str  # the matched name or institute
+    column: str
+    score: float  # Dice coefficient of the trigrams
+    rows: np.ndarray  # positions of the colliders with this text in the data
+
+
+@dataclass
+class NameIndex:
+    texts: np.ndarray  # the searchable texts, i.e. unique values per column
+    columns: np.ndarray  # column of each text
+    rows: List[np.ndarray]  # positions of the rows with the text, per text
+    sizes: np.ndarray  # number of trigrams per text
+    postings: Dict[str, np.ndarray]  # trigram -> texts containing it
+
+    def scores(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Dice coefficients of all texts sharing at least one trigram with the query.
+
+        Args:
+            query (str): The query.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Positions of the texts and their scores.
+        """
+        grams = trigrams(query)
+        hits = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not hits:
+            return np.array([], dtype=int), np.array([], dtype=float)
+        candidates, shared = np.unique(np.concatenate(hits), return_counts=True)
+        return candidates, 2 * shared / (len(grams) + self.sizes[candidates])
+
+    def search(self, query: str, limit: int = 5, min_score: float = MIN_SCORE,
+               columns: Sequence[str] = None) -> List[SearchMatch]:
+        """Find the texts most similar to the query.
+
+        Args:
+            query (str): The query.
+            limit (int): Maximum number of matches.
+            min_score (float): Minimal score of a match.
+            columns (Sequence[str]): Only search in these columns. Defaults to all.
+
+        Returns:
+            List[SearchMatch]: The matches, best first.
+        """
+        candidates, scores = self.scores(query)
+        keep = scores >= min_score
+        if columns is not None:
+            keep &= np.isin(self.columns[candidates], list(columns))
+        candidates, scores = candidates[keep], scores[keep]
+
+        best = np.argsort(-scores, kind="stable")[:limit]
+        return [SearchMatch(text=self.texts[idx], column=self.columns[idx], score=float(score), rows=self.rows[idx])
+                for idx, score in zip(candidates[best], scores[best])]
+
+    def did_you_mean(self, name: str, limit: int = 3) -> List[str]:
+        """Names of the colliders most similar to the given (unknown) name."""
+        return [match.text for match in self.search(name, limit=limit, columns=[Column.NAME])]
+
+
+def build_name_index(data: pd.DataFrame, columns: Sequence[str] = SEARCH_COLUMNS) -> NameIndex:
+    """Build the trigram index over the given columns of the data.
+    The index of the default columns is cached by their content.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+        columns (Sequence[str]): The columns to search in.
+
+    Returns:
+        NameIndex: The index.
+    """
+    key = content_hash(data, SEARCH_COLUMNS) if tuple(columns) == SEARCH_COLUMNS else None
+    if key in _CACHE:
+        return _CACHE[key]
+
+    positions = np.arange(len(data))
+    texts, text_columns, rows = [], [], []
+    for column in columns:
+        codes, uniques = pd.factorize(data[column])
+        for code, value in enumerate(uniques):
+            texts.append(str(value))
+            text_columns.append(column)
+            rows.append(positions[codes == code])
+
+    postings = defaultdict(list)
+    sizes = np.empty(len(texts), dtype=int)
+    for idx, text in enumerate(texts):
+        grams = trigrams(text)
+        sizes[idx] = len(grams)
+        for gram in grams:
+            postings[gram].append(idx)
+
+    index = NameIndex(
+        texts=np.array(texts, dtype=object),
+        columns=np.array(text_columns, dtype=object),
+        rows=rows,
+        sizes=sizes,
+        postings={gram: np.array(ids, dtype=int) for gram, ids in postings.items()},
+    )
+    if key is not None:
+        _CACHE[key] = index
+    return index
+
+
+def unknown_names(data: pd.DataFrame, names: Sequence[str]) -> Dict[str, List[str]]:
+    """Check which of the given names are not in the data.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+        names (Sequence[str]): Names of colliders, e.g. the keys of an override table.
+
+    Returns:
+        Dict[str, List[str]]: The unknown names with the most similar known names.
+    """
+    known = set(data[Column.NAME])
+    missing = [name for name in names if name not in known]
+    if not missing:
+        return {}
+
+    index = build_name_index(data)
+    return {name: index.did_you_mean(name) for name in missing}
@@ -0,0 +1,139 @@
+"""
+Operating Points
+****************
+
+Many rows of the catalogue are operating points of the same machine,
+e.g. the FCC-ee at the Z-pole and as Higgs-factory or the stages of CLIC.
+These are grouped into families, either by the ``Family`` column of the catalogue
+(if present, e.g. in merged catalogues) or by :data:`OPERATING_POINT_FAMILIES`.
+
+A family can be stored compactly as :class:`MachineFamily`: the attributes
+all operating points have in common (institute, country, references, ...)
+are stored once, only the attributes that vary are stored as arrays.
+
+The charts draw the operating points of these families as a connected series
+with a single label (see ``families`` of :func:`utilities.scene.build_scene`).
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from utilities.csv_reader import Column
+
+# manual assignment of operating points to their machine, in order of the points
+OPERATING_POINT_FAMILIES = {
+    "FCC-ee": ["FCC-ee Z", "FCC-ee WW", "FCC-ee ZH", "FCC-ee ttbar"],
+    "ILC": ["ILC v1", "ILC v2", "ILC v3"],
+    "CLIC": ["CLIC380", "CLIC1500", "CLIC3000"],
+    "Muon Collider": ["Muon v1", "Muon v2", "Muon v3"],
+    "FPP": ["FPP 24TeV", "FPP 27TeV"],
+    "HF2012": ["HF2012 Higgs", "HF2012 Z"],
+}
+
+
+def family_names(data: pd.DataFrame) -> pd.Series:
+    """Family of each row, taken from the ``Family`` column if present,
+    otherwise from :data:`OPERATING_POINT_FAMILIES`.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+
+    Returns:
+        pd.Series: Name of the family, NaN for rows not belonging to any family.
+    """
+    if Column.FAMILY in data.columns:
+        return data[Column.FAMILY]
+    family_of = {name: family for family, names in OPERATING_POINT_FAMILIES.items() for name in names}
+    return data[Column.NAME].map(family_of)
+
+
+def family_members(data: pd.DataFrame) -> Dict[str, pd.Index]:
+    """Rows of the families with at least two operating points in the data.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+
+    Returns:
+        Dict[str, pd.Index]: Index labels of the rows per family, in order of their first row.
+    """
+    families = family_names(data).dropna()
+    members = families.groupby(families, sort=False).groups
+    return {family: pd.Index(rows) for family, rows in members.items() if len(rows) > 1}
+
+
+@dataclass
+class MachineFamily:
+    name: str
+    index: pd.Index  # index labels of the operating points in the data
+    shared: Dict[str, Any]  # column -> value common to all operating points
+    variants: Dict[str, np.ndarray]  # column -> value per operating point
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def values(self, column: str) -> np.ndarray:
+        """Value of the column per operating point."""
+        if column in self.variants:
+            return self.variants[column]
+        value = self.shared[column]
+        return np.full(len(self), value, dtype=_shared_dtype(value))
+
+    def to_frame(self, columns: List[str] = None) -> pd.DataFrame:
+        """Expand the family into one row per operating point.
+
+        Args:
+            columns (List[str]): Order of the columns. Defaults to shared columns first.
+
+        Returns:
+            pd.DataFrame: The operating points.
+        """
+        frame = pd.DataFrame(self.variants, index=self.index)
+        for column, value in self.shared.items():
+            frame[column] = pd.Series([value] * len(self), index=self.index, dtype=_shared_dtype(value))
+        return frame[columns or list(self.shared) + list(self.variants)]
+
+
+def _shared_dtype(value: Any):
+    """ Keep the dtype of the numpy scalars, e.g. bool or int64. """
+    return value.dtype if isinstance(value, np.generic) else None
+
+
+def build_families(data: pd.DataFrame) -> Dict[str, MachineFamily]:
+    """Split the operating points of each family into shared and varying attributes.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+
+    Returns:
+        Dict[str, MachineFamily]: The families with at least two operating points.
+    """
+    families = {}
+    for family, rows in family_members(data).items():
+        points = data.loc[rows]
+        varying = points.nunique(dropna=False) > 1
+        families[family] = MachineFamily(
+            name=family,
+            index=rows,
+            shared={column: points[column].to_numpy()[0] for column in points.columns[~varying]},
+            variants={column: points[column].to_numpy() for column in points.columns[varying]},
+        )
+    return families
+
+
+def family_labels(data: pd.DataFrame) -> pd.Series:
+    """Labels with a single label per family: the first operating point of each family
+    is labelled with the name of the family, the others are not labelled.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+
+    Returns:
+        pd.Series: The labels, empty strings for unlabelled rows.
+    """
+    labels = data[Column.NAME].copy()
+    for family in build_families(data).values():
+        labels[family.index] = ""
+        labels[family.index[0]] = family.name
+    return labels
@@ -8,47 +8,107 @@ align the text in the plot.
 """
 
 from dataclasses import dataclass
-from typing import Protocol
+from typing import List, Sequence
 
 import pandas as pd
 
-from utilities.csv_reader import Column, import_collider_data
+from utilities.csv_reader import FIXED_TARGET, KIND_ATTR, Column, import_collider_data
+from utilities.name_search import unknown_names
 
 # Main Plot Configurations  ----------------------------------------------------
 
-class PlotConfiguration(Protocol):
+@dataclass(frozen=True)
+class PlotConfiguration:
+    """Definition of a chart: the columns to plot against each other, 
+    the axis labels, which axes are in log-scale and where to find the 
+    text positions of the labels. 
+    New configurations can be declared as data, see :func:`register_configuration`."""
+    name: str
     xcolumn: str
     ycolumn: str
-    textposition: str
-    label: str
-    logscale: str
-
-
-class EnergyConfiguration:
-    xcolumn = Column.START_YEAR
-    ycolumn = Column.COM_ENERGY
-    textposition = Column.TEXTPOSITION_COME
-    xlabel = "Year"
-    ylabel = "Center-of-Mass Energy [GeV]"
-    logscale = "y"
+    xlabel: str
+    ylabel: str
+    logscale: str = ""  # e.g. "y" or "xy"
+    textposition: str = None  # column with the text positions, DEFAULT_TEXT_POSITION if not given
+
+    @classmethod
+    def from_dict(cls, definition: dict) -> "PlotConfiguration":
+        """Create a configuration from a dictionary, e.g. as read from a file.
+        Labels default to the column names."""
+        definition = dict(definition)
+        definition.setdefault("xlabel", definition["xcolumn"])
+        definition.setdefault("ylabel", definition["ycolumn"])
+        return cls(**definition)
+
+
+EnergyConfiguration = PlotConfiguration(
+    name="energy",
+    xcolumn=Column.START_YEAR,
+    ycolumn=Column.COM_ENERGY,
+    textposition=Column.TEXTPOSITION_COME,
+    xlabel="Year",
+    ylabel="Center-of-Mass Energy [GeV]",
+    logscale="y",
+)
+
+
+LuminosityConfiguration = PlotConfiguration(
+    name="luminosity",
+    xcolumn=Column.START_YEAR,
+    ycolumn=Column.LUMINOSITY,
+    textposition=Column.TEXTPOSITION_LUMI,
+    xlabel="Year",
+    ylabel=r"$\mathrm{Peak\;Luminosity}\;\left[\mathrm{cm}^{-2}\mathrm{s}^{-1}\right]$",
+    logscale="y",
+)
+
+
+LuminosityOverEnergyConfiguration = PlotConfiguration(
+    name="luminosity-vs-energy",
+    xcolumn=EnergyConfiguration.ycolumn,
+    ycolumn=LuminosityConfiguration.ycolumn,
+    textposition=Column.TEXTPOSITION_LVCOME,
+    xlabel=EnergyConfiguration.ylabel,
+    ylabel=LuminosityConfiguration.ylabel,
+    logscale="xy",
+)
+
+
+# Beam energy of the fixed-target machines, i.e. of the data in ``Catalogue.fixed_target``
+# (see :func:`utilities.csv_reader.import_catalogue`). Not registered, 
+# as the registered configurations chart the colliders.
+FixedTargetEnergyConfiguration = PlotConfiguration(
+    name="fixed-target-energy",
+    xcolumn=Column.START_YEAR,
+    ycolumn=Column.ENERGY,
+    xlabel="Year",
+    ylabel="Beam Energy [GeV]",
+    logscale="y",
+)
+
+
+CONFIGURATIONS = {}
+
+
+def register_configuration(configuration) -> PlotConfiguration:
+    """Register a configuration, so that it can be accessed by its name 
+    in :data:`CONFIGURATIONS`, e.g. by the batch renderer.
 
+    Args:
+        configuration (PlotConfiguration, dict): The configuration or its definition 
+                                                 (see :meth:`PlotConfiguration.from_dict`).
 
-class LuminosityConfiguration:
-    xcolumn = Column.START_YEAR
-    ycolumn = Column.LUMINOSITY
-    textposition = Column.TEXTPOSITION_LUMI
-    xlabel = "Year"
-    ylabel = r"$\mathrm{Peak\;Luminosity}\;\left[\mathrm{cm}^{-2}\mathrm{s}^{-1}\right]$"
-    logscale = "y"
+    Returns:
+        PlotConfiguration: The registered configuration.
+    """
+    if isinstance(configuration, dict):
+        configuration = PlotConfiguration.from_dict(configuration)
+    CONFIGURATIONS[configuration.name] = configuration
+    return configuration
 
 
-class LuminosityOverEnergyConfiguration:
-    xcolumn = EnergyConfiguration.ycolumn
-    ycolumn = LuminosityConfiguration.ycolumn
-    textposition = Column.TEXTPOSITION_LVCOME
-    xlabel = EnergyConfiguration.ylabel
-    ylabel = LuminosityConfiguration.ylabel
-    logscale = "xy"
+for _configuration in (EnergyConfiguration, LuminosityConfiguration, LuminosityOverEnergyConfiguration):
+    register_configuration(_configuration)
 
 
 # Plotting Symbols, Text and Colors --------------------------------------------
@@ -82,6 +142,17 @@ PARTICLE_TYPES = [
         ParticleTypeMap("muon-antimuon", "mu+mu-", r"$\mu^+\mu^-$", LEPTON_SYMBOL, "#9467bd"),
 ]
 
+FIXED_TARGET_TYPES = [  # particles of the beam of fixed-target machines
+        ParticleTypeMap("proton", "p+", r"$p$", HADRON_SYMBOL, "#8c564b"),
+]
+
+
+def particle_types_of(data: pd.DataFrame) -> List[ParticleTypeMap]:
+    """The particle types to plot the data with: :data:`FIXED_TARGET_TYPES` for the 
+    fixed-target machines (as marked in the ``attrs`` by :func:`utilities.csv_reader.import_catalogue`),
+    :data:`PARTICLE_TYPES` otherwise."""
+    return FIXED_TARGET_TYPES if data.attrs.get(KIND_ATTR) == FIXED_TARGET else PARTICLE_TYPES
+
 def check_all_types_accounted_for(data: pd.DataFrame = None) -> None:
     """Helper function to check if all particle types in the list are accounted for and hence will be plotted.
     
@@ -91,15 +162,49 @@ def check_all_types_accounted_for(data: pd.DataFrame = None) -> None:
     if data is None: 
         data = import_collider_data()
 
-    particle_types = [ptype.shorthand for ptype in PARTICLE_TYPES]
+    particle_types = [ptype.shorthand for ptype in particle_types_of(data)]
     missing = [ptype for ptype in set(data[Column.TYPE]) if ptype not in particle_types]
 
     if missing:
+        list_name = "FIXED_TARGET_TYPES" if data.attrs.get(KIND_ATTR) == FIXED_TARGET else "PARTICLE_TYPES"
         raise ValueError("The following particle-types are missing, "
-                         "please add them to the PARTICLE_TYPES list in utilities.plot_helper: "
+                         f"please add them to the {list_name} list in utilities.plot_helper: "
                          f"{missing}")
 
 
+@dataclass
+class TraceGroup:
+    particle_type: ParticleTypeMap
+    built: bool
+    mask: pd.Series  # rows of the data in this group
+
+
+def partition_data(data: pd.DataFrame, particle_types: Sequence[ParticleTypeMap] = None) -> List[TraceGroup]:
+    """Partition the data into the groups that are drawn as one trace each,
+    i.e. per particle type the built and the not built colliders.
+    The partition only depends on the data, so it can be shared by all charts,
+    e.g. the panels of a dashboard.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+        particle_types (Sequence[ParticleTypeMap]): Particle types to partition by.
+                                                    Defaults to :func:`particle_types_of` the data.
+
+    Returns:
+        List[TraceGroup]: The groups, in the order of the particle types, built first.
+    """
+    if particle_types is None:
+        particle_types = particle_types_of(data)
+
+    groups = []
+    for particle_type in particle_types:
+        particle_mask = data[Column.TYPE] == particle_type.shorthand
+        for has_been_built in (True, False):
+            builtmask = data[Column.BUILT] if has_been_built else ~data[Column.BUILT]
+            groups.append(TraceGroup(particle_type, has_been_built, particle_mask & builtmask))
+    return groups
+
+
 # Text Positions ---------------------------------------------------------------
 
 DEFAULT_TEXT_POSITION = "middle right"
@@ -158,6 +263,21 @@ SPECIAL_ORIENTATION_LUMI_ENERGY = {
 }
 
 
+def get_textposition(data: pd.DataFrame, configuration: PlotConfiguration) -> pd.Series:
+    """Get the text positions for the given configuration.
+    
+    Args:
+        data (pd.DataFrame): DataFrame containing the (modified) accelerator timeline data.
+        configuration (PlotConfiguration): The plot configuration.
+
+    Returns:
+        pd.Series: Text positions, aligned with the data.
+    """
+    if configuration.textposition is None:
+        return pd.Series(DEFAULT_TEXT_POSITION, index=data.index)
+    return data[configuration.textposition]
+
+
 def assign_textposition(data: pd.DataFrame) -> pd.DataFrame:
     """Create two columns, which will tell the plot where the text should be placed.
     
@@ -179,4 +299,30 @@ def assign_textposition(data: pd.DataFrame) -> pd.DataFrame:
     data[Column.TEXTPOSITION_LVCOME] = data[Column.NAME].apply(
         lambda name: SPECIAL_ORIENTATION_LUMI_ENERGY.get(name, DEFAULT_TEXT_POSITION)
     )
-    return data
\ No newline at end of file
+    return data
+
+
+def check_all_names_accounted_for(data: pd.DataFrame = None) -> None:
+    """Helper function to check if all names in the text orientation tables are in the data,
+    as otherwise their label silently falls back to the default position.
+    
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+    """
+    if data is None: 
+        data = import_collider_data()
+
+    tables = {
+        "SPECIAL_ORIENTATION_ENERGY": SPECIAL_ORIENTATION_ENERGY,
+        "SPECIAL_ORIENTATION_LUMI": SPECIAL_ORIENTATION_LUMI,
+        "SPECIAL_ORIENTATION_LUMI_ENERGY": SPECIAL_ORIENTATION_LUMI_ENERGY,
+    }
+    problems = []
+    for table_name, table in tables.items():
+        for name, suggestions in unknown_names(data, list(table)).items():
+            hint = f" (did you mean {', '.join(repr(s) for s in suggestions)}?)" if suggestions else ""
+            problems.append(f"'{name}' in {table_name}{hint}")
+
+    if problems:
+        raise ValueError("The following names in the text orientation tables in utilities.plot_helper "
+                         "are not in the data: " + "; ".join(problems))
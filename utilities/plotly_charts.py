@@ -0,0 +1,416 @@
+"""
+Plotly Charts
+*************
+
+Plotting function for the interactive charts via plotly, 
+as used in :mod:`interactive_charts`, and a dashboard of all charts in one figure.
+The charts are rendered from the backend-neutral scene, see :mod:`utilities.scene`.
+
+The charts can get filter menus (status, institute, country, start year and
+center-of-mass energy), which only swap precomputed selections of the points
+in the browser (see :mod:`utilities.filter_index`).
+HTML exports can get a search box, which highlights the colliders whose
+name or institute fuzzily matches the query (see :mod:`utilities.name_search`).
+"""
+import json
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from utilities.axis_layout import AxisLayout
+from utilities.csv_reader import Column
+from utilities.filter_index import STATUS_FILTERS, build_filter_index
+from utilities.name_search import MIN_SCORE, build_name_index
+from utilities.plot_helper import CONFIGURATIONS, PlotConfiguration, partition_data
+from utilities.scene import HOVER_LABELS, HOVER_TITLE, Scene, build_scene
+
+
+# Hide the points that are not selected by the filter menus
+UNSELECTED_STYLE = {"marker": {"opacity": 0}, "textfont": {"color": "rgba(0,0,0,0)"}}
+# Fade the points that are not highlighted in the dashboard
+UNSELECTED_DASHBOARD_STYLE = {"marker": {"opacity": 0.15}, "textfont": {"color": "rgba(0,0,0,0.15)"}}
+YEAR_WINDOW = 10  # [years] per entry of the start-year menu
+
+
+def hover_template(columns: Sequence[str]) -> str:
+    """Hover template for the values of the columns as ``customdata``,
+    see :data:`utilities.scene.HOVER_COLUMNS`."""
+    position = {column: idx for idx, column in enumerate(columns)}
+    name, institute, country = (f"%{{customdata[{position[column]}]}}" for column in HOVER_TITLE)
+    lines = [f"{name} ({institute}, {country})"]
+    lines += [f"{HOVER_LABELS[column]}: %{{customdata[{idx}]}}" for column, idx in position.items()
+              if column not in HOVER_TITLE]
+    return "<br>".join(lines) + "<extra></extra>"
+
+
+def plot(data: pd.DataFrame, configuration: PlotConfiguration, trends: bool = False, 
+         filters: bool = False, families: bool = False) -> go.Figure:
+    """Generate interactive plots with plotly, based on the given configuration, 
+    which defines the columns to use and the text positions.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the (modified) accelerator timeline data
+        configuration (PlotConfiguration): See :class:`utilities.plot_helper.PlotConfiguration`
+        trends (bool): Overlay the trend fits per particle-type family,
+                       see :mod:`utilities.trend_fit`.
+        filters (bool): Add filter menus, see :func:`add_filter_menus`.
+        families (bool): Connect the operating points of each machine and label them once,
+                         see :mod:`utilities.operating_points`.
+
+    Returns:
+        go.Figure: plotly figure 
+    """
+    scene = build_scene(data, configuration, trends=trends, families=families)
+    fig = render_scene(scene)
+    if filters:
+        add_filter_menus(fig, data, trace_rows(scene))
+    return fig
+
+
+def render_scene(scene: Scene, fig: go.Figure = None, row: int = None, col: int = None, 
+                 showlegend: bool = True) -> go.Figure:
+    """Render the scene (see :mod:`utilities.scene`) with plotly.
+
+    Args:
+        scene (Scene): The scene.
+        fig (go.Figure): Figure to add the traces to. A new one is created if not given.
+        row (int): Row of the subplot, if the figure has subplots.
+        col (int): Column of the subplot, if the figure has subplots.
+        showlegend (bool): Show the traces in the legend.
+
+    Returns:
+        go.Figure: plotly figure 
+    """
+    if fig is None:
+        fig = go.Figure()
+
+    for line in scene.families:
+        fig.add_trace(go.Scatter(
+            x=line.x, y=line.y,
+            mode="lines", line={"color": line.color, "width": 1}, opacity=0.6,
+            name=line.name, showlegend=False, hoverinfo="skip",
+        ), row=row, col=col)
+
+    for series in scene.series:
+        particle_type = series.particle_type
+        marker_suffix, legend = ("", "built") if series.built else ("-open", "not built")
+
+        fig.add_trace(go.Scatter(
+            x=series.x, 
+            y=series.y,
+            name=legend,
+            legendgroup=particle_type.name,
+            legendgrouptitle_text=particle_type.latex,
+            showlegend=showlegend,
+            text=series.texts,
+            textposition=series.textpositions,
+            mode="markers+text", 
+            marker={"symbol": f"{particle_type.symbol}{marker_suffix}", 
+                    "color": particle_type.color}, 
+            customdata=series.hover,
+            hovertemplate=hover_template(scene.hover_columns),
+        ), row=row, col=col)
+
+    for fit in scene.trends:
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([fit.x, fit.x[::-1]]),
+            y=np.concatenate([fit.upper, fit.lower[::-1]]),
+            fill="toself", fillcolor=fit.family.color, opacity=0.2,
+            line={"width": 0}, mode="lines",
+            legendgroup="trends", showlegend=False, hoverinfo="skip",
+        ), row=row, col=col)
+        fig.add_trace(go.Scatter(
+            x=fit.x, y=fit.y,
+            mode="lines", line={"color": fit.family.color, "dash": "dash"},
+            name=f"{fit.family.name} trend",
+            legendgroup="trends", legendgrouptitle_text="Trends",
+            showlegend=showlegend,
+            hovertemplate=f"{fit.family.name} trend<extra></extra>",
+        ), row=row, col=col)
+
+    format_axes(fig, scene, row=row, col=col)
+    fig.update_layout(
+        plot_bgcolor='white',
+    )
+    return fig
+
+
+def trace_rows(scene: Scene) -> List[Optional[np.ndarray]]:
+    """Positions of the rows of the data in each trace of the rendered scene,
+    ``None`` for traces not showing colliders (i.e. family lines and trends)."""
+    return [None] * len(scene.families) + [series.rows for series in scene.series] + [None, None] * len(scene.trends)
+
+
+def format_axes(fig: go.Figure, scene: Scene, row: int = None, col: int = None) -> None:
+    """Set the labels, scales, ranges and ticks of the axes, 
+    see :mod:`utilities.axis_layout`.
+
+    Args:
+        fig (go.Figure): The figure.
+        scene (Scene): The scene, defining the axes.
+        row (int): Row of the subplot, if the figure has subplots.
+        col (int): Column of the subplot, if the figure has subplots.
+    """
+    xlayout, ylayout = scene.xaxis.layout, scene.yaxis.layout
+    fig.update_xaxes(
+        title=scene.xaxis.label, 
+        type=xlayout.scale,
+        range=_plotly_range(xlayout),
+        dtick=xlayout.major_step, 
+        minor=dict(dtick="D1" if xlayout.is_log else xlayout.minor_step, ticks="outside"),
+        exponentformat="power" if xlayout.tick_format == "power" else "none",
+        ticks='outside',
+        showline=True,
+        linecolor='black',
+        gridcolor='lightgrey',
+        row=row, col=col,
+    )
+    fig.update_yaxes(
+        title=scene.yaxis.label, 
+        type=ylayout.scale,
+        range=_plotly_range(ylayout),
+        ticks='outside',
+        dtick=ylayout.major_step, 
+        minor=dict(dtick="D1" if ylayout.is_log else ylayout.minor_step, ticks="outside", showgrid=False),
+        exponentformat="power" if ylayout.tick_format == "power" else "none",
+        showline=True,
+        linecolor='black',
+        gridcolor='lightgrey',
+        # tickformat='e',
+        row=row, col=col,
+    )
+
+
+# Dashboard --------------------------------------------------------------------
+
+# Highlight the clicked or selected colliders in all panels, double-click to reset.
+# Used as ``post_script`` of the HTML export, see :func:`write_dashboard_html`.
+DASHBOARD_SCRIPT = """
+const dashboard = document.getElementById('{plot_id}');
+function highlight(names) {
+    const selected = dashboard.data.map(trace => (names === null || !trace.customdata) ? null :
+        trace.customdata.map((point, index) => names.has(point[0]) ? index : -1).filter(index => index >= 0));
+    Plotly.restyle(dashboard, {selectedpoints: selected});
+}
+const selectedNames = event => new Set(event.points.filter(p => p.customdata).map(p => p.customdata[0]));
+dashboard.on('plotly_click', event => highlight(selectedNames(event)));
+dashboard.on('plotly_selected', event => highlight(event ? selectedNames(event) : null));
+dashboard.on('plotly_doubleclick', () => highlight(null));
+"""
+DASHBOARD_PANEL_WIDTH = 700  # [px]
+DASHBOARD_HEIGHT = 650  # [px]
+
+
+def plot_dashboard(data: pd.DataFrame, configurations: Sequence[PlotConfiguration] = None, 
+                   trends: bool = False, families: bool = False) -> go.Figure:
+    """Compose the charts of all configurations into one figure with a panel each.
+    All panels are built from one partition of the data and share the legend,
+    i.e. toggling a particle type affects all panels.
+    Axes showing the same column are linked, so zooming one zooms the other.
+    
+    Args:
+        data (pd.DataFrame): DataFrame containing the (modified) accelerator timeline data
+        configurations (Sequence[PlotConfiguration]): The charts to show. 
+                                                      Defaults to all registered configurations.
+        trends (bool): Overlay the trend fits per particle-type family.
+        families (bool): Connect the operating points of each machine and label them once.
+
+    Returns:
+        go.Figure: plotly figure 
+    """
+    if configurations is None:
+        configurations = list(CONFIGURATIONS.values())
+
+    groups = partition_data(data)
+    fig = make_subplots(rows=1, cols=len(configurations), horizontal_spacing=0.3 / len(configurations))
+    for idx, configuration in enumerate(configurations):
+        scene = build_scene(data, configuration, trends=trends, families=families, groups=groups)
+        render_scene(scene, fig, row=1, col=idx + 1, showlegend=idx == 0)
+
+    for axis in ("x", "y"):
+        first_axis = {}  # column -> first axis showing it
+        for idx, configuration in enumerate(configurations):
+            column = getattr(configuration, f"{axis}column")
+            name = f"{axis}{idx + 1 if idx else ''}"
+            if column in first_axis:
+                fig.layout[f"{axis}axis{idx + 1}"].matches = first_axis[column]
+            else:
+                first_axis[column] = name
+
+    fig.update_traces(unselected=UNSELECTED_DASHBOARD_STYLE, selector={"mode": "markers+text"})
+    fig.update_layout(
+        plot_bgcolor='white',
+        width=DASHBOARD_PANEL_WIDTH * len(configurations), 
+        height=DASHBOARD_HEIGHT,
+        clickmode="event+select",
+    )
+    return fig
+
+
+def write_dashboard_html(fig: go.Figure, path: Path, **kwargs) -> None:
+    """Write the dashboard as HTML, with the colliders highlighted in all panels
+    when clicked or selected in one of them.
+
+    Args:
+        fig (go.Figure): The dashboard, see :func:`plot_dashboard`.
+        path (Path): Output path.
+        kwargs: Passed on to :meth:`plotly.graph_objects.Figure.write_html`.
+    """
+    kwargs.setdefault("include_plotlyjs", "cdn")
+    fig.write_html(path, post_script=DASHBOARD_SCRIPT, **kwargs)
+
+
+# Filter Menus -----------------------------------------------------------------
+
+def add_filter_menus(fig: go.Figure, data: pd.DataFrame, trace_rows: List[Optional[np.ndarray]]) -> go.Figure:
+    """Add dropdown menus to filter the points by status, institute, country,
+    start year and center-of-mass energy (if the data has any).
+    The selections of all menu entries are precomputed (see :mod:`utilities.filter_index`),
+    so that choosing an entry only swaps the selected points in the browser.
+    As plotly menus act independently, each menu replaces the filter of the others.
+
+    Args:
+        fig (go.Figure): The figure.
+        data (pd.DataFrame): DataFrame containing the (modified) accelerator timeline data.
+        trace_rows (List[Optional[np.ndarray]]): Positions of the rows of the data in each trace,
+                                                 ``None`` for traces not to filter (e.g. trends).
+
+    Returns:
+        go.Figure: The figure with the menus.
+    """
+    index = build_filter_index(data)
+
+    start_years = data[Column.START_YEAR].dropna()
+    year_windows = {}
+    if len(start_years):
+        first_year = int(start_years.min()) // YEAR_WINDOW * YEAR_WINDOW
+        year_windows = {f"{year}-{year + YEAR_WINDOW - 1}": (year, year + YEAR_WINDOW - 1) 
+                        for year in range(first_year, int(start_years.max()) + 1, YEAR_WINDOW)}
+
+    energies = data[Column.COM_ENERGY].to_numpy(dtype=float)
+    energy_decades = np.log10(energies[np.isfinite(energies) & (energies > 0)])
+    energy_windows = {}
+    if len(energy_decades):  # e.g. not for fixed-target machines, which have no center-of-mass energy
+        energy_windows = {f"{10.0**decade:g}-{10.0**(decade + 1):g} GeV": (10.0**decade, 10.0**(decade + 1))
+                          for decade in range(int(np.floor(energy_decades.min())), 
+                                              int(np.floor(energy_decades.max())) + 1)}
+
+    menus = {
+        "Status": {name: index.select(status=name) for name in STATUS_FILTERS},
+        "Institute": {value: index.select(categories={Column.INSTITUTE: [value]}) 
+                      for value in index.categories[Column.INSTITUTE]},
+        "Country": {value: index.select(categories={Column.COUNTRY: [value]}) 
+                    for value in index.categories[Column.COUNTRY]},
+        "Start": {name: index.select(ranges={Column.START_YEAR: window}) for name, window in year_windows.items()},
+        "Energy": {name: index.select(ranges={Column.COM_ENERGY: window}) for name, window in energy_windows.items()},
+    }
+    menus = {title: entries for title, entries in menus.items() if entries}  # skip menus without windows
+
+    fig.update_traces(unselected=UNSELECTED_STYLE, selector={"mode": "markers+text"})
+
+    updatemenus, annotations = [], []
+    for idx, (title, entries) in enumerate(menus.items()):
+        buttons = [{"label": "all", "method": "restyle", "args": [{"selectedpoints": [None] * len(trace_rows)}]}]
+        buttons += [{"label": label, "method": "restyle", "args": [{"selectedpoints": _selections(mask, trace_rows)}]}
+                    for label, mask in entries.items() if label != "all"]
+        x = idx / len(menus)
+        updatemenus.append({"buttons": buttons, "x": x, "xanchor": "left", "y": 1.08, "yanchor": "bottom",
+                            "direction": "down", "showactive": True})
+        annotations.append({"text": title, "x": x, "xref": "paper", "xanchor": "left", 
+                            "y": 1.16, "yref": "paper", "yanchor": "bottom", "showarrow": False})
+    fig.update_layout(updatemenus=updatemenus, annotations=annotations, margin={"t": 120})
+    return fig
+
+
+def _selections(mask: np.ndarray, trace_rows: List[Optional[np.ndarray]]) -> list:
+    """ Indices of the selected points within each trace, ``None`` selects all. """
+    return [None if rows is None else np.flatnonzero(mask[rows]).tolist() for rows in trace_rows]
+
+
+def _plotly_range(layout: AxisLayout) -> list:
+    """ Plotly expects the range of log-axes in log-units. """
+    if layout.is_log:
+        return [np.log10(limit) for limit in layout.limits]
+    return list(layout.limits)
+
+
+# Search Box -------------------------------------------------------------------
+
+SEARCH_SCRIPT = """
+const searchPlot = document.getElementById('{plot_id}');
+const searchIndex = SEARCH_INDEX;
+function searchTrigrams(text) {
+    const padded = ' ' + text.toLowerCase().replace(/[^0-9a-z]+/g, ' ').trim() + ' ';
+    const grams = new Set();
+    for (let idx = 0; idx + 3 <= padded.length; idx++) grams.add(padded.slice(idx, idx + 3));
+    return grams;
+}
+function searchNames(query) {
+    const grams = searchTrigrams(query), shared = new Map(), names = new Set();
+    grams.forEach(gram => (searchIndex.postings[gram] || []).forEach(id => shared.set(id, (shared.get(id) || 0) + 1)));
+    shared.forEach((count, id) => {
+        if (2 * count / (grams.size + searchIndex.sizes[id]) >= searchIndex.min_score) {
+            searchIndex.names[id].forEach(name => names.add(name));
+        }
+    });
+    return names;
+}
+const searchBox = document.createElement('input');
+searchBox.type = 'search';
+searchBox.placeholder = 'Search collider or institute';
+searchPlot.parentNode.insertBefore(searchBox, searchPlot);
+searchBox.addEventListener('input', () => {
+    const names = searchBox.value.trim() ? searchNames(searchBox.value) : null;
+    const selected = searchPlot.data.map(trace => (names === null || !trace.customdata) ? null :
+        trace.customdata.map((point, index) => names.has(point[0]) ? index : -1).filter(index => index >= 0));
+    Plotly.restyle(searchPlot, {selectedpoints: selected});
+});
+"""
+
+
+def search_script(data: pd.DataFrame) -> str:
+    """Script adding a search box to the HTML export of a chart,
+    to be passed as ``post_script`` to e.g. :meth:`plotly.graph_objects.Figure.write_html`.
+    The trigram index of the names and institutes is embedded into the script,
+    so the search runs in the browser.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the (modified) accelerator timeline data.
+
+    Returns:
+        str: The script.
+    """
+    index = build_name_index(data)
+    names = data[Column.NAME].to_numpy()
+    payload = {
+        "postings": {gram: ids.tolist() for gram, ids in index.postings.items()},
+        "sizes": index.sizes.tolist(),
+        "names": [names[rows].tolist() for rows in index.rows],
+        "min_score": MIN_SCORE,
+    }
+    # escape "</" so that names like "</script>" cannot end the script tag
+    index_json = json.dumps(payload, separators=(",", ":")).replace("</", "<\\/")
+    return SEARCH_SCRIPT.replace("SEARCH_INDEX", index_json)
+
+
+def to_search_html(fig: go.Figure, data: pd.DataFrame, **kwargs) -> str:
+    """HTML of the chart with a search box, see :func:`search_script`.
+    Points not matching the query are faded. The given figure is not changed.
+
+    Args:
+        fig (go.Figure): The chart, see :func:`plot`.
+        data (pd.DataFrame): DataFrame containing the (modified) accelerator timeline data.
+        kwargs: Passed on to :meth:`plotly.graph_objects.Figure.to_html`.
+
+    Returns:
+        str: The HTML, by default as ``div`` to embed into a page.
+    """
+    kwargs.setdefault("include_plotlyjs", "cdn")
+    kwargs.setdefault("full_html", False)
+    fig = go.Figure(fig)
+    fig.update_traces(unselected=UNSELECTED_DASHBOARD_STYLE, selector={"mode": "markers+text"})
+    return fig.to_html(post_script=search_script(data), **kwargs)
@@ -0,0 +1,161 @@
+"""
+Raster Export
+*************
+
+Create all raster sizes of a figure (full resolution, web size, thumbnail)
+from a single render.
+The figure is rendered once into an in-memory RGBA buffer, the smaller sizes
+are downsampled from this buffer and all sizes are then PNG-compressed in
+parallel, optionally with maximum (optipng-like) compression.
+
+Works with matplotlib figures (via :func:`render_figure`) and
+plotly figures (via :func:`render_plotly_figure`).
+Sizes whose pixels did not change are neither compressed nor rewritten,
+see :mod:`utilities.export_cache`.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import List, Sequence, Union
+
+from PIL import Image
+
+from utilities.export_cache import digest, write_if_changed
+
+# matplotlib is only imported when needed, 
+# as the interactive charts only require plotly
+Figure = "matplotlib.figure.Figure"
+
+
+@dataclass(frozen=True)
+class RasterSize:
+    suffix: str  # added to the file stem
+    width: int = None  # in pixels, ``None`` for the full render resolution
+
+
+FULL_SIZE = RasterSize("")
+WEB_SIZE = RasterSize("-web", 1200)
+THUMBNAIL_SIZE = RasterSize("-thumb", 400)
+
+RASTER_SIZES = (FULL_SIZE, WEB_SIZE, THUMBNAIL_SIZE)
+
+
+def render_figure(fig: Figure, dpi: float = None) -> Image.Image:
+    """Render a matplotlib figure into an in-memory image.
+
+    Args:
+        fig (Figure): Matplotlib figure.
+        dpi (float): Resolution to render at. Defaults to ``savefig.dpi``.
+
+    Returns:
+        Image.Image: Rendered RGBA image.
+    """
+    import matplotlib as mpl
+
+    if dpi is None:
+        dpi = mpl.rcParams["savefig.dpi"]
+    if dpi == "figure":
+        dpi = fig.dpi
+
+    with BytesIO() as buffer:
+        fig.savefig(buffer, format="rgba", dpi=dpi)
+        rgba = buffer.getvalue()
+
+    width, height = (int(size) for size in fig.get_size_inches() * dpi)
+    if width * height * 4 != len(rgba):  # rounding in the size computation
+        height = len(rgba) // (4 * width)
+    return Image.frombuffer("RGBA", (width, height), rgba, "raw", "RGBA", 0, 1)
+
+
+def render_plotly_figure(fig, scale: float = 1) -> Image.Image:
+    """Render a plotly figure into an in-memory image.
+    Requires ``kaleido``, as for :func:`plotly.io.write_image`.
+
+    Args:
+        fig (go.Figure): Plotly figure.
+        scale (float): Scale factor for the render resolution.
+
+    Returns:
+        Image.Image: Rendered image.
+    """
+    image = Image.open(BytesIO(fig.to_image(format="png", scale=scale)))
+    image.load()
+    return image
+
+
+def downsample(image: Image.Image, width: int = None) -> Image.Image:
+    """Downsample the image to the given width, keeping the aspect ratio.
+
+    Args:
+        image (Image.Image): Image to downsample.
+        width (int): Target width in pixels. ``None`` or larger than the
+                     image width returns the image itself.
+
+    Returns:
+        Image.Image: Downsampled image.
+    """
+    if width is None or width >= image.width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+
+
+def image_digest(image: Image.Image) -> str:
+    """Digest of the pixels of the image, independent of its encoding.
+
+    Args:
+        image (Image.Image): The image.
+
+    Returns:
+        str: Hex digest, see :func:`utilities.export_cache.digest`.
+    """
+    return digest(f"{image.mode} {image.width}x{image.height} ".encode() + image.tobytes())
+
+
+def _png_digest(path: Path, mode: str) -> str:
+    """ Digest of the pixels of an existing PNG, in the mode of the new image. """
+    with Image.open(path) as existing:
+        return image_digest(existing.convert(mode))
+
+
+def _write_png(image: Image.Image, path: Path, optimize: bool) -> Path:
+    write_if_changed(path, image_digest(image), 
+                     lambda output: image.save(output, format="png", optimize=optimize),
+                     file_digest=lambda existing: _png_digest(existing, image.mode))
+    return path
+
+
+def save_rasters(image: Union[Image.Image, Figure], stem: Union[Path, str],
+                 sizes: Sequence[RasterSize] = RASTER_SIZES,
+                 optimize: bool = False, workers: int = None,
+                 resized_dir: Union[Path, str] = None) -> List[Path]:
+    """Save the image as PNG in all given sizes.
+
+    Args:
+        image (Image.Image, Figure): Rendered image or matplotlib figure,
+                                     which will be rendered once.
+        stem (Path, str): Output path without suffix, e.g. ``images/energy``.
+                          The :class:`RasterSize` suffix and ``.png`` are added.
+        sizes (Sequence[RasterSize]): Sizes to create.
+        optimize (bool): Use maximum PNG compression (slower, smaller files).
+        workers (int): Number of threads for compression. Defaults to one per size.
+        resized_dir (Path, str): Directory of the downsampled sizes, e.g. ``build/images``
+                                 to keep them out of the tracked images.
+                                 Defaults to the directory of the stem.
+
+    Returns:
+        List[Path]: Paths of the files, including the unchanged ones that were not rewritten.
+    """
+    if not isinstance(image, Image.Image):
+        image = render_figure(image)
+
+    stem = Path(stem)
+    images = [downsample(image, size.width) for size in sizes]
+    resized_dir = stem.parent if resized_dir is None else Path(resized_dir)
+    resized_dir.mkdir(parents=True, exist_ok=True)
+    paths = [(stem.parent if size.width is None else resized_dir) / f"{stem.name}{size.suffix}.png" for size in sizes]
+
+    # zlib releases the GIL, so threads compress in parallel
+    with ThreadPoolExecutor(max_workers=workers or len(sizes)) as executor:
+        return list(executor.map(_write_png, images, paths, [optimize] * len(paths)))
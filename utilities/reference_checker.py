@@ -0,0 +1,313 @@
+"""
+Reference Checker
+*****************
+
+Check the links in the ``References`` column of the catalogue.
+
+Every reference is checked for a valid URL format and for duplicates
+within the same row. Unless running offline, all unique URLs are requested
+concurrently (``HEAD``, falling back to ``GET`` for servers not supporting it)
+with a bounded number of simultaneous requests over a shared connection pool.
+The results are cached on disk, so that only URLs not checked within
+the time-to-live of the cache are requested again.
+Transient failures (timeouts, connection errors, server errors) are only cached
+for a short time (:data:`TRANSIENT_TTL`), so that they are retried in the next run.
+
+Run the check from the root of this repository via::
+
+    python -m utilities.reference_checker
+    python -m utilities.reference_checker --offline
+
+The checks require ``aiohttp`` to be installed (see ``requirements_check_references.txt``),
+except in offline mode.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+from urllib.parse import urlparse
+
+import pandas as pd
+
+from utilities.csv_reader import CSV_PATH, MAIN_DIR, Column, read_raw_data
+
+CACHE_PATH = MAIN_DIR / "build" / "reference-cache.json"
+CACHE_TTL = 7 * 24 * 3600  # [s]
+TRANSIENT_TTL = 3600  # [s] for transient failures
+
+CONCURRENCY = 32  # simultaneous requests
+CONCURRENCY_PER_HOST = 4
+TIMEOUT = 20  # [s] per request
+USER_AGENT = "accelerator-timeline-reference-checker"
+
+VALID_SCHEMES = ("http", "https")
+HEAD_NOT_SUPPORTED = (403, 405, 501)  # retry these with GET
+TRANSIENT_STATUS = (408, 429)  # in addition to server errors (5xx)
+
+
+@dataclass
+class LinkStatus:
+    url: str
+    ok: bool
+    status: Optional[int] = None  # HTTP status code, None if the request failed
+    error: Optional[str] = None
+    checked: float = 0  # time of the check [s since epoch]
+
+    @property
+    def is_transient(self) -> bool:
+        """ The request failed for a (possibly) temporary reason, e.g. a timeout or a server error. """
+        return self.status is None or self.status >= 500 or self.status in TRANSIENT_STATUS
+
+
+@dataclass
+class ReferenceProblem:
+    name: str
+    url: str
+    problem: str
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.url} ({self.problem})"
+
+
+# References -------------------------------------------------------------------
+
+def split_references(data: pd.DataFrame) -> pd.DataFrame:
+    """Split the whitespace separated references into one row per URL.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the (raw) accelerator timeline data.
+
+    Returns:
+        pd.DataFrame: Columns ``Name`` and ``References``, one row per URL.
+    """
+    references = data[[Column.NAME, Column.REFERENCES]].dropna(subset=[Column.REFERENCES])
+    references = references.assign(**{Column.REFERENCES: references[Column.REFERENCES].str.split()})
+    return references.explode(Column.REFERENCES).dropna().reset_index(drop=True)
+
+
+def format_error(url: str) -> Optional[str]:
+    """Check the format of the URL.
+
+    Args:
+        url (str): The URL.
+
+    Returns:
+        Optional[str]: Description of the problem, ``None`` if the format is valid.
+    """
+    try:
+        parsed = urlparse(url)
+        hostname = parsed.hostname
+    except ValueError as e:  # e.g. unbalanced brackets of an IPv6 host
+        return f"invalid URL ({e})"
+    if parsed.scheme not in VALID_SCHEMES:
+        return f"invalid scheme '{parsed.scheme}'"
+    if hostname is None or "." not in hostname and hostname != "localhost":
+        return "invalid host"
+    return None
+
+
+def check_offline(references: pd.DataFrame) -> List[ReferenceProblem]:
+    """Check the format of the URLs and for duplicated references within a row.
+
+    Args:
+        references (pd.DataFrame): References, as returned by :func:`split_references`.
+
+    Returns:
+        List[ReferenceProblem]: The problems found.
+    """
+    problems = []
+    for name, url in zip(references[Column.NAME], references[Column.REFERENCES]):
+        error = format_error(url)
+        if error is not None:
+            problems.append(ReferenceProblem(name, url, error))
+
+    counts = Counter(zip(references[Column.NAME], references[Column.REFERENCES]))
+    problems += [ReferenceProblem(name, url, f"duplicate ({count}x)")
+                 for (name, url), count in counts.items() if count > 1]
+    return problems
+
+
+# Cache ------------------------------------------------------------------------
+
+class LinkCache:
+    """Results of previous link checks, stored as JSON.
+
+    Args:
+        path (Path, str): Path to the cache file.
+        ttl (float): Time-to-live of the entries [s].
+        transient_ttl (float): Time-to-live of the entries of transient failures [s],
+                               see :attr:`LinkStatus.is_transient`.
+    """
+
+    def __init__(self, path: Union[Path, str] = CACHE_PATH, ttl: float = CACHE_TTL,
+                 transient_ttl: float = TRANSIENT_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.transient_ttl = min(ttl, transient_ttl)
+        self.entries: Dict[str, LinkStatus] = {}
+        if self.path.is_file():
+            self.entries = {url: LinkStatus(**entry) for url, entry in json.loads(self.path.read_text()).items()}
+
+    def get(self, url: str) -> Optional[LinkStatus]:
+        """Cached status of the URL, ``None`` if not cached or expired."""
+        status = self.entries.get(url)
+        if status is None:
+            return None
+        ttl = self.transient_ttl if status.is_transient else self.ttl
+        if time.time() - status.checked > ttl:
+            return None
+        return status
+
+    def update(self, statuses: Iterable[LinkStatus]) -> None:
+        for status in statuses:
+            self.entries[status.url] = status
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({url: asdict(status) for url, status in self.entries.items()}, indent=1))
+        tmp_path.replace(self.path)
+
+
+# Online Check -----------------------------------------------------------------
+
+async def _check_url(session, semaphore: asyncio.Semaphore, url: str) -> LinkStatus:
+    async with semaphore:
+        status, error = None, None
+        for method in ("HEAD", "GET"):
+            try:
+                async with session.request(method, url, allow_redirects=True) as response:
+                    status = response.status
+            except Exception as e:  # connection errors, timeouts, invalid URLs, ...
+                status, error = None, f"{type(e).__name__}: {e}".rstrip(": ")
+            else:
+                error = None
+            if status is not None and status not in HEAD_NOT_SUPPORTED:
+                break
+    return LinkStatus(url=url, ok=status is not None and status < 400,
+                      status=status, error=error, checked=time.time())
+
+
+async def check_urls_async(urls: Iterable[str], concurrency: int = CONCURRENCY,
+                           concurrency_per_host: int = CONCURRENCY_PER_HOST,
+                           timeout: float = TIMEOUT) -> List[LinkStatus]:
+    """Request all URLs concurrently, over a shared connection pool.
+
+    Args:
+        urls (Iterable[str]): The URLs to check.
+        concurrency (int): Maximum number of simultaneous requests.
+        concurrency_per_host (int): Maximum number of simultaneous connections per host.
+        timeout (float): Timeout per request [s].
+
+    Returns:
+        List[LinkStatus]: Status per URL, in the order of the given URLs.
+    """
+    try:
+        import aiohttp
+    except ImportError as e:
+        raise ImportError("Checking the references online requires 'aiohttp' to be installed. "
+                          "Use the offline mode to only check the format.") from e
+
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency_per_host)
+    async with aiohttp.ClientSession(connector=connector,
+                                     timeout=aiohttp.ClientTimeout(total=timeout),
+                                     headers={"User-Agent": USER_AGENT}) as session:
+        return await asyncio.gather(*(_check_url(session, semaphore, url) for url in urls))
+
+
+def check_urls(urls: Iterable[str], cache: LinkCache = None, **kwargs) -> Dict[str, LinkStatus]:
+    """Check the unique URLs, requesting only those without a valid cache entry.
+
+    Args:
+        urls (Iterable[str]): The URLs to check.
+        cache (LinkCache): Cache of previous results. It is updated and saved.
+                           If not given, all URLs are requested.
+        kwargs: Passed on to :func:`check_urls_async`.
+
+    Returns:
+        Dict[str, LinkStatus]: Status per unique URL.
+    """
+    urls = list(dict.fromkeys(urls))
+    statuses = {}
+    if cache is not None:
+        statuses = {url: cache.get(url) for url in urls}
+        statuses = {url: status for url, status in statuses.items() if status is not None}
+
+    to_request = [url for url in urls if url not in statuses]
+    if to_request:
+        requested = asyncio.run(check_urls_async(to_request, **kwargs))
+        statuses.update({status.url: status for status in requested})
+        if cache is not None:
+            cache.update(requested)
+            cache.save()
+    return {url: statuses[url] for url in urls}
+
+
+def check_references(data: pd.DataFrame, offline: bool = False, cache: LinkCache = None,
+                     **kwargs) -> List[ReferenceProblem]:
+    """Check all references of the catalogue.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the (raw) accelerator timeline data.
+        offline (bool): Only check the format and for duplicates.
+        cache (LinkCache): Cache of previous link checks, see :func:`check_urls`.
+        kwargs: Passed on to :func:`check_urls_async`.
+
+    Returns:
+        List[ReferenceProblem]: The problems found.
+    """
+    references = split_references(data)
+    problems = check_offline(references)
+    if offline:
+        return problems
+
+    invalid = {problem.url for problem in problems if not problem.problem.startswith("duplicate")}
+    urls = [url for url in references[Column.REFERENCES] if url not in invalid]
+    statuses = check_urls(urls, cache, **kwargs)
+    for name, url in zip(references[Column.NAME], references[Column.REFERENCES]):
+        status = statuses.get(url)
+        if status is not None and not status.ok:
+            problems.append(ReferenceProblem(name, url, status.error or f"HTTP {status.status}"))
+    return problems
+
+
+# Command Line -----------------------------------------------------------------
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m utilities.reference_checker",
+        description="Check the links in the References column of the catalogue.",
+    )
+    parser.add_argument("--csv", type=Path, default=CSV_PATH, help="Path to the catalogue CSV file.")
+    parser.add_argument("--offline", action="store_true", help="Only check the URL format and for duplicates.")
+    parser.add_argument("--cache", type=Path, default=CACHE_PATH, help="Path to the cache file.")
+    parser.add_argument("--no-cache", action="store_true", help="Request all URLs, ignoring the cache.")
+    parser.add_argument("--ttl", type=float, default=CACHE_TTL / 3600, help="Time-to-live of the cache [h].")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Maximum simultaneous requests.")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help="Timeout per request [s].")
+    return parser
+
+
+def main(args: Sequence[str] = None) -> int:
+    opt = get_parser().parse_args(args)
+    cache = None if opt.no_cache else LinkCache(opt.cache, ttl=opt.ttl * 3600)
+
+    start = time.perf_counter()
+    data = read_raw_data(opt.csv)
+    kwargs = {} if opt.offline else {"concurrency": opt.concurrency, "timeout": opt.timeout}
+    problems = check_references(data, offline=opt.offline, cache=cache, **kwargs)
+    for problem in problems:
+        print(problem)
+    print(f"Checked {len(split_references(data))} references in {time.perf_counter() - start:.2f}s, "
+          f"found {len(problems)} problems.")
+    return int(bool(problems))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
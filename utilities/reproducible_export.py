@@ -0,0 +1,260 @@
+"""
+Reproducible Export
+*******************
+
+Export of the figures into byte-reproducible files,
+i.e. the same figure always results in the same bytes,
+so that regenerated images only show up as changes if their content changed
+and the files can be stored content-addressed (see :func:`content_address`).
+
+For matplotlib, all time-dependent metadata is removed, the software versions
+are replaced by a fixed producer and the settings influencing the output
+(compression, font embedding, SVG ids) are fixed, see :data:`REPRODUCIBLE_RC`.
+PDFs written by plotly (via ``kaleido``) are normalized afterwards:
+dates are set to a fixed value, the producer is replaced (if it fits into its entry)
+and the document ID is derived from the content.
+PNGs are re-encoded without metadata.
+The PNGs of :func:`utilities.raster_export.save_rasters` are written by
+Pillow without metadata and are therefore reproducible already.
+
+Files whose content did not change are not rewritten, see :mod:`utilities.export_cache`.
+"""
+import hashlib
+import re
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, List, Tuple, Union
+
+from utilities.export_cache import digest, write_if_changed
+
+# matplotlib and plotly are only imported when needed,
+# as each export script only requires one of them
+Figure = "matplotlib.figure.Figure"
+
+PRODUCER = "accelerator_timeline"
+FIXED_PDF_DATE = b"D:20000101000000Z"
+
+REPRODUCIBLE_RC = {
+    "pdf.compression": 6,
+    "pdf.fonttype": 42,  # embed TrueType subsets
+    "ps.fonttype": 42,
+    "svg.fonttype": "path",
+    "svg.hashsalt": PRODUCER,  # deterministic ids
+}
+
+METADATA = {  # per format, see ``metadata`` of :meth:`matplotlib.figure.Figure.savefig`
+    "pdf": {"CreationDate": None, "Creator": PRODUCER, "Producer": PRODUCER},
+    "svg": {"Date": None, "Creator": PRODUCER},
+    "png": {"Software": PRODUCER},
+}
+
+PDF_DATE_REGEX = re.compile(rb"/(CreationDate|ModDate)\s*\((D:[^)]*)\)")
+PDF_ID_REGEX = re.compile(rb"/ID\s*\[\s*<([0-9A-Fa-f]*)>\s*<([0-9A-Fa-f]*)>\s*\]")
+PDF_PRODUCER_REGEX = re.compile(rb"/(Producer|Creator)\s*\(([^)]*)\)")
+PDF_STARTXREF_REGEX = re.compile(rb"startxref\s+(\d+)\s+%%EOF")
+PDF_INFO_REF_REGEX = re.compile(rb"/Info\s+(\d+)\s+(\d+)\s+R")
+
+
+def content_address(data: bytes) -> str:
+    """Address of the content, e.g. for content-addressed storage.
+
+    Args:
+        data (bytes): The content.
+
+    Returns:
+        str: SHA-256 hex digest.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+# Normalization ----------------------------------------------------------------
+
+def normalize_pdf(data: bytes) -> bytes:
+    """Replace the dates, producer and document ID of the PDF with fixed values.
+    Only the trailers (with the document ID) and the document information dictionaries
+    (with the dates and producer) are changed, never the content streams.
+    The length of all replaced entries is kept, so the cross-reference table stays valid.
+
+    Args:
+        data (bytes): The PDF.
+
+    Returns:
+        bytes: The normalized PDF.
+    """
+    trailers = _trailer_spans(data)
+    info = _info_spans(data, trailers)
+    data = _sub_in_spans(PDF_DATE_REGEX, data, info,
+                         lambda m: _same_length(m.group(0), b"/%s (%s)" % (m.group(1), FIXED_PDF_DATE)))
+    data = _sub_in_spans(PDF_PRODUCER_REGEX, data, info,
+                         lambda m: _same_length(m.group(0), b"/%s (%s)" % (m.group(1), PRODUCER.encode())))
+
+    # the document ID is derived from the content without it
+    digest = hashlib.sha256(_sub_in_spans(PDF_ID_REGEX, data, trailers, b"")).hexdigest().upper().encode()
+    return _sub_in_spans(PDF_ID_REGEX, data, trailers, 
+                         lambda m: _same_length(m.group(0), b"/ID [<%s><%s>]" % (_repeat(digest, len(m.group(1))),
+                                                                                 _repeat(digest, len(m.group(2))))))
+
+
+def _trailer_spans(data: bytes) -> List[Tuple[int, int]]:
+    """ Spans of the trailer dictionaries, or of the dictionaries of the cross-reference streams,
+    found via the ``startxref`` offsets (one per incremental update). """
+    spans = []
+    for match in PDF_STARTXREF_REGEX.finditer(data):
+        start = int(match.group(1))
+        if data.startswith(b"xref", start):  # cross-reference table, followed by the trailer
+            start, end = data.find(b"trailer", start), match.start()
+        else:  # cross-reference stream, the trailer entries are in its dictionary
+            end = data.find(b"stream", start)
+        if 0 <= start < end:
+            spans.append((start, end))
+    return spans
+
+
+def _info_spans(data: bytes, trailers: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """ Spans of the document information dictionaries referenced in the trailers. """
+    spans = []
+    references = {ref for start, end in trailers for ref in PDF_INFO_REF_REGEX.findall(data, start, end)}
+    for number, generation in references:
+        for match in re.finditer(rb"(?<![0-9])%s\s+%s\s+obj\b" % (number, generation), data):
+            end = data.find(b"endobj", match.end())
+            if end > 0:
+                spans.append((match.start(), end))
+    return spans
+
+
+def _sub_in_spans(regex: re.Pattern, data: bytes, spans: List[Tuple[int, int]], 
+                  replacement: Union[bytes, Callable[[re.Match], bytes]]) -> bytes:
+    """ Substitute the matches of the regex only within the (non-overlapping) spans of the data. """
+    pieces, last = [], 0
+    for start, end in sorted(spans):
+        if start < last:
+            continue
+        pieces += [data[last:start], regex.sub(replacement, data[start:end])]
+        last = end
+    pieces.append(data[last:])
+    return b"".join(pieces)
+
+
+def _same_length(old: bytes, new: bytes) -> bytes:
+    """ Pad the new entry with whitespace to the length of the old one, keep the old one if too long. """
+    return new.ljust(len(old)) if len(new) <= len(old) else old
+
+
+def _repeat(value: bytes, length: int) -> bytes:
+    return (value * (length // len(value) + 1))[:length]
+
+
+def normalize_png(data: bytes) -> bytes:
+    """Re-encode the PNG without any metadata chunks.
+
+    Args:
+        data (bytes): The PNG.
+
+    Returns:
+        bytes: The normalized PNG.
+    """
+    from PIL import Image
+
+    with Image.open(BytesIO(data)) as image:
+        image.load()
+        clean = Image.frombytes(image.mode, image.size, image.tobytes())
+        if image.mode == "P":
+            clean.putpalette(image.getpalette())
+    with BytesIO() as buffer:
+        clean.save(buffer, format="png")
+        return buffer.getvalue()
+
+
+def normalize(data: bytes, fmt: str) -> bytes:
+    """Normalize the exported file of the given format, see :func:`normalize_pdf` and :func:`normalize_png`."""
+    if fmt == "pdf":
+        return normalize_pdf(data)
+    if fmt == "png":
+        return normalize_png(data)
+    return data
+
+
+# Export -----------------------------------------------------------------------
+
+def figure_bytes(fig: Figure, fmt: str, rc: dict = None, **kwargs) -> bytes:
+    """Export the matplotlib figure reproducibly into memory.
+
+    Args:
+        fig (Figure): Matplotlib figure.
+        fmt (str): Output format, e.g. ``pdf``, ``png`` or ``svg``.
+        rc (dict): rcParams overriding :data:`REPRODUCIBLE_RC`, e.g. ``{"pdf.fonttype": 3}``.
+        kwargs: Passed on to :meth:`matplotlib.figure.Figure.savefig`.
+
+    Returns:
+        bytes: The exported file.
+    """
+    import matplotlib as mpl
+
+    kwargs.setdefault("metadata", METADATA.get(fmt))
+    with mpl.rc_context({**REPRODUCIBLE_RC, **(rc or {})}), BytesIO() as buffer:
+        fig.savefig(buffer, format=fmt, **kwargs)
+        data = buffer.getvalue()
+    return normalize_pdf(data) if fmt == "pdf" else data
+
+
+def plotly_figure_bytes(fig, fmt: str, **kwargs) -> bytes:
+    """Export the plotly figure reproducibly into memory.
+    Requires ``kaleido``, as for :func:`plotly.io.write_image`.
+
+    Args:
+        fig (go.Figure): Plotly figure.
+        fmt (str): Output format, e.g. ``pdf``, ``png`` or ``svg``.
+        kwargs: Passed on to :meth:`plotly.graph_objects.Figure.to_image`.
+
+    Returns:
+        bytes: The exported file.
+    """
+    return normalize(fig.to_image(format=fmt, **kwargs), fmt)
+
+
+def savefig(fig: Figure, path: Union[Path, str], format: str = None, **kwargs) -> Path:
+    """Reproducible replacement of :meth:`matplotlib.figure.Figure.savefig`.
+
+    Args:
+        fig (Figure): Matplotlib figure.
+        path (Path, str): Output path.
+        format (str): Output format. Defaults to the suffix of the path.
+        kwargs: Passed on to :meth:`matplotlib.figure.Figure.savefig`.
+
+    Returns:
+        Path: The written path.
+    """
+    path = Path(path)
+    return write_bytes(path, figure_bytes(fig, format or path.suffix[1:], **kwargs))
+
+
+def write_image(fig, path: Union[Path, str], format: str = None, **kwargs) -> Path:
+    """Reproducible replacement of :func:`plotly.io.write_image`.
+
+    Args:
+        fig (go.Figure): Plotly figure.
+        path (Path, str): Output path.
+        format (str): Output format. Defaults to the suffix of the path.
+        kwargs: Passed on to :meth:`plotly.graph_objects.Figure.to_image`.
+
+    Returns:
+        Path: The written path.
+    """
+    path = Path(path)
+    return write_bytes(path, plotly_figure_bytes(fig, format or path.suffix[1:], **kwargs))
+
+
+def write_bytes(path: Path, data: bytes) -> Path:
+    """Write the exported file, unless it exists with the same content
+    (see :mod:`utilities.export_cache`).
+
+    Args:
+        path (Path): Output path.
+        data (bytes): The exported file.
+
+    Returns:
+        Path: The written path.
+    """
+    path = Path(path)
+    write_if_changed(path, digest(data), lambda output: output.write_bytes(data))
+    return path
@@ -0,0 +1,230 @@
+"""
+Scene
+*****
+
+Backend-neutral description of a chart, built once from the data and a
+:class:`utilities.plot_helper.PlotConfiguration`.
+The scene contains everything the backends have in common:
+which colliders are drawn in which series, their markers, labels and text positions,
+the hover information, the trend fits, the lines connecting the operating points
+of a machine and the axis layouts.
+The renderers only translate the scene into their plotting library:
+
+- ``matplotlib``: :func:`export_charts.render_scene`
+- ``plotly``: :func:`utilities.plotly_charts.render_scene`
+- ``svg``: :func:`utilities.svg_renderer.render_scene`, a fast raw SVG writer,
+  which does not need any plotting library.
+
+.. code-block:: python
+
+    scene = build_scene(data, EnergyConfiguration)
+    svg = render(scene, "svg")
+
+Additional renderers can be added with :func:`register_renderer`.
+The renderers are imported only when used, so that e.g. the SVG renderer
+does not import matplotlib or plotly.
+"""
+import importlib
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from utilities.axis_layout import AxisLayout, get_axis_layouts
+from utilities.csv_reader import COLLIDERS, FIXED_TARGET, KIND_ATTR, Column
+from utilities.operating_points import build_families, family_labels
+from utilities.plot_helper import (ParticleTypeMap, PlotConfiguration, TraceGroup, get_textposition,
+                                   partition_data, particle_types_of)
+from utilities.trend_fit import TrendFit, fit_trends
+
+# Columns shown in the hover information per kind of data (see utilities.csv_reader.KIND_ATTR), in this order
+HOVER_COLUMNS = {
+    COLLIDERS: (Column.NAME, Column.TYPE, Column.COM_ENERGY, Column.LUMINOSITY,
+                Column.LENGTH, Column.YEARS, Column.INSTITUTE, Column.COUNTRY),
+    FIXED_TARGET: (Column.NAME, Column.TYPE, Column.ENERGY, Column.LENGTH,
+                   Column.YEARS, Column.INSTITUTE, Column.COUNTRY),
+}
+HOVER_TITLE = (Column.NAME, Column.INSTITUTE, Column.COUNTRY)  # first line: "name (institute, country)"
+HOVER_LABELS = {  # of the other lines
+    Column.TYPE: "Particles",
+    Column.COM_ENERGY: "Center-of-Mass Energy [GeV]",
+    Column.ENERGY: "Beam Energy [GeV]",
+    Column.LUMINOSITY: "Luminosity [cm^-2s^-1]",  # plain text, as plotly does not support latex in hover
+    Column.LENGTH: "Length [m]",
+    Column.YEARS: "Operation",
+}
+
+
+@dataclass
+class MarkerSeries:
+    """Colliders of one particle type, either built or not built."""
+    particle_type: ParticleTypeMap
+    built: bool  # built colliders have filled markers and are shown in the legend
+    rows: np.ndarray  # positions of the colliders in the data
+    x: np.ndarray
+    y: np.ndarray
+    texts: np.ndarray  # labels, empty strings for unlabelled colliders
+    textpositions: np.ndarray  # e.g. "middle right"
+    hover: np.ndarray  # values of the hover columns of the scene, one row per collider (particle type name instead of type)
+
+
+@dataclass
+class FamilyLine:
+    """Line connecting the operating points of one machine, see :mod:`utilities.operating_points`."""
+    name: str
+    color: str
+    x: np.ndarray
+    y: np.ndarray
+
+
+@dataclass
+class SceneAxis:
+    label: str
+    layout: AxisLayout
+
+
+@dataclass
+class Scene:
+    name: str
+    xaxis: SceneAxis
+    yaxis: SceneAxis
+    series: List[MarkerSeries]
+    trends: List[TrendFit] = field(default_factory=list)
+    families: List[FamilyLine] = field(default_factory=list)
+    hover_columns: Tuple[str, ...] = HOVER_COLUMNS[COLLIDERS]  # columns of the hover values of the series
+
+
+def build_scene(data: pd.DataFrame, configuration: PlotConfiguration,
+                trends: bool = False, families: bool = False, groups: List[TraceGroup] = None) -> Scene:
+    """Build the scene of the chart.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the (modified) accelerator timeline data
+        configuration (PlotConfiguration): See :class:`utilities.plot_helper.PlotConfiguration`
+        trends (bool): Include the trend fits per particle-type family,
+                       see :mod:`utilities.trend_fit`.
+        families (bool): Connect the operating points of each machine and only label the first one
+                         with the name of the machine, see :mod:`utilities.operating_points`.
+        groups (List[TraceGroup]): Partition of the data, see :func:`utilities.plot_helper.partition_data`.
+                                   Can be given to share it between scenes.
+
+    Returns:
+        Scene: The scene.
+    """
+    if groups is None:
+        groups = partition_data(data)
+
+    textpositions = get_textposition(data, configuration)
+    texts = family_labels(data) if families else data[Column.NAME]
+    hover_columns = HOVER_COLUMNS[data.attrs.get(KIND_ATTR, COLLIDERS)]
+    series = []
+    for group in groups:
+        mask = group.mask
+        hover = data.loc[mask, list(hover_columns)].to_numpy(dtype=object)
+        hover[:, hover_columns.index(Column.TYPE)] = group.particle_type.name
+        series.append(MarkerSeries(
+            particle_type=group.particle_type,
+            built=group.built,
+            rows=np.flatnonzero(mask.to_numpy()),
+            x=data.loc[mask, configuration.xcolumn].to_numpy(),
+            y=data.loc[mask, configuration.ycolumn].to_numpy(),
+            texts=texts[mask].to_numpy(),
+            textpositions=textpositions[mask].to_numpy(),
+            hover=hover,
+        ))
+
+    xlayout, ylayout = get_axis_layouts(data, configuration)
+    return Scene(
+        name=configuration.name,
+        xaxis=SceneAxis(configuration.xlabel, xlayout),
+        yaxis=SceneAxis(configuration.ylabel, ylayout),
+        series=series,
+        trends=fit_trends(data, configuration) if trends else [],
+        families=family_lines(data, configuration) if families else [],
+        hover_columns=hover_columns,
+    )
+
+
+def family_lines(data: pd.DataFrame, configuration: PlotConfiguration) -> List[FamilyLine]:
+    """Lines through the operating points of each machine, sorted along the x-axis
+    and colored by the particle type of the first operating point.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the (modified) accelerator timeline data
+        configuration (PlotConfiguration): See :class:`utilities.plot_helper.PlotConfiguration`
+
+    Returns:
+        List[FamilyLine]: One line per family with at least two operating points.
+    """
+    colors = {particle_type.shorthand: particle_type.color for particle_type in particle_types_of(data)}
+    lines = []
+    for family in build_families(data).values():
+        x, y = family.values(configuration.xcolumn), family.values(configuration.ycolumn)
+        order = np.lexsort((y, x))
+        lines.append(FamilyLine(
+            name=family.name,
+            color=colors.get(family.values(Column.TYPE)[0], "grey"),
+            x=x[order],
+            y=y[order],
+        ))
+    return lines
+
+
+# Renderers --------------------------------------------------------------------
+
+RENDERERS: Dict[str, Union[str, Callable]] = {
+    "matplotlib": "export_charts:render_scene",
+    "plotly": "utilities.plotly_charts:render_scene",
+    "svg": "utilities.svg_renderer:render_scene",
+}
+
+
+def register_renderer(name: str, renderer: Union[str, Callable]) -> None:
+    """Register a renderer.
+
+    Args:
+        name (str): Name of the backend.
+        renderer (str, Callable): Function turning a :class:`Scene` into the output of the backend,
+                                  or its import path as ``"module:function"``.
+    """
+    RENDERERS[name] = renderer
+
+
+def get_renderer(name: str) -> Callable:
+    """Get the renderer of the backend, importing it if needed.
+
+    Args:
+        name (str): Name of the backend, see :data:`RENDERERS`.
+
+    Returns:
+        Callable: The renderer.
+    """
+    if name not in RENDERERS:
+        raise KeyError(f"Unknown renderer '{name}'. Available are: {list(RENDERERS)}")
+
+    renderer = RENDERERS[name]
+    if isinstance(renderer, str):
+        module, function = renderer.split(":")
+        renderer = RENDERERS[name] = getattr(importlib.import_module(module), function)
+    return renderer
+
+
+def render(scene: Scene, backend: str, **kwargs) -> Any:
+    """Render the scene with the given backend.
+
+    Args:
+        scene (Scene): The scene.
+        backend (str): Name of the backend, see :data:`RENDERERS`.
+        kwargs: Options of the renderer.
+
+    Returns:
+        Any: The output of the renderer, e.g. the figure.
+    """
+    return get_renderer(backend)(scene, **kwargs)
+
+
+def render_all(scenes: Sequence[Scene], backend: str, **kwargs) -> List[Any]:
+    """Render multiple scenes with the same backend, see :func:`render`."""
+    renderer = get_renderer(backend)
+    return [renderer(scene, **kwargs) for scene in scenes]
@@ -0,0 +1,244 @@
+/*
+ * Accelerator Timeline - client-side view layer.
+ *
+ * Builds the chart views of the catalogue in the browser from the single
+ * data payload written by utilities/site_bundle.py.
+ * The rows are partitioned once per particle type and built-status,
+ * which is the trace structure of all views (as in utilities/plotly_charts.py),
+ * The filters are precomputed index arrays (see utilities/filter_index.py):
+ * per status filter, per value of the categorical columns and the row order
+ * of the range columns, so combining filters only intersects index arrays.
+ */
+"use strict";
+
+const AcceleratorTimeline = (() => {
+  const TYPED_ARRAYS = {
+    float64: Float64Array,
+    float32: Float32Array,
+    uint32: Uint32Array,
+    int32: Int32Array,
+    int16: Int16Array,
+    uint16: Uint16Array,
+    uint8: Uint8Array,
+  };
+
+  const HOVER_TEMPLATE = [
+    "%{customdata[0]} (%{customdata[6]}, %{customdata[7]})",
+    "Particles: %{customdata[1]}",
+    "Center-of-Mass Energy [GeV]: %{customdata[2]}",
+    "Luminosity [cm^-2s^-1]: %{customdata[3]}",
+    "Length [m]: %{customdata[4]}",
+    "Operation: %{customdata[5]}",
+  ].join("<br>") + "<extra></extra>";
+
+  // Decoding ------------------------------------------------------------------
+
+  function decodeArray(spec) {
+    const binary = atob(spec.data);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+    return new TYPED_ARRAYS[spec.dtype](bytes.buffer);
+  }
+
+  function decodeColumn(spec) {
+    if (spec.dtype !== "category") return decodeArray(spec);
+    const codes = decodeArray(spec.codes);
+    return Array.from(codes, code => (code < 0 ? null : spec.categories[code]));
+  }
+
+  function decode(payload) {
+    const columns = {};
+    for (const [name, spec] of Object.entries(payload.columns)) columns[name] = decodeColumn(spec);
+    const col = {};  // columns by role, see COLUMN_ROLES in utilities/site_bundle.py
+    for (const [role, name] of Object.entries(payload.roles)) col[role] = columns[name];
+
+    const filters = {};
+    for (const [name, spec] of Object.entries(payload.filters)) filters[name] = decodeArray(spec);
+
+    const categories = {};
+    for (const [column, partition] of Object.entries(payload.categories)) {
+      categories[column] = {};
+      for (const [value, spec] of Object.entries(partition)) categories[column][value] = decodeArray(spec);
+    }
+
+    const ranges = {};
+    for (const [column, spec] of Object.entries(payload.ranges)) {
+      ranges[column] = {order: decodeArray(spec.order), values: decodeArray(spec.values)};
+    }
+
+    const configurations = payload.configurations.map(view =>
+      Object.assign({}, view, {textposition: decodeColumn(view.textposition)}));
+
+    // partition of the rows into the traces: per particle type, built and not built
+    const traces = [];
+    for (const ptype of payload.particle_types) {
+      for (const built of [true, false]) {
+        const rows = [];
+        for (let i = 0; i < payload.n_rows; i++) {
+          if (col.type[i] === ptype.shorthand && Boolean(col.built[i]) === built) rows.push(i);
+        }
+        traces.push({ptype, built, rows: Uint32Array.from(rows)});
+      }
+    }
+    return {version: payload.version, nRows: payload.n_rows, columns, col, filters, categories, ranges,
+            configurations, traces};
+  }
+
+  async function load(url) {
+    const response = await fetch(url);
+    return decode(await response.json());
+  }
+
+  // Views ---------------------------------------------------------------------
+
+  function mask(timeline, indices) {
+    const selected = new Uint8Array(timeline.nRows);
+    for (const i of indices) selected[i] = 1;
+    return selected;
+  }
+
+  // first position in the sorted values with value >= x (or > x if `right`)
+  function bisect(values, x, right) {
+    let low = 0, high = values.length;
+    while (low < high) {
+      const mid = (low + high) >> 1;
+      if (values[mid] < x || (right && values[mid] === x)) low = mid + 1; else high = mid;
+    }
+    return low;
+  }
+
+  function rowsInRange(range, low, high) {
+    const start = low === null ? 0 : bisect(range.values, low, false);
+    const stop = high === null ? range.values.length : bisect(range.values, high, true);
+    return range.order.subarray(start, stop);
+  }
+
+  // Mask of the rows matching all filters, given as
+  // {status: name, categories: {column: value}, ranges: {column: [low, high]}}
+  // with null for "all" or open ends.
+  function select(timeline, state) {
+    const selections = [];
+    if (state.status) selections.push(timeline.filters[state.status]);
+    for (const [column, value] of Object.entries(state.categories || {})) {
+      if (value) selections.push(timeline.categories[column][value] || []);
+    }
+    for (const [column, [low, high]] of Object.entries(state.ranges || {})) {
+      if (low !== null || high !== null) selections.push(rowsInRange(timeline.ranges[column], low, high));
+    }
+
+    const counts = new Uint8Array(timeline.nRows);
+    for (const rows of selections) for (const i of rows) counts[i]++;
+    return counts.map(count => (count === selections.length ? 1 : 0));
+  }
+
+  function traceData(timeline, view, trace, rows) {
+    const col = timeline.col;
+    const pick = column => Array.from(rows, i => column[i]);
+    return {
+      type: "scatter",
+      mode: "markers+text",
+      x: pick(timeline.columns[view.xcolumn]),
+      y: pick(timeline.columns[view.ycolumn]),
+      text: pick(col.name),
+      textposition: pick(view.textposition),
+      name: trace.built ? "built" : "not built",
+      legendgroup: trace.ptype.name,
+      legendgrouptitle: {text: trace.ptype.latex},
+      marker: {symbol: trace.ptype.symbol + (trace.built ? "" : "-open"), color: trace.ptype.color},
+      customdata: Array.from(rows, i => [
+        col.name[i], trace.ptype.name, col.com_energy[i], col.luminosity[i],
+        col.length[i], col.years[i], col.institute[i], col.country[i],
+      ]),
+      hovertemplate: HOVER_TEMPLATE,
+    };
+  }
+
+  // the minor tick step of the axis comes with the payload, see encode_axis in utilities/site_bundle.py
+  function axisLayout(title, axis) {
+    return Object.assign({
+      title: {text: title},
+      ticks: "outside",
+      showline: true,
+      linecolor: "black",
+      gridcolor: "lightgrey",
+    }, axis, {
+      minor: Object.assign({ticks: "outside", showgrid: false}, axis.minor),
+    });
+  }
+
+  // Build the plotly traces and layout of the view, showing only the selected rows.
+  function figure(timeline, configurationName, selected) {
+    const view = timeline.configurations.find(c => c.name === configurationName);
+    const data = timeline.traces.map(trace =>
+      traceData(timeline, view, trace, trace.rows.filter(i => selected[i])));
+    const layout = {
+      plot_bgcolor: "white",
+      xaxis: axisLayout(view.xlabel, view.xaxis),
+      yaxis: axisLayout(view.ylabel, view.yaxis),
+    };
+    return {data, layout};
+  }
+
+  function render(timeline, element, configurationName, selected) {
+    const {data, layout} = figure(timeline, configurationName, selected);
+    return Plotly.react(element, data, layout, {responsive: true});
+  }
+
+  // Controls ------------------------------------------------------------------
+
+  function fillSelect(select, names) {
+    select.replaceChildren(...names.map(name => new Option(name, name)));
+  }
+
+  function labelled(text, input) {
+    const label = document.createElement("label");
+    label.append(text + " ", input);
+    return label;
+  }
+
+  function numberInput(placeholder) {
+    const input = document.createElement("input");
+    Object.assign(input, {type: "number", placeholder, step: "any", size: 8});
+    return input;
+  }
+
+  // Bind the configuration and status selects and add the widgets
+  // of the categorical and range filters into `controls.widgets`.
+  function bindControls(timeline, element, controls) {
+    fillSelect(controls.configuration, timeline.configurations.map(c => c.name));
+    fillSelect(controls.filter, Object.keys(timeline.filters));
+
+    const categorySelects = {};
+    for (const [column, partition] of Object.entries(timeline.categories)) {
+      const input = document.createElement("select");
+      input.replaceChildren(new Option("all", ""), ...Object.keys(partition).map(value => new Option(value, value)));
+      categorySelects[column] = input;
+      controls.widgets.append(labelled(column, input));
+    }
+
+    const rangeInputs = {};
+    for (const [column, range] of Object.entries(timeline.ranges)) {
+      const inputs = [numberInput(range.values[0]), numberInput(range.values[range.values.length - 1])];
+      rangeInputs[column] = inputs;
+      controls.widgets.append(labelled(column, inputs[0]), labelled("to", inputs[1]));
+    }
+
+    const value = input => (input.value === "" ? null : Number(input.value));
+    const update = () => {
+      const state = {
+        status: controls.filter.value,
+        categories: Object.fromEntries(Object.entries(categorySelects).map(([c, input]) => [c, input.value])),
+        ranges: Object.fromEntries(Object.entries(rangeInputs).map(([c, inputs]) => [c, inputs.map(value)])),
+      };
+      return render(timeline, element, controls.configuration.value, select(timeline, state));
+    };
+
+    for (const input of [controls.configuration, controls.filter, ...Object.values(categorySelects),
+                         ...Object.values(rangeInputs).flat()]) {
+      input.addEventListener("change", update);
+    }
+    return update();
+  }
+
+  return {load, decode, mask, select, figure, render, bindControls};
+})();
@@ -0,0 +1,236 @@
+"""
+Site Bundle
+***********
+
+Export of the catalogue for a static website: a single compact data file
+and a small client-side view layer (``utilities/site``), which builds all
+chart views (see :data:`utilities.plot_helper.CONFIGURATIONS`) and filters
+in the browser from the shared data.
+The catalogue is therefore downloaded only once and switching between
+charts or filters does not need any further request.
+
+The data file is JSON, with the numerical columns stored as base64-encoded
+little-endian typed arrays and the text columns dictionary-encoded
+(a list of the unique values and a typed array of codes).
+The row positions of the filters (see :mod:`utilities.filter_index`) are stored 
+as typed arrays as well, so that the filter widgets of the site
+(status, institute, country, start-year and energy window) can be combined
+in the browser by selecting precomputed index arrays.
+
+Build the bundle from the root of this repository via::
+
+    python -m utilities.site_bundle --output-dir build/site
+
+and serve the directory with any static web server.
+"""
+import argparse
+import base64
+import json
+import shutil
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utilities.axis_layout import AxisLayout, get_axis_layouts
+from utilities.csv_reader import MAIN_DIR, Column, catalogue_version, import_collider_data
+from utilities.filter_index import FilterIndex, build_filter_index
+from utilities.plot_helper import (CONFIGURATIONS, PARTICLE_TYPES, PlotConfiguration, assign_textposition,
+                                   get_textposition)
+
+SITE_DIR = Path(__file__).parent / "site"  # static files of the view layer
+OUTPUT_DIR = MAIN_DIR / "build" / "site"
+DATA_FILE = "timeline-data.json"
+
+NUMERIC_COLUMNS = {
+    Column.START_YEAR: "int16",
+    Column.COM_ENERGY: "float64",
+    Column.LUMINOSITY: "float64",
+    Column.LENGTH: "float64",
+    Column.BUILT: "uint8",
+    Column.FUTURE: "uint8",
+}
+ROW_DTYPE = "uint32"  # row positions, 32 bit so that large catalogues do not wrap around
+CODE_DTYPE = "int32"  # codes of the dictionary-encoded text columns, see ROW_DTYPE
+TEXT_COLUMNS = [Column.NAME, Column.TYPE, Column.INSTITUTE, Column.COUNTRY, Column.YEARS]
+
+# Columns the view layer needs to know by role, e.g. for the hover info
+COLUMN_ROLES = {
+    "name": Column.NAME,
+    "type": Column.TYPE,
+    "institute": Column.INSTITUTE,
+    "country": Column.COUNTRY,
+    "years": Column.YEARS,
+    "start": Column.START_YEAR,
+    "com_energy": Column.COM_ENERGY,
+    "luminosity": Column.LUMINOSITY,
+    "length": Column.LENGTH,
+    "built": Column.BUILT,
+    "future": Column.FUTURE,
+}
+
+
+
+# Encoding ---------------------------------------------------------------------
+
+def encode_array(values: Iterable, dtype: str) -> dict:
+    """Encode the values as base64 little-endian typed array,
+    to be decoded in the browser e.g. via ``new Float64Array(buffer)``.
+
+    Args:
+        values (Iterable): The values.
+        dtype (str): Numpy name of the dtype, which has a JavaScript typed-array equivalent.
+
+    Returns:
+        dict: ``dtype`` and base64-encoded ``data``.
+    """
+    array = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder("<"))
+    return {"dtype": dtype, "data": base64.b64encode(array.tobytes()).decode("ascii")}
+
+
+def encode_text(values: pd.Series) -> dict:
+    """Dictionary-encode the text values, missing values get the code ``-1``.
+
+    Args:
+        values (pd.Series): The values.
+
+    Returns:
+        dict: ``categories`` and encoded ``codes``.
+    """
+    categorical = pd.Categorical(values.astype("object").where(values.notna(), None))
+    return {
+        "dtype": "category",
+        "categories": [str(category) for category in categorical.categories],
+        "codes": encode_array(categorical.codes, CODE_DTYPE),
+    }
+
+
+def encode_axis(layout: AxisLayout) -> dict:
+    return {
+        "type": layout.scale,
+        "range": [float(np.log10(limit)) if layout.is_log else limit for limit in layout.limits],
+        "dtick": layout.major_step,
+        "minor": {"dtick": "D1" if layout.is_log else layout.minor_step},
+        "exponentformat": "power" if layout.tick_format == "power" else "none",
+    }
+
+
+# Payload ----------------------------------------------------------------------
+
+def build_payload(data: pd.DataFrame, configurations: Sequence[PlotConfiguration] = None,
+                  filters: Dict[str, str] = None) -> dict:
+    """Build the data payload of the site: the columns, the text positions per configuration,
+    the axis layouts and the row indices of the filters.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the (modified) accelerator timeline data,
+                             incl. the text positions (see :func:`utilities.plot_helper.assign_textposition`).
+        configurations (Sequence[PlotConfiguration]): The chart views.
+                                                      Defaults to all registered configurations.
+        filters (Dict[str, str]): Named status filters as query strings.
+                                  Defaults to :data:`utilities.filter_index.STATUS_FILTERS`.
+
+    Returns:
+        dict: The payload, serializable as JSON.
+    """
+    if configurations is None:
+        configurations = list(CONFIGURATIONS.values())
+
+    data = data.reset_index(drop=True)
+    index = build_filter_index(data, filters)
+    columns = {column: encode_array(data[column].to_numpy(dtype=float), dtype)
+               for column, dtype in NUMERIC_COLUMNS.items()}
+    columns.update({column: encode_text(data[column]) for column in TEXT_COLUMNS})
+
+    views = []
+    for configuration in configurations:
+        for column in (configuration.xcolumn, configuration.ycolumn):
+            if column not in columns:
+                columns[column] = encode_array(data[column].to_numpy(dtype=float), "float64")
+        xlayout, ylayout = get_axis_layouts(data, configuration)
+        views.append({
+            "name": configuration.name,
+            "xcolumn": configuration.xcolumn,
+            "ycolumn": configuration.ycolumn,
+            "xlabel": configuration.xlabel,
+            "ylabel": configuration.ylabel,
+            "xaxis": encode_axis(xlayout),
+            "yaxis": encode_axis(ylayout),
+            "textposition": encode_text(pd.Series(get_textposition(data, configuration))),
+        })
+
+    return {
+        "version": catalogue_version(data),
+        "n_rows": len(data),
+        "columns": columns,
+        "roles": COLUMN_ROLES,
+        "configurations": views,
+        "particle_types": [vars(ptype) for ptype in PARTICLE_TYPES],
+        **encode_filter_index(index),
+    }
+
+
+def encode_filter_index(index: FilterIndex) -> dict:
+    """Encode the row positions of the filters, see :class:`utilities.filter_index.FilterIndex`.
+
+    Args:
+        index (FilterIndex): The filter index.
+
+    Returns:
+        dict: ``filters`` (status filters), ``categories`` and ``ranges``.
+    """
+    return {
+        "filters": {name: encode_array(rows, ROW_DTYPE) for name, rows in index.status.items()},
+        "categories": {column: {value: encode_array(rows, ROW_DTYPE) for value, rows in partition.items()}
+                       for column, partition in index.categories.items()},
+        "ranges": {column: {"order": encode_array(order, ROW_DTYPE), "values": encode_array(values, "float64")}
+                   for column, (order, values) in index.ranges.items()},
+    }
+
+
+def write_bundle(output_dir: Path = OUTPUT_DIR, data: pd.DataFrame = None, **kwargs) -> Path:
+    """Write the data file and copy the view layer into the output directory.
+
+    Args:
+        output_dir (Path): Directory of the site.
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+                             If not given, the catalogue is loaded.
+        kwargs: Passed on to :func:`build_payload`.
+
+    Returns:
+        Path: Path to the data file.
+    """
+    if data is None:
+        data = assign_textposition(import_collider_data())
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for static_file in SITE_DIR.iterdir():
+        shutil.copy2(static_file, output_dir / static_file.name)
+
+    data_path = output_dir / DATA_FILE
+    data_path.write_text(json.dumps(build_payload(data, **kwargs), separators=(",", ":")))
+    return data_path
+
+
+# Command Line -----------------------------------------------------------------
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m utilities.site_bundle",
+        description="Export the catalogue and the client-side chart views as static website.",
+    )
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR, help="Directory of the site.")
+    return parser
+
+
+def main(args: Sequence[str] = None) -> None:
+    opt = get_parser().parse_args(args)
+    data_path = write_bundle(opt.output_dir)
+    print(f"Written {data_path} ({data_path.stat().st_size / 1024:.1f} kB).")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
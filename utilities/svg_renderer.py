@@ -0,0 +1,267 @@
+"""
+SVG Renderer
+************
+
+Fast renderer of a :class:`utilities.scene.Scene` into a raw SVG string,
+without importing any plotting library.
+Meant for web-ready charts, e.g. previews or thumbnails generated on the fly,
+which are written in a few milliseconds.
+The colliders show their details as tooltip on hover.
+
+.. code-block:: python
+
+    from utilities.scene import build_scene
+    from utilities.svg_renderer import render_scene
+
+    svg = render_scene(build_scene(data, EnergyConfiguration))
+    Path("energy.svg").write_text(svg)
+
+The LaTeX in the labels is converted into plain text with superscripts,
+which covers the labels used in this repository.
+"""
+import re
+from typing import Iterable, List, Sequence, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+
+from utilities.axis_layout import AxisLayout
+from utilities.plot_helper import HADRON_SYMBOL, OTHER_SYMBOL
+from utilities.scene import HOVER_LABELS, HOVER_TITLE, MarkerSeries, Scene
+
+WIDTH = 1000  # [px]
+HEIGHT = 560  # [px]
+MARGINS = (90, 200, 20, 60)  # left, right, top, bottom [px]
+FONT_SIZE = 11  # [px]
+MARKER_RADIUS = 4.5  # [px]
+LABEL_PAD = 3  # [px] between marker and label
+TICK_LENGTH = (6, 3)  # major, minor [px]
+
+SUPERSCRIPT = r'<tspan baseline-shift="super" font-size="75%">\1</tspan>'
+LATEX_REPLACEMENTS = [  # applied in this order
+    (r"\\mathrm\{([^}]*)\}", r"\1"),
+    (r"\\left|\\right", ""),
+    (r"\\;", " "),
+    (r"\\bar\{(\w)\}", "\\1\u0304"),
+    (r"\\mu", "\u03bc"),
+    (r"\^\{([^}]*)\}", SUPERSCRIPT),
+    (r"\^(.)", SUPERSCRIPT),
+]
+
+TEXT_ANCHOR = {"left": "end", "center": "middle", "right": "start"}
+BASELINE = {"top": "text-after-edge", "middle": "central", "bottom": "text-before-edge"}
+
+
+def svg_text(label: str) -> str:
+    """Convert the (LaTeX) label into SVG text content.
+
+    Args:
+        label (str): The label, LaTeX between ``$``.
+
+    Returns:
+        str: Escaped text, with ``tspan`` elements for superscripts.
+    """
+    text = escape(label)
+    if "$" not in text:
+        return text
+    text = text.replace("$", "")
+    for pattern, replacement in LATEX_REPLACEMENTS:
+        text = re.sub(pattern, replacement, text)
+    return text
+
+
+# Coordinates ------------------------------------------------------------------
+
+def _to_pixels(values: np.ndarray, layout: AxisLayout, start: float, end: float) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    limits = np.asarray(layout.limits, dtype=float)
+    if layout.is_log:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values, limits = np.log10(values), np.log10(limits)
+    return start + (values - limits[0]) / (limits[1] - limits[0]) * (end - start)
+
+
+def plot_box(width: int = WIDTH, height: int = HEIGHT) -> Tuple[float, float, float, float]:
+    """Pixel coordinates ``(left, right, top, bottom)`` of the plot area within the chart."""
+    return MARGINS[0], width - MARGINS[1], MARGINS[2], height - MARGINS[3]
+
+
+def data_to_pixels(scene: Scene, x: np.ndarray, y: np.ndarray, width: int = WIDTH, height: int = HEIGHT
+                   ) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert data coordinates into pixel coordinates of the rendered scene,
+    e.g. to overlay markers onto a chart rendered once.
+
+    Args:
+        scene (Scene): The scene.
+        x (np.ndarray): Values on the x-axis.
+        y (np.ndarray): Values on the y-axis.
+        width (int): Width of the chart [px].
+        height (int): Height of the chart [px].
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The pixel coordinates.
+    """
+    left, right, top, bottom = plot_box(width, height)
+    return (_to_pixels(x, scene.xaxis.layout, left, right),
+            _to_pixels(y, scene.yaxis.layout, bottom, top))
+
+
+def _format_tick(value: float, layout: AxisLayout) -> str:
+    if layout.tick_format == "power":
+        return f'10<tspan baseline-shift="super" font-size="75%">{int(round(np.log10(value)))}</tspan>'
+    return f"{value:g}"
+
+
+def _points(x: Iterable[float], y: Iterable[float]) -> str:
+    return " ".join(f"{xi:.1f},{yi:.1f}" for xi, yi in zip(x, y))
+
+
+# Elements ---------------------------------------------------------------------
+
+def _marker(symbol: str, x: float, y: float, r: float = MARKER_RADIUS) -> str:
+    if symbol == HADRON_SYMBOL:
+        r *= 1.3
+        return f'<path d="M{x:.1f} {y - r:.1f}L{x + r:.1f} {y:.1f}L{x:.1f} {y + r:.1f}L{x - r:.1f} {y:.1f}Z"/>'
+    if symbol == OTHER_SYMBOL:
+        return f'<rect x="{x - r:.1f}" y="{y - r:.1f}" width="{2 * r:.1f}" height="{2 * r:.1f}"/>'
+    return f'<circle cx="{x:.1f}" cy="{y:.1f}" r="{r:.1f}"/>'
+
+
+def _tooltip(hover: np.ndarray, columns: Sequence[str]) -> str:
+    values = dict(zip(columns, hover))
+    name, institute, country = (values[column] for column in HOVER_TITLE)
+    lines = [f"{name} ({institute}, {country})"]
+    lines += [f"{HOVER_LABELS[column]}: " + (f"{value:g}" if isinstance(value, float) else str(value))
+              for column, value in values.items() if column not in HOVER_TITLE]
+    return escape("\n".join(lines))
+
+
+def _series(series: MarkerSeries, x: np.ndarray, y: np.ndarray, hover_columns: Sequence[str]) -> List[str]:
+    color = series.particle_type.color
+    fill = color if series.built else "none"
+    valid = np.isfinite(x) & np.isfinite(y)
+
+    elements = [f'<g fill="{fill}" stroke="{color}" stroke-width="1.5">']
+    for xi, yi, hover in zip(x[valid], y[valid], series.hover[valid]):
+        elements.append(f"<g><title>{_tooltip(hover, hover_columns)}</title>{_marker(series.particle_type.symbol, xi, yi)}</g>")
+    elements.append("</g>")
+
+    elements.append('<g fill="black">')
+    for xi, yi, text, textposition in zip(x[valid], y[valid], series.texts[valid], series.textpositions[valid]):
+        if not text:
+            continue
+        v, h = textposition.split(" ")
+        dx = {"left": -1, "center": 0, "right": 1}[h] * (MARKER_RADIUS + LABEL_PAD)
+        dy = {"top": -1, "middle": 0, "bottom": 1}[v] * (MARKER_RADIUS + LABEL_PAD)
+        elements.append(
+            f'<text x="{xi + dx:.1f}" y="{yi + dy:.1f}" text-anchor="{TEXT_ANCHOR[h]}" '
+            f'dominant-baseline="{BASELINE[v]}">{escape(str(text))}</text>'
+        )
+    elements.append("</g>")
+    return elements
+
+
+def _axes(scene: Scene, box: Tuple[float, float, float, float]) -> List[str]:
+    left, right, top, bottom = box
+    xlayout, ylayout = scene.xaxis.layout, scene.yaxis.layout
+    major, minor = TICK_LENGTH
+
+    elements = ['<g stroke="lightgrey" stroke-width="0.6" stroke-dasharray="3 3">']
+    xmajor = _to_pixels(xlayout.major_ticks, xlayout, left, right)
+    ymajor = _to_pixels(ylayout.major_ticks, ylayout, bottom, top)
+    elements += [f'<line x1="{x:.1f}" y1="{top}" x2="{x:.1f}" y2="{bottom}"/>' for x in xmajor]
+    elements += [f'<line x1="{left}" y1="{y:.1f}" x2="{right}" y2="{y:.1f}"/>' for y in ymajor]
+    elements.append("</g>")
+
+    elements.append('<g stroke="black" stroke-width="1">')
+    elements.append(f'<rect x="{left}" y="{top}" width="{right - left}" height="{bottom - top}" fill="none" '
+                    f'stroke-width="1.5"/>')
+    elements += [f'<line x1="{x:.1f}" y1="{bottom}" x2="{x:.1f}" y2="{bottom + major}"/>' for x in xmajor]
+    elements += [f'<line x1="{x:.1f}" y1="{bottom}" x2="{x:.1f}" y2="{bottom + minor}"/>'
+                 for x in _to_pixels(xlayout.minor_ticks, xlayout, left, right)]
+    elements += [f'<line x1="{left - major}" y1="{y:.1f}" x2="{left}" y2="{y:.1f}"/>' for y in ymajor]
+    elements += [f'<line x1="{left - minor}" y1="{y:.1f}" x2="{left}" y2="{y:.1f}"/>'
+                 for y in _to_pixels(ylayout.minor_ticks, ylayout, bottom, top)]
+    elements.append("</g>")
+
+    elements.append('<g fill="black">')
+    elements += [f'<text x="{x:.1f}" y="{bottom + major + 2}" text-anchor="middle" dominant-baseline="hanging">'
+                 f'{_format_tick(value, xlayout)}</text>' for x, value in zip(xmajor, xlayout.major_ticks)]
+    elements += [f'<text x="{left - major - 2}" y="{y:.1f}" text-anchor="end" dominant-baseline="central">'
+                 f'{_format_tick(value, ylayout)}</text>' for y, value in zip(ymajor, ylayout.major_ticks)]
+    elements.append(f'<text x="{(left + right) / 2:.1f}" y="{bottom + 40}" text-anchor="middle">'
+                    f'{svg_text(scene.xaxis.label)}</text>')
+    ycenter = (top + bottom) / 2
+    elements.append(f'<text x="{left - 60}" y="{ycenter:.1f}" text-anchor="middle" '
+                    f'transform="rotate(-90 {left - 60} {ycenter:.1f})">{svg_text(scene.yaxis.label)}</text>')
+    elements.append("</g>")
+    return elements
+
+
+def _legend(scene: Scene, x: float, y: float) -> List[str]:
+    line_height = FONT_SIZE * 1.8
+    elements = [f'<g><text x="{x}" y="{y}" font-weight="bold">Particles</text>']
+    for series in scene.series:
+        if not series.built:
+            continue
+        y += line_height
+        color = series.particle_type.color
+        elements.append(f'<g fill="{color}" stroke="{color}">{_marker(series.particle_type.symbol, x + 6, y)}</g>')
+        elements.append(f'<text x="{x + 18}" y="{y}" dominant-baseline="central">'
+                        f'{svg_text(series.particle_type.latex)}</text>')
+    for fit in scene.trends:
+        y += line_height
+        elements.append(f'<line x1="{x}" y1="{y}" x2="{x + 12}" y2="{y}" stroke="{fit.family.color}" '
+                        f'stroke-width="1.5" stroke-dasharray="4 2"/>')
+        elements.append(f'<text x="{x + 18}" y="{y}" dominant-baseline="central">{escape(fit.family.name)} trend</text>')
+    elements.append("</g>")
+    return elements
+
+
+# Renderer ---------------------------------------------------------------------
+
+def render_scene(scene: Scene, width: int = WIDTH, height: int = HEIGHT) -> str:
+    """Render the scene into an SVG document.
+
+    Args:
+        scene (Scene): The scene.
+        width (int): Width of the chart [px].
+        height (int): Height of the chart [px].
+
+    Returns:
+        str: The SVG document.
+    """
+    left, right, top, bottom = plot_box(width, height)
+    xlayout, ylayout = scene.xaxis.layout, scene.yaxis.layout
+    clip_id = f"plot-area-{scene.name}"
+
+    elements = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="sans-serif" font-size="{FONT_SIZE}">',
+        f'<title>{escape(scene.name)}</title>',
+        f'<defs><clipPath id={quoteattr(clip_id)}>'
+        f'<rect x="{left}" y="{top}" width="{right - left}" height="{bottom - top}"/></clipPath></defs>',
+        '<rect width="100%" height="100%" fill="white"/>',
+    ]
+    elements += _axes(scene, (left, right, top, bottom))
+
+    elements.append(f'<g clip-path="url(#{clip_id})">')
+    for fit in scene.trends:
+        x = _to_pixels(fit.x, xlayout, left, right)
+        band = _points(np.concatenate([x, x[::-1]]),
+                       np.concatenate([_to_pixels(fit.upper, ylayout, bottom, top),
+                                       _to_pixels(fit.lower[::-1], ylayout, bottom, top)]))
+        elements.append(f'<polygon points="{band}" fill="{fit.family.color}" fill-opacity="0.2"/>')
+        elements.append(f'<polyline points="{_points(x, _to_pixels(fit.y, ylayout, bottom, top))}" fill="none" '
+                        f'stroke="{fit.family.color}" stroke-width="1.5" stroke-dasharray="6 3"/>')
+    for line in scene.families:
+        points = _points(_to_pixels(line.x, xlayout, left, right), _to_pixels(line.y, ylayout, bottom, top))
+        elements.append(f'<polyline points="{points}" fill="none" stroke="{line.color}" stroke-opacity="0.6"/>')
+    for series in scene.series:
+        elements += _series(series, _to_pixels(series.x, xlayout, left, right),
+                            _to_pixels(series.y, ylayout, bottom, top), scene.hover_columns)
+    elements.append("</g>")
+
+    elements += _legend(scene, right + 20, top + 10)
+    elements.append("</svg>")
+    return "\n".join(elements)
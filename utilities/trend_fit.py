@@ -0,0 +1,180 @@
+"""
+Trend Fit
+*********
+
+Livingston-style trend lines, i.e. exponential growth over the years
+(or power laws for log-log plots), fitted per particle-type family
+(hadron, lepton, other; see :data:`utilities.plot_helper.PARTICLE_TYPES`).
+
+The fits are linear least-squares fits in the (log-)space of the plot axes.
+Confidence bands are estimated via bootstrap, where all resamples are fitted
+at once in closed form with batched NumPy operations.
+"""
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utilities.csv_reader import Column
+from utilities.plot_helper import (HADRON_SYMBOL, LEPTON_SYMBOL, OTHER_SYMBOL, PARTICLE_TYPES,
+                                   PlotConfiguration)
+
+
+@dataclass
+class TrendFamily:
+    name: str
+    symbol: str  # particle types with this symbol belong to the family
+    color: str
+
+
+TREND_FAMILIES = [
+    TrendFamily("hadron", HADRON_SYMBOL, "#8c564b"),
+    TrendFamily("lepton", LEPTON_SYMBOL, "#17becf"),
+    TrendFamily("other", OTHER_SYMBOL, "#7f7f7f"),
+]
+
+N_BOOTSTRAP = 10_000
+CONFIDENCE_LEVEL = 0.68
+MIN_POINTS = 3  # minimum number of points for a fit
+N_GRID_POINTS = 100
+
+
+@dataclass
+class TrendFit:
+    family: TrendFamily
+    intercept: float  # in (log-)space of the axes
+    slope: float  # in (log-)space of the axes
+    x: np.ndarray  # grid the fit is evaluated on (data-space)
+    y: np.ndarray  # best fit (data-space)
+    lower: np.ndarray  # lower edge of the confidence band (data-space)
+    upper: np.ndarray  # upper edge of the confidence band (data-space)
+    n_points: int
+
+
+def family_mask(data: pd.DataFrame, family: TrendFamily) -> pd.Series:
+    """Mask of the rows belonging to the particle-type family.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+        family (TrendFamily): The family to select.
+
+    Returns:
+        pd.Series: Boolean mask.
+    """
+    shorthands = [ptype.shorthand for ptype in PARTICLE_TYPES if ptype.symbol == family.symbol]
+    return data[Column.TYPE].isin(shorthands)
+
+
+def linear_fit(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Closed-form least-squares fits of ``y = a + b*x``, batched over the leading axes.
+
+    Args:
+        x (np.ndarray): x-values, shape ``(..., n)``.
+        y (np.ndarray): y-values, shape ``(..., n)``.
+
+    Returns:
+        np.ndarray: Intercepts and slopes, shape ``(2, ...)``.
+        NaN for degenerate samples (all x identical).
+    """
+    x_mean = x.mean(axis=-1, keepdims=True)
+    y_mean = y.mean(axis=-1, keepdims=True)
+    dx = x - x_mean
+    var = (dx**2).sum(axis=-1)
+    cov = (dx * (y - y_mean)).sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(var > 0, cov / var, np.nan)
+    intercept = y_mean[..., 0] - slope * x_mean[..., 0]
+    return np.stack([intercept, slope])
+
+
+def bootstrap_fit(x: np.ndarray, y: np.ndarray, n_bootstrap: int = N_BOOTSTRAP,
+                  rng: np.random.Generator = None) -> np.ndarray:
+    """Fit all bootstrap resamples of the points at once.
+
+    Args:
+        x (np.ndarray): x-values, shape ``(n,)``.
+        y (np.ndarray): y-values, shape ``(n,)``.
+        n_bootstrap (int): Number of resamples.
+        rng (np.random.Generator): Random number generator, for reproducibility.
+
+    Returns:
+        np.ndarray: Intercepts and slopes of the resamples, shape ``(2, n_bootstrap)``.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    indices = rng.integers(0, len(x), size=(n_bootstrap, len(x)))
+    return linear_fit(x[indices], y[indices])
+
+
+def _to_fit_space(values, log: bool):
+    return np.log10(values) if log else values
+
+
+def _from_fit_space(values, log: bool):
+    return 10**values if log else values
+
+
+def fit_trends(data: pd.DataFrame, configuration: PlotConfiguration,
+               families: Sequence[TrendFamily] = TREND_FAMILIES,
+               built_only: bool = True, extrapolate_to: float = None,
+               n_bootstrap: int = N_BOOTSTRAP, confidence: float = CONFIDENCE_LEVEL,
+               seed: int = 0) -> List[TrendFit]:
+    """Fit the trends per family for the given plot configuration.
+    Axes in log-scale are fitted in log-space,
+    i.e. exponential growth for log-y over linear-x and a power law for log-log.
+
+    Args:
+        data (pd.DataFrame): DataFrame containing the accelerator timeline data.
+        configuration (PlotConfiguration): See :class:`utilities.plot_helper.PlotConfiguration`
+        families (Sequence[TrendFamily]): Families to fit. Families with less than
+                                          ``MIN_POINTS`` points or with all points
+                                          at the same x are skipped.
+        built_only (bool): Only fit colliders that have been built.
+        extrapolate_to (float): Extend the fit up to this x-value.
+                                Defaults to the maximum x of the family.
+        n_bootstrap (int): Number of bootstrap resamples for the confidence band.
+        confidence (float): Confidence level of the band.
+        seed (int): Seed for the bootstrap resampling.
+
+    Returns:
+        List[TrendFit]: The fits of all families with enough data.
+    """
+    logx, logy = "x" in configuration.logscale, "y" in configuration.logscale
+    rng = np.random.default_rng(seed)
+    quantiles = [(1 - confidence) / 2, (1 + confidence) / 2]
+
+    fits = []
+    for family in families:
+        mask = family_mask(data, family)
+        if built_only:
+            mask &= data[Column.BUILT]
+        points = data.loc[mask, [configuration.xcolumn, configuration.ycolumn]].dropna()
+        if len(points) < MIN_POINTS:
+            continue
+
+        x = _to_fit_space(points[configuration.xcolumn].to_numpy(dtype=float), logx)
+        y = _to_fit_space(points[configuration.ycolumn].to_numpy(dtype=float), logy)
+        intercept, slope = linear_fit(x, y)
+
+        x_max = x.max() if extrapolate_to is None else _to_fit_space(extrapolate_to, logx)
+        grid = np.linspace(x.min(), x_max, N_GRID_POINTS)
+
+        samples = bootstrap_fit(x, y, n_bootstrap, rng)
+        samples = samples[:, ~np.isnan(samples[1])]  # remove degenerate resamples
+        if samples.shape[1] == 0:  # all points at the same x, no trend
+            continue
+        predictions = samples[0][:, None] + samples[1][:, None] * grid[None, :]
+        lower, upper = np.quantile(predictions, quantiles, axis=0)
+
+        fits.append(TrendFit(
+            family=family,
+            intercept=float(intercept),
+            slope=float(slope),
+            x=_from_fit_space(grid, logx),
+            y=_from_fit_space(intercept + slope * grid, logy),
+            lower=_from_fit_space(lower, logy),
+            upper=_from_fit_space(upper, logy),
+            n_points=len(points),
+        ))
+    return fits